@@ -1,30 +1,159 @@
-from flask import Flask, request, jsonify
-import pytz
-from flask_cors import CORS
-from services.nasaPower import NasaPowerClient
+from flask import Blueprint, Flask, Response, request, jsonify
 from flask import send_from_directory
-from services.locationService import get_coordinates
-from services.forecastService import ForecastClient
-from services.riskCalculator import RiskCalculator
 import datetime
 import os
-from services.weatherCondition import WeatherConditionClassifier
+import services
+from services import registry
+from services.admission import admission_controlled, admission_stats
+from services.profiling import profiled
+from services.compression import init_compression, render_cached
+from services.deadline import deadline_exceeded
+from services.config import backend_path
 
-condition_classifier = WeatherConditionClassifier()
-app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": "*"}})
+# Services are created lazily by services.registry on the first request that needs them
+api = Blueprint("api", __name__)
+FRONTEND_DIR = os.environ.get("FRONTEND_DIR") or os.path.normpath(os.path.join(backend_path(), "..", "frontend"))
 
-nasa_client = NasaPowerClient()
-forecast_client = ForecastClient()
-risk_calculator = RiskCalculator()
 
+def create_app():
+    app = Flask(__name__)
 
-@app.route("/api/health", methods=["GET"])
+    # flask_cors is only needed once the app is built, not when app.py is imported
+    from flask_cors import CORS
+
+    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    init_compression(app)
+    app.register_blueprint(api)
+
+    # Only one process may evaluate alerts, otherwise every worker sends the same alert
+    if os.environ.get("ALERTS_RUN_IN_APP") == "1":
+        from services.riskAlerts import alert_engine
+
+        alert_engine.start()
+    return app
+
+
+@api.route("/api/health", methods=["GET"])
 def health_check():
     return jsonify({"status": "healthy", "message": "Backend is running"})
 
 
-@app.route("/api/weather/hourly", methods=["GET"])
+@api.route("/api/upstream/stats", methods=["GET"])
+def upstream_stats():
+    # admitted / queued / throttled (429) / dropped counters per provider and priority
+    from services.upstreamScheduler import scheduler
+
+    return jsonify(scheduler.stats())
+
+
+@api.route("/api/upstream/hedging", methods=["GET"])
+def upstream_hedging_stats():
+    # hedged / won by the hedge / fallbacks, plus the p50 / p95 latency per provider that triggers hedging
+    from services.hedging import hedging_stats
+
+    return jsonify(hedging_stats())
+
+
+@api.route("/api/weather/stream/stats", methods=["GET"])
+def live_stream_stats():
+    from services.liveUpdates import live_hub
+
+    return jsonify(live_hub.stats())
+
+
+@api.route("/api/admission/stats", methods=["GET"])
+def get_admission_stats():
+    return jsonify(admission_stats())
+
+
+@api.route("/api/alerts/subscriptions", methods=["GET"])
+def list_alert_subscriptions():
+    from services import profiling
+    from services.riskAlerts import alert_engine
+
+    # every subscriber's location and webhook
+    if not profiling.token_matches(request.headers.get("X-Admin-Token", "")):
+        return jsonify({"error": "X-Admin-Token required"}), 403
+    return jsonify(alert_engine.list_subscriptions())
+
+
+@api.route("/api/alerts/subscriptions", methods=["POST"])
+@admission_controlled("alerts", max_in_flight=4)
+def create_alert_subscription():
+    from services.admission import client_id
+    from services.riskAlerts import InvalidSubscription, SubscriptionLimit, alert_engine, validate_subscription
+
+    try:
+        subscription = validate_subscription(request.get_json(silent=True) or {})
+        # the answer holds the subscription's secret, it is needed to read or delete it later
+        return jsonify(alert_engine.add_subscription(subscription, client=client_id(request))), 201
+    except InvalidSubscription as e:
+        return jsonify({"error": str(e)}), 400
+    except SubscriptionLimit as e:
+        return jsonify({"error": str(e)}), e.status
+
+
+def _subscription_secret():
+    # None lets the engine skip the secret check, so only the admin token may produce it
+    from services import profiling
+
+    if profiling.token_matches(request.headers.get("X-Admin-Token", "")):
+        return None
+    return request.headers.get("X-Subscription-Secret", "")
+
+
+@api.route("/api/alerts/subscriptions/<subscription_id>", methods=["GET"])
+def get_alert_subscription(subscription_id):
+    from services.riskAlerts import alert_engine
+
+    subscription = alert_engine.get_subscription(subscription_id, _subscription_secret())
+    if subscription is None:
+        return jsonify({"error": "Subscription not found"}), 404  # also for a wrong secret
+    return jsonify(subscription)
+
+
+@api.route("/api/alerts/subscriptions/<subscription_id>", methods=["DELETE"])
+def delete_alert_subscription(subscription_id):
+    from services.riskAlerts import alert_engine
+
+    if not alert_engine.remove_subscription(subscription_id, _subscription_secret()):
+        return jsonify({"error": "Subscription not found"}), 404
+    return jsonify({"deleted": subscription_id})
+
+
+@api.route("/api/alerts/stats", methods=["GET"])
+def get_alert_stats():
+    from services.riskAlerts import alert_engine
+
+    return jsonify(alert_engine.stats())
+
+
+@api.route("/api/admin/profiles", methods=["GET"])
+def list_request_profiles():
+    from services import profiling
+
+    if not profiling.token_matches(request.headers.get("X-Admin-Token", "")):
+        return jsonify({"error": "Not found"}), 404  # do not advertise the admin API
+    return jsonify(profiling.list_profiles())
+
+
+@api.route("/api/admin/profiles/<profile_id>", methods=["GET"])
+def download_request_profile(profile_id):
+    from services import profiling
+
+    if not profiling.token_matches(request.headers.get("X-Admin-Token", "")):
+        return jsonify({"error": "Not found"}), 404
+
+    fmt = request.args.get("format", "speedscope")
+    filename = profiling.profile_filename(profile_id, fmt)
+    if filename is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_from_directory(profiling.PROFILE_DIR, filename, as_attachment=True)
+
+
+@api.route("/api/weather/hourly", methods=["GET"])
+@admission_controlled("hourly", max_in_flight=16)
+@profiled("hourly")
 def get_hourly_weather():
     latitude = request.args.get("lat")
     longitude = request.args.get("lon")
@@ -34,21 +163,30 @@ def get_hourly_weather():
         return jsonify({"error": "Missing parameters: lat, lon, and date are required"}), 400
 
     try:
-        utc = pytz.UTC
+        if not (-90 <= float(latitude) <= 90 and -180 <= float(longitude) <= 180):
+            raise ValueError()
+    except ValueError:
+        return jsonify({"error": "lat and lon must be numbers within -90..90 and -180..180"}), 400
+
+    try:
+        utc = datetime.timezone.utc
         current_time = datetime.datetime.now(utc)
         target_date = datetime.datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=utc)
-        is_today = target_date.date() == current_time.date()
-        is_future = target_date.date() > current_time.date()
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+    is_today = target_date.date() == current_time.date()
+    is_future = target_date.date() > current_time.date()
 
+    def build():
         # DEBUG PRINT
         print(f"🔍 Request: lat={latitude}, lon={longitude}, date={date_str}")
         print(f"📅 Target date: {target_date}, NASA format: {target_date.strftime('%Y%m%d')}")
         print(f"⏰ Current time: {current_time}, Is today: {is_today}, Is future: {is_future}")
 
         if is_future:
-            hourly_data = get_future_data(latitude, longitude, target_date)
+            hourly_data, complete = get_future_data(latitude, longitude, target_date)
         else:
-            hourly_data = get_historical_data(latitude, longitude, target_date, current_time, is_today)
+            hourly_data, complete = get_historical_data(latitude, longitude, target_date, current_time, is_today)
 
         # DEBUG PRINT
         print(f"📊 Hourly data points found: {len(hourly_data)}")
@@ -62,11 +200,15 @@ def get_hourly_weather():
             "is_today": is_today,
             "is_future": is_future,
         }
+        # only a complete answer is kept: an upstream that failed or ran out of time would be
+        # served truncated for the whole TTL
+        return response, complete and not deadline_exceeded()
 
-        return jsonify(response)
+    try:
+        # the rendered body (and its gzip / br variants) is reused; today's answer changes with the hour
+        key = ("hourly", latitude, longitude, date_str, current_time.hour if is_today else None)
+        return render_cached(key, build)
 
-    except ValueError:
-        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
     except Exception as e:
         print(f"💥 Unexpected error in get_hourly_weather: {e}")
         import traceback
@@ -75,148 +217,193 @@ def get_hourly_weather():
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 
+@api.route("/api/export/hourly", methods=["POST"])
+@admission_controlled("export", max_in_flight=2)
+def export_hourly_history():
+    from flask import stream_with_context
+    from services import bulkExport
+
+    try:
+        locations, start, end, fmt = bulkExport.parse_export_request(request.get_json(silent=True) or {})
+    except bulkExport.ExportError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # the stream outlives this view (and its admission slot), so exports have their own limit
+    if not bulkExport.export_slots.acquire(blocking=False):
+        return jsonify({"error": "Too many exports running, try again later"}), 503, {"Retry-After": "30"}
+
+    def generate():
+        summary = {}
+        for chunk in bulkExport.export_chunks(locations, start, end, fmt, summary=summary):
+            if chunk:
+                yield chunk
+        print(f"📦 Export done: {summary}")
+
+    mimetype, extension = bulkExport.FORMATS[fmt]
+    filename = f"hourly_{start:%Y%m%d}_{end:%Y%m%d}.{extension}"
+    response = Response(stream_with_context(generate()), mimetype=mimetype,
+                        headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    # runs when the server closes the response: finished, failed or the client went away
+    response.call_on_close(bulkExport.export_slots.release)
+    return response
+
+
+@api.route("/api/weather/stream", methods=["GET"])
+def stream_today_weather():
+    """
+    Server-sent events for today's hourly data in the grid cell containing a location. Everyone in the same
+    cell shares one refresh loop, so the hours are built for the cell centre (sent as "cell" in the snapshot),
+    not for the exact point: the "snapshot" event replaces the client's hour set, "update" events after it
+    only carry changed or new hours. Each stream holds a server thread: run gunicorn with gunicorn.conf.py
+    (threaded workers, streams capped below the thread count), never the default sync worker.
+    """
+    from services.grid import cell_id, snap_to_cell
+    from services.liveUpdates import HubFull, live_hub
+
+    latitude = request.args.get("lat")
+    longitude = request.args.get("lon")
+    if not all([latitude, longitude]):
+        return jsonify({"error": "Missing parameters: lat and lon are required"}), 400
+
+    try:
+        cell_lat, cell_lon = snap_to_cell(latitude, longitude)
+    except ValueError:
+        return jsonify({"error": "lat and lon must be numbers"}), 400
+
+    utc = datetime.timezone.utc
+    today = datetime.datetime.now(utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def build():
+        hourly_data, complete = get_historical_data(str(cell_lat), str(cell_lon), today, datetime.datetime.now(utc), True)
+        return hourly_data if complete else None  # an upstream failed: the hub keeps the last good hours
+
+    def still_current():
+        return datetime.datetime.now(utc).date() == today.date()
+
+    try:
+        cell = {"latitude": cell_lat, "longitude": cell_lon}
+        events = live_hub.stream((cell_id(latitude, longitude), today.strftime("%Y%m%d")), build, still_current, cell)
+        first = next(events)  # subscribe now, so a full hub is a clean 503 and not a broken stream
+    except HubFull:
+        response = jsonify({"error": "Too many live subscribers, try again shortly"})
+        response.headers["Retry-After"] = "30"
+        return response, 503
+
+    def generate():
+        yield first
+        yield from events
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # nginx: do not buffer the stream
+    return response
+
+
+def build_hourly_entry(series, row, source, risk_calculator, condition_classifier):
+    """
+    Score one row of HourlySeries.rows(). Returns None when the hour has no temperature.
+    Missing precipitation / wind count as 0, missing humidity stays None (it is optional for the risk).
+    """
+    index, temperature, precipitation, wind_speed, humidity = row
+    if temperature is None:
+        return None
+    precipitation = 0 if precipitation is None else precipitation
+    wind_speed = 0 if wind_speed is None else wind_speed
+
+    risk_assessment = risk_calculator.calculate_hourly_risk(temperature, precipitation, wind_speed, humidity)
+
+    # Get weather condition
+    condition = condition_classifier.get_condition(temperature, precipitation, wind_speed, humidity)
+
+    return {
+        "time": series.iso_time(index),
+        "temperature": temperature,
+        "precipitation": precipitation,
+        "wind_speed": wind_speed,
+        "humidity": humidity,
+        "risk_assessment": risk_assessment,
+        "condition": condition,
+        "source": source,
+    }
+
+
 def get_future_data(latitude, longitude, target_date):
+    """
+    Scored forecast hours of target_date. Returns (hourly_data, complete), complete is False when the forecast failed.
+    """
     print(f"🌤️ Getting future data for {target_date}")
     hourly_data = []
-    end_date = target_date + datetime.timedelta(days=1)
-
-    forecast_data = forecast_client.get_hourly_forecast(
-        latitude, longitude, target_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
-    )
-
-    if forecast_data and "hourly" in forecast_data:
-        time_list = forecast_data["hourly"]["time"]
-        temp_list = forecast_data["hourly"]["temperature_2m"]
-        precip_list = forecast_data["hourly"]["precipitation"]
-        wind_list = forecast_data["hourly"]["windspeed_10m"]
-        humidity_list = forecast_data["hourly"]["relative_humidity_2m"]
-
-        print(f"📡 Forecast data points: {len(time_list)}")
-
-        for i in range(len(time_list)):
-            time_obj = datetime.datetime.fromisoformat(time_list[i])
-            if time_obj.date() == target_date.date():
-                risk_assessment = risk_calculator.calculate_hourly_risk(
-                    temp_list[i], precip_list[i], wind_list[i], humidity_list[i]
-                )
-
-                # Get weather condition
-                condition = condition_classifier.get_condition(
-                    temp_list[i], precip_list[i], wind_list[i], humidity_list[i]
-                )
-
-                hourly_data.append(
-                    {
-                        "time": time_list[i],
-                        "temperature": temp_list[i],
-                        "precipitation": precip_list[i],
-                        "wind_speed": wind_list[i],
-                        "humidity": humidity_list[i],
-                        "risk_assessment": risk_assessment,
-                        "condition": condition,
-                        "source": "forecast",
-                    }
-                )
+    risk_calculator = registry.get_risk_calculator()
+    condition_classifier = registry.get_condition_classifier()
+
+    # Open-Meteo, hedged to the mirror when one is configured (services.providers)
+    forecast_series = registry.get_forecast_source().get_day(latitude, longitude, target_date.date())
+
+    if forecast_series:
+        print(f"📡 Forecast data points: {len(forecast_series)}")
+
+        for row in forecast_series.rows(forecast_series.indices_for_day(target_date.date())):
+            entry = build_hourly_entry(forecast_series, row, forecast_series.source, risk_calculator, condition_classifier)
+            if entry:
+                hourly_data.append(entry)
 
     print(f"✅ Future data points processed: {len(hourly_data)}")
-    return hourly_data
+    return hourly_data, forecast_series is not None
 
 
 
 def get_historical_data(latitude, longitude, target_date, current_time, is_today):
+    """
+    Scored hours of target_date, today's later hours from the forecast. Returns (hourly_data, complete),
+    complete is False when any of the upstream parts failed and hourly_data only holds what the others gave.
+    """
     print(f"📚 Getting historical data: lat={latitude}, lon={longitude}, date={target_date}, is_today={is_today}")
     hourly_data = []
-    target_date_str = target_date.strftime("%Y%m%d")
-
-    nasa_data = nasa_client.get_hourly_weather_data(latitude, longitude, target_date_str, target_date_str)
-
-    if nasa_data and "properties" in nasa_data:
-        properties = nasa_data["properties"]["parameter"]
-
-        for hour in range(24):
-            time_key = f"{target_date_str}{hour:02d}"
-
-            if ("T2M" in properties and time_key in properties["T2M"] and (hour <= current_time.hour or not is_today)):
-                temperature = properties["T2M"][time_key]
-                precipitation = properties["PRECTOTCORR"].get(time_key, 0) if "PRECTOTCORR" in properties else 0
-                wind_speed = properties["WS2M"].get(time_key, 0) if "WS2M" in properties else 0
-                humidity = properties["RH2M"].get(time_key) if "RH2M" in properties else None
-
-                risk_assessment = risk_calculator.calculate_hourly_risk(
-                    temperature, precipitation, wind_speed, humidity
-                )
-
-                # Get weather condition
-                condition = condition_classifier.get_condition(
-                    temperature, precipitation, wind_speed, humidity
-                )
-
-                hourly_data.append(
-                    {
-                        "time": f"{target_date_str[:4]}-{target_date_str[4:6]}-{target_date_str[6:8]}T{hour:02d}:00:00",
-                        "temperature": temperature,
-                        "precipitation": precipitation,
-                        "wind_speed": wind_speed,
-                        "humidity": humidity,
-                        "risk_assessment": risk_assessment,
-                        "condition": condition,
-                        "source": "nasa",
-                    }
-                )
-                print(f"✅ Added data for hour {hour} with key: {time_key}, temp: {temperature}°C")
+    risk_calculator = registry.get_risk_calculator()
+    condition_classifier = registry.get_condition_classifier()
+
+    # NASA POWER, hedged to and gap-filled from Open-Meteo for recent days (services.providers)
+    nasa_series = registry.get_historical_source().get_day(latitude, longitude, target_date.date())
+    complete = nasa_series is not None
+
+    if nasa_series:
+        for row in nasa_series.rows(nasa_series.indices_for_day(target_date.date())):
+            hour = nasa_series.time_at(row[0]).hour
+            if is_today and hour > current_time.hour:
+                continue  # later hours of today come from the forecast below
+
+            entry = build_hourly_entry(nasa_series, row, nasa_series.source, risk_calculator, condition_classifier)
+            if entry:
+                hourly_data.append(entry)
+                print(f"✅ Added data for hour {hour}, temp: {entry['temperature']}°C")
             else:
-                print(f"❌ No data found for hour {hour} with key: {time_key}")
+                print(f"❌ No data found for hour {hour}")
 
     # For today, get forecast for remaining hours
     if is_today and current_time.hour < 23:
         print("🌤️ Getting forecast for remaining hours of today")
-        forecast_data = forecast_client.get_hourly_forecast(
-            latitude, longitude, current_time.strftime("%Y-%m-%d"), current_time.strftime("%Y-%m-%d")
-        )
-
-        if forecast_data and "hourly" in forecast_data:
-            time_list = forecast_data["hourly"]["time"]
-            temp_list = forecast_data["hourly"]["temperature_2m"]
-            precip_list = forecast_data["hourly"]["precipitation"]
-            wind_list = forecast_data["hourly"]["windspeed_10m"]
-            humidity_list = forecast_data["hourly"]["relative_humidity_2m"]
-
-            for i in range(len(time_list)):
-                time_obj = datetime.datetime.fromisoformat(time_list[i])
-                if time_obj.date() == current_time.date() and time_obj.hour > current_time.hour:
-                    risk_assessment = risk_calculator.calculate_hourly_risk(
-                        temp_list[i], precip_list[i], wind_list[i], humidity_list[i]
-                    )
-
-                    # Get weather condition
-                    condition = condition_classifier.get_condition(
-                        temp_list[i], precip_list[i], wind_list[i], humidity_list[i]
-                    )
-
-                    hourly_data.append(
-                        {
-                            "time": time_list[i],
-                            "temperature": temp_list[i],
-                            "precipitation": precip_list[i],
-                            "wind_speed": wind_list[i],
-                            "humidity": humidity_list[i],
-                            "risk_assessment": risk_assessment,
-                            "condition": condition,
-                            "source": "forecast",
-                        }
-                    )
+        forecast_series = registry.get_forecast_source().get_day(latitude, longitude, current_time.date())
+        complete = complete and forecast_series is not None
+
+        if forecast_series:
+            for row in forecast_series.rows(forecast_series.indices_for_day(current_time.date())):
+                if forecast_series.time_at(row[0]).hour > current_time.hour:
+                    entry = build_hourly_entry(forecast_series, row, forecast_series.source, risk_calculator, condition_classifier)
+                    if entry:
+                        hourly_data.append(entry)
 
     print(f"📦 Total hourly data points processed: {len(hourly_data)}")
-    return hourly_data
+    return hourly_data, complete
 
-@app.route('/')
+@api.route('/')
 def serve_frontend():
-    return send_from_directory('.', 'index.html')
+    return send_from_directory(FRONTEND_DIR, 'index.html')
 
-@app.route('/<path:path>')
+@api.route('/<path:path>')
 def serve_static(path):
-    return send_from_directory('.', path)
-@app.route("/api/location/coordinates", methods=["POST"])
+    return send_from_directory(FRONTEND_DIR, path)
+@api.route("/api/location/coordinates", methods=["POST"])
+@admission_controlled("coordinates", max_in_flight=4)
 def get_location_coordinates():
     data = request.get_json()
     place_name = data.get('place_name')
@@ -224,7 +411,7 @@ def get_location_coordinates():
     if not place_name:
         return jsonify({"error": "place_name is required"}), 400
     
-    coordinates = get_coordinates(place_name)
+    coordinates = services.get_coordinates(place_name)
     if coordinates:
         return jsonify(coordinates)
     else:
@@ -232,6 +419,8 @@ def get_location_coordinates():
     
 
 
+app = create_app()
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=True)
@@ -0,0 +1 @@
+# Benchmarks, run them from the backend folder: python -m benchmarks.<name>
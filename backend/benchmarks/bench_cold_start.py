@@ -0,0 +1,107 @@
+"""
+Cold start budget: time to import app.py and latency of the first requests in a fresh process.
+
+    python -m benchmarks.bench_cold_start
+
+Exits with status 1 when a median goes over its budget, so it can gate CI.
+Budgets can be tuned with COLD_START_IMPORT_BUDGET_MS / COLD_START_FIRST_REQUEST_BUDGET_MS.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+IMPORT_BUDGET_MS = float(os.environ.get("COLD_START_IMPORT_BUDGET_MS", 400))
+FIRST_REQUEST_BUDGET_MS = float(os.environ.get("COLD_START_FIRST_REQUEST_BUDGET_MS", 150))
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so nothing is warm. The scored request goes through the whole
+# hourly pipeline with the upstream clients swapped for canned data, so no network is involved.
+PROBE = r"""
+import datetime, json, sys, time
+start = time.perf_counter()
+import app
+import_ms = (time.perf_counter() - start) * 1000
+
+start = time.perf_counter()
+flask_app = app.create_app()
+factory_ms = (time.perf_counter() - start) * 1000
+
+heavy = sorted(m for m in ("requests", "pytz", "services.nasaPower", "services.forecastService") if m in sys.modules)
+
+class CannedForecast:
+    upstream = "open_meteo"
+    CACHE_EXPIRY_HOURS = 1
+
+    @staticmethod
+    def cache_key(latitude, longitude, start_date, end_date):
+        return f"canned_{latitude}_{longitude}_{start_date}_{end_date}"
+
+    def get_hourly_forecast(self, latitude, longitude, start_date, end_date):
+        return self.fetch_forecast(latitude, longitude, start_date, end_date)
+
+    def fetch_forecast(self, latitude, longitude, start_date, end_date):
+        from services.hourlySeries import HourlySeries
+
+        times = [f"{start_date}T{h:02d}:00" for h in range(24)]
+        return HourlySeries.from_open_meteo({"hourly": {"time": times, "temperature_2m": [20.0] * 24, "precipitation": [0.0] * 24,
+                                                        "windspeed_10m": [3.0] * 24, "relative_humidity_2m": [50.0] * 24}})
+
+from services import registry
+registry.reset(forecast_client=CannedForecast())
+client = flask_app.test_client()
+
+start = time.perf_counter()
+client.get("/api/health")
+health_ms = (time.perf_counter() - start) * 1000
+
+start = time.perf_counter()
+tomorrow = datetime.date.today() + datetime.timedelta(days=1)  # inside the forecast window, served by the canned client
+response = client.get(f"/api/weather/hourly?lat=23.8&lon=90.4&date={tomorrow}")
+hourly_ms = (time.perf_counter() - start) * 1000
+assert response.status_code == 200, response.status_code
+assert response.get_json()["hourly_data"], "canned forecast not used"
+
+print("RESULT " + json.dumps({"import_ms": import_ms, "factory_ms": factory_ms, "health_ms": health_ms,
+                              "hourly_ms": hourly_ms, "heavy_at_import": heavy}))
+"""
+
+
+def run_probe():
+    # an empty cache every run, so no round starts warm from the previous one
+    env = dict(os.environ, CACHE_DIR=tempfile.mkdtemp(prefix="bench_cold_start_"), SHARED_CACHE_URL="")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    line = [line for line in output.splitlines() if line.startswith("RESULT ")][-1]
+    return json.loads(line[len("RESULT "):])
+
+
+def main(rounds=7):
+    results = [run_probe() for _ in range(rounds)]
+    medians = {key: statistics.median(r[key] for r in results) for key in ("import_ms", "factory_ms", "health_ms", "hourly_ms")}
+
+    for key, value in medians.items():
+        print(f"{key:<12}{value:>9.1f} ms")
+    print(f"heavy modules loaded by import: {results[0]['heavy_at_import'] or 'none'}")
+
+    failures = []
+    if medians["import_ms"] + medians["factory_ms"] > IMPORT_BUDGET_MS:
+        failures.append(f"import + create_app {medians['import_ms'] + medians['factory_ms']:.1f} ms > {IMPORT_BUDGET_MS} ms")
+    if medians["hourly_ms"] > FIRST_REQUEST_BUDGET_MS:
+        failures.append(f"first hourly request {medians['hourly_ms']:.1f} ms > {FIRST_REQUEST_BUDGET_MS} ms")
+    if results[0]["heavy_at_import"]:
+        failures.append(f"heavy modules imported eagerly: {results[0]['heavy_at_import']}")
+
+    for failure in failures:
+        print(f"❌ Budget exceeded: {failure}")
+    if not failures:
+        print("✅ Cold start within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Compression CPU cost vs bytes saved for a typical /api/weather/hourly payload.
+
+    python -m benchmarks.bench_compression
+"""
+import json
+import time
+
+from services import compression
+from services.riskCalculator import RiskCalculator
+from services.weatherCondition import WeatherConditionClassifier
+
+
+def build_hourly_payload():
+    risk_calculator = RiskCalculator()
+    condition_classifier = WeatherConditionClassifier()
+    hourly_data = []
+    for hour in range(24):
+        temperature = 12 + hour * 0.9
+        precipitation = (hour % 7) * 1.8
+        wind_speed = 3 + (hour % 5) * 4.5
+        humidity = 45 + (hour % 9) * 5
+        hourly_data.append(
+            {
+                "time": f"2024-06-01T{hour:02d}:00:00",
+                "temperature": temperature,
+                "precipitation": precipitation,
+                "wind_speed": wind_speed,
+                "humidity": humidity,
+                "risk_assessment": risk_calculator.calculate_hourly_risk(temperature, precipitation, wind_speed, humidity),
+                "condition": condition_classifier.get_condition(temperature, precipitation, wind_speed, humidity),
+                "source": "nasa",
+            }
+        )
+    response = {
+        "date": "2024-06-01",
+        "location": {"latitude": "23.81", "longitude": "90.41"},
+        "hourly_data": hourly_data,
+        "is_today": False,
+        "is_future": False,
+    }
+    return json.dumps(response, sort_keys=True).encode()
+
+
+def time_it(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = fn()
+    return (time.perf_counter() - start) / rounds, result
+
+
+def main(rounds=500):
+    body = build_hourly_payload()
+    print(f"Raw payload: {len(body)} bytes")
+    print(f"{'encoding':<16}{'bytes':>8}{'saved':>8}{'us/op':>10}")
+
+    for encoding in compression.supported_encodings():
+        per_op, encoded = time_it(lambda: compression.encode_body(body, encoding), rounds)
+        saved = 1 - len(encoded) / len(body)
+        print(f"{encoding:<16}{len(encoded):>8}{saved:>8.0%}{per_op * 1e6:>10.1f}")
+
+    cache = compression.EncodedPayloadCache()
+    encoding = compression.supported_encodings()[0]
+    cache.get_or_encode(body, encoding)
+    per_op, _ = time_it(lambda: cache.get_or_encode(body, encoding), rounds)
+    print(f"{encoding + ' (cached)':<16}{'':>8}{'':>8}{per_op * 1e6:>10.1f}")
+
+    # a rendered response names its entry, the variant is found without hashing the body
+    key = ("hourly", "23.81", "90.41", "2024-06-01", None)
+    cache.put_body(key, body, ttl_seconds=60)
+    cache.get_or_encode(body, encoding, key)
+    per_op, _ = time_it(lambda: cache.get_or_encode(body, encoding, key), rounds)
+    print(f"{encoding + ' (named)':<16}{'':>8}{'':>8}{per_op * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
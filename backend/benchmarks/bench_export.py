@@ -0,0 +1,64 @@
+"""
+Peak memory of a bulk export as the date range grows: it should stay flat.
+
+    python -m benchmarks.bench_export
+
+Each run exports one more site-range from a local NASA stub (cold cache, so every window is fetched,
+cached per day and scored) and drains the chunks like a client would, keeping nothing.
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RANGES_DAYS = (31, 180, 720)
+SITES = 3
+
+
+def measure(export_chunks, locations, days, fmt, summary):
+    start = datetime.date(2020, 1, 1)
+    end = start + datetime.timedelta(days=days - 1)
+    size = 0
+    tracemalloc.start()
+    started = time.perf_counter()
+    for chunk in export_chunks(locations, start, end, fmt, summary=summary):
+        size += len(chunk)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, size, elapsed
+
+
+def main():
+    os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_export_cache_")
+    import contextlib
+    import io
+
+    from benchmarks.stub_upstreams import point_clients_at, start_stub
+    from services.bulkExport import _load_pyarrow, export_chunks
+    from services.upstreamScheduler import scheduler
+
+    stub = start_stub()
+    point_clients_at(stub.base_url)
+    scheduler.limits.update({"nasa_power": (10000.0, 10000)})
+
+    formats = ["csv", "ndjson"] + (["parquet"] if _load_pyarrow() is not None else [])
+    print(f"{SITES} sites per export, fresh cells every run (cold cache)")
+    print(f"{'format':<9}{'days':>6}{'rows':>9}{'output MB':>11}{'peak MB':>9}{'seconds':>9}")
+    offset = 0
+    for fmt in formats:
+        for days in RANGES_DAYS:
+            # new cells every run so nothing comes from the previous run's cache
+            locations = [(f"site{i}", -60 + (offset + i) * 0.5, 10.0) for i in range(SITES)]
+            offset += SITES
+            summary = {}
+            with contextlib.redirect_stdout(io.StringIO()):
+                peak, size, elapsed = measure(export_chunks, locations, days, fmt, summary)
+            print(f"{fmt:<9}{days:>6}{summary['rows']:>9}{size / 1e6:>11.1f}{peak / 1e6:>9.2f}{elapsed:>9.1f}")
+    print(f"upstream requests: {stub.calls}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
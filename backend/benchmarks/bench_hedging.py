@@ -0,0 +1,122 @@
+"""
+Tail latency with and without hedged requests, against local stubs with skewed latency.
+
+    python -m benchmarks.bench_hedging
+
+Every stub answers most requests quickly and a few (3-4%) very slowly, independently of each other.
+forecast:   Open-Meteo primary + mirror, both skewed
+historical: NASA POWER (slower, heavier tail) + Open-Meteo for a recent day
+Each request uses its own grid cell, so every call misses the cache and reaches a stub.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REQUESTS = 400
+WARMUP_REQUESTS = 60
+CONCURRENCY = 8
+
+
+def skewed(fast, slow, slow_fraction, seed):
+    rng = random.Random(seed)
+
+    def latency():
+        return slow if rng.random() < slow_fraction else fast * (0.5 + rng.random())
+
+    return latency
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "mean": statistics.mean(ordered) * 1000}
+
+
+def run(source, day, offset, requests=REQUESTS):
+    def one(i):
+        # one grid cell per request: 0.5 degree latitude steps, wrapping at the poles
+        lat = -80 + ((offset + i) % 320) * 0.5
+        lon = 0.625 * ((offset + i) // 320)
+        started = time.perf_counter()
+        series = source.get_day(lat, lon, day)
+        assert series is not None
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        return list(pool.map(one, range(requests)))
+
+
+def main():
+    os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_hedging_cache_")
+    import datetime
+    import io
+
+    from benchmarks.stub_upstreams import start_stub
+    from services import hedging
+    from services.forecastService import ForecastClient
+    from services.nasaPower import NasaPowerClient
+    from services.providers import HedgedSource, NasaPowerProvider, OpenMeteoProvider
+    from services.upstreamScheduler import scheduler
+
+    # the stubs are ours, the benchmark measures hedging, not the politeness limits
+    scheduler.limits.update({name: (10000.0, 10000) for name in ("nasa_power", "open_meteo", "open_meteo_mirror")})
+
+    primary = start_stub(latency=skewed(0.03, 0.8, 0.03, seed=1))
+    mirror = start_stub(latency=skewed(0.03, 0.8, 0.03, seed=2))
+    nasa = start_stub(latency=skewed(0.12, 1.5, 0.04, seed=3))
+
+    open_meteo = OpenMeteoProvider(ForecastClient(base_url=f"{primary.base_url}/v1/forecast"))
+    open_meteo_mirror = OpenMeteoProvider(ForecastClient(base_url=f"{mirror.base_url}/v1/forecast", upstream="open_meteo_mirror"),
+                                          name="open_meteo_mirror")
+    nasa_client = NasaPowerClient()
+    nasa_client.HOURLY_BASE_URL = f"{nasa.base_url}/api/temporal/hourly/point"
+    nasa_provider = NasaPowerProvider(nasa_client)
+
+    tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    scenarios = [
+        ("forecast", [open_meteo, open_meteo_mirror], tomorrow),
+        ("historical", [nasa_provider, open_meteo], yesterday),
+    ]
+
+    out = sys.stdout
+    sys.stdout = io.StringIO()  # the clients print a lot per call
+    rows = []
+    offset = 0
+    try:
+        # fill the latency tracker so both modes see a real p95, not the default delay
+        for name, providers, day in scenarios:
+            for provider in providers:
+                offset += WARMUP_REQUESTS
+                run(HedgedSource([provider], hedge=False), day, offset, requests=WARMUP_REQUESTS)
+
+        for name, providers, day in scenarios:
+            for hedge in (False, True):
+                offset += REQUESTS
+                before = hedging.hedging_stats()
+                samples = run(HedgedSource(providers, hedge=hedge), day, offset)
+                after = hedging.hedging_stats()
+                rows.append((name, "hedged" if hedge else "single", percentiles(samples),
+                             after["hedged"] - before["hedged"], after["hedge_wins"] - before["hedge_wins"]))
+                sys.stdout = io.StringIO()
+        time.sleep(2)  # losers of the last hedges are still in flight, let them finish quietly
+    finally:
+        sys.stdout = out
+
+    print(f"{REQUESTS} requests per run, {CONCURRENCY} concurrent")
+    print(f"{'scenario':<12}{'mode':<8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'mean ms':>9}{'hedges':>8}{'won':>6}")
+    for name, mode, p, hedges, wins in rows:
+        print(f"{name:<12}{mode:<8}{p['p50']:>9.0f}{p['p95']:>9.0f}{p['p99']:>9.0f}{p['mean']:>9.0f}{hedges:>8}{wins:>6}")
+    upstream_calls = sum(sum(stub.calls.values()) for stub in (primary, mirror, nasa))
+    print(f"upstream calls: {upstream_calls} for {len(rows) * REQUESTS} requests (+{WARMUP_REQUESTS * 4} warm-up)")
+
+
+if __name__ == "__main__":
+    main()
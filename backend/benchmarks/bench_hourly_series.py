@@ -0,0 +1,81 @@
+"""
+Memory per cached cell-day and per-hour read cost: raw provider JSON vs HourlySeries.
+
+    python -m benchmarks.bench_hourly_series
+"""
+import json
+import time
+import tracemalloc
+
+from benchmarks.stub_upstreams import nasa_point_payload, open_meteo_payload
+from services.hourlySeries import HourlySeries
+
+ENTRIES = 500
+
+
+def measure_memory(build):
+    # json round trip so we measure freshly parsed objects, like the cache holds after a fetch
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [build(i) for i in range(ENTRIES)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return size / ENTRIES
+
+
+def read_raw_nasa(payload, day):
+    # what get_historical_data used to do for every hour
+    properties = payload["properties"]["parameter"]
+    total = 0.0
+    for hour in range(24):
+        time_key = f"{day}{hour:02d}"
+        if "T2M" in properties and time_key in properties["T2M"]:
+            total += properties["T2M"][time_key]
+            total += properties["PRECTOTCORR"].get(time_key, 0) if "PRECTOTCORR" in properties else 0
+            total += properties["WS2M"].get(time_key, 0) if "WS2M" in properties else 0
+            total += properties["RH2M"].get(time_key) if "RH2M" in properties else 0
+    return total
+
+
+def read_series(series, day):
+    total = 0.0
+    for _, temperature, precipitation, wind_speed, humidity in series.rows(series.indices_for_day(day)):
+        if temperature is not None:
+            total += temperature + (precipitation or 0) + (wind_speed or 0) + (humidity or 0)
+    return total
+
+
+def main(rounds=20000):
+    def raw_nasa(i):
+        return json.loads(json.dumps(nasa_point_payload(20 + i * 0.01, 90.0, "20240601", "20240601")))
+
+    def raw_open_meteo(i):
+        return json.loads(json.dumps(open_meteo_payload(20 + i * 0.01, 90.0, "2024-06-01", "2024-06-01")))
+
+    print(f"{'entry':<28}{'bytes/entry':>12}")
+    print(f"{'NASA raw JSON':<28}{measure_memory(raw_nasa):>12.0f}")
+    print(f"{'NASA HourlySeries':<28}{measure_memory(lambda i: HourlySeries.from_nasa(raw_nasa(i))):>12.0f}")
+    print(f"{'Open-Meteo raw JSON':<28}{measure_memory(raw_open_meteo):>12.0f}")
+    print(f"{'Open-Meteo HourlySeries':<28}{measure_memory(lambda i: HourlySeries.from_open_meteo(raw_open_meteo(i))):>12.0f}")
+
+    payload = raw_nasa(0)
+    series = HourlySeries.from_nasa(payload)
+    day = series.start.date()
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        read_raw_nasa(payload, "20240601")
+    raw_us = (time.perf_counter() - start) / rounds * 1e6
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        read_series(series, day)
+    series_us = (time.perf_counter() - start) / rounds * 1e6
+
+    print(f"\n24-hour read, raw dict probes: {raw_us:.1f} us, HourlySeries: {series_us:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
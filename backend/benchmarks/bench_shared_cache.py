@@ -0,0 +1,91 @@
+"""
+Upstream calls per node with and without the shared L2 cache tier.
+
+    python -m benchmarks.bench_shared_cache
+
+Several app "nodes" (separate processes, each with its own cache/ folder) serve the same popular
+cities at the same time. Without the shared tier every node fetches every city itself; with it
+(a local RESP stand-in here) a city should be fetched about once for the whole fleet.
+"""
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+NODES = 4
+THREADS_PER_NODE = 8
+CITIES = 30
+REQUESTS_PER_NODE = 240
+STUB_LATENCY = 0.15
+
+
+def node(env, stub_url, seed, results):
+    os.environ.update(env)
+    import contextlib
+    import io
+
+    from benchmarks.stub_upstreams import point_clients_at
+    from services import registry
+    from services.upstreamScheduler import scheduler
+
+    point_clients_at(stub_url)
+    scheduler.limits.update({"nasa_power": (10000.0, 10000), "open_meteo": (10000.0, 10000)})
+    nasa, forecast = registry.get_nasa_client(), registry.get_forecast_client()
+
+    # the same popular cities on every node, in a different order
+    rng = random.Random(seed)
+    cities = [(23.0 + (i % 6) * 0.5, 88.125 + (i // 6) * 0.625) for i in range(CITIES)]
+    picks = [rng.choice(cities) for _ in range(REQUESTS_PER_NODE)]
+
+    def one(city):
+        lat, lon = city
+        assert nasa.get_hourly_weather_data(lat, lon, "20240601", "20240601") is not None
+        assert forecast.get_hourly_forecast(lat, lon, "2024-06-02", "2024-06-02") is not None
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=THREADS_PER_NODE) as pool:
+        list(pool.map(one, picks))
+    elapsed = time.perf_counter() - started
+
+    calls = sum(counters["admitted"] for provider in scheduler.stats().values() for counters in provider["by_priority"].values())
+    results.put((seed, calls, elapsed))
+
+
+def run_fleet(stub_url, shared_url):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = []
+    for seed in range(NODES):
+        env = {"CACHE_DIR": tempfile.mkdtemp(prefix=f"bench_shared_node{seed}_"), "SHARED_CACHE_URL": shared_url}
+        process = context.Process(target=node, args=(env, stub_url, seed, results))
+        process.start()
+        processes.append(process)
+    rows = sorted(results.get(timeout=300) for _ in processes)
+    for process in processes:
+        process.join()
+    return rows
+
+
+def main():
+    from benchmarks.resp_stub import start_resp_stub
+    from benchmarks.stub_upstreams import start_stub
+
+    stub = start_stub(latency=STUB_LATENCY)
+    resp = start_resp_stub()
+
+    print(f"{NODES} nodes x {REQUESTS_PER_NODE} requests over {CITIES} cities (NASA + forecast each), stub latency {STUB_LATENCY}s")
+    print(f"{'mode':<14}{'upstream calls per node':<28}{'total':>7}{'slowest node s':>16}")
+    for mode, shared_url in (("local only", ""), ("shared L2", resp.url)):
+        before = sum(stub.calls.values())
+        rows = run_fleet(stub.base_url, shared_url)
+        per_node = [calls for _, calls, _ in rows]
+        total = sum(stub.calls.values()) - before
+        print(f"{mode:<14}{str(per_node):<28}{total:>7}{max(e for _, _, e in rows):>16.2f}")
+    print(f"RESP commands: {resp.commands}")
+
+
+if __name__ == "__main__":
+    main()
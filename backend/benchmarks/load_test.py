@@ -0,0 +1,119 @@
+"""
+Goodput under overload for /api/weather/hourly.
+
+    python -m benchmarks.load_test               # with admission control
+    python -m benchmarks.load_test --no-admission
+
+Upstreams are local stubs with a fixed capacity (max concurrency / latency). Requests are sent
+open loop at rising rates past that capacity. Goodput = 200 responses answered within the SLO, per second.
+With admission control goodput should stay near capacity while the extra load gets fast 503s.
+"""
+import argparse
+import itertools
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+STUB_LATENCY = 0.2
+STUB_CONCURRENCY = 8
+SLO_SECONDS = 2.0
+
+
+def configure_env(no_admission):
+    os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="load_test_cache_")
+    os.environ["ADMISSION_CLIENT_RATE"] = "1000000"  # every request comes from 127.0.0.1
+    os.environ["ADMISSION_CLIENT_BURST"] = "1000000"
+    os.environ["ADMISSION_DEADLINE_SECONDS"] = str(SLO_SECONDS)
+    if no_admission:
+        os.environ["ADMISSION_MAX_IN_FLIGHT_HOURLY"] = "100000"
+
+
+def start_app():
+    from werkzeug.serving import make_server
+
+    import app as app_module
+
+    server = make_server("127.0.0.1", 0, app_module.create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run_level(base_url, rate, duration, counter):
+    import requests
+
+    results = []
+    lock = threading.Lock()
+    session_local = threading.local()
+
+    def one_request():
+        session = getattr(session_local, "session", None)
+        if session is None:
+            session = session_local.session = requests.Session()
+        # one grid cell per request (NASA cache keys are per 0.5° x 0.625° cell), so every request
+        # misses the cache and reaches the upstream stub
+        n = next(counter)
+        lat = -80 + (n % 320) * 0.5
+        lon = -180 + (n // 320 % 576) * 0.625
+        started = time.perf_counter()
+        try:
+            params = {"lat": f"{lat:.3f}", "lon": f"{lon:.3f}", "date": "2024-06-01"}
+            status = session.get(f"{base_url}/api/weather/hourly", params=params, timeout=30).status_code
+        except Exception:
+            status = 0
+        with lock:
+            results.append((status, time.perf_counter() - started))
+
+    with ThreadPoolExecutor(max_workers=512) as pool:
+        start = time.perf_counter()
+        for i in range(int(rate * duration)):
+            # open loop: send on schedule, whether or not earlier requests came back
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(one_request)
+
+    good = [latency for status, latency in results if status == 200 and latency <= SLO_SECONDS]
+    shed = sum(1 for status, _ in results if status in (429, 503))
+    failed = len(results) - len(good) - shed
+    good.sort()
+    p50 = good[len(good) // 2] if good else float("nan")
+    return len(good) / duration, shed, failed, p50
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Goodput under overload")
+    parser.add_argument("--no-admission", action="store_true", help="disable the in-flight limit for comparison")
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    configure_env(args.no_admission)
+    # the app prints a lot per request, keep only our table on the terminal
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    out, sys.stdout = sys.stdout, open(os.devnull, "w")
+
+    from benchmarks.stub_upstreams import point_clients_at, start_stub
+    from services.upstreamScheduler import scheduler
+
+    stub = start_stub(latency=STUB_LATENCY, max_concurrency=STUB_CONCURRENCY)
+    point_clients_at(stub.base_url)
+    scheduler.limits["nasa_power"] = (1e6, 1e6)  # we are measuring the API server, not the upstream quota
+    _, base_url = start_app()
+
+    capacity = STUB_CONCURRENCY / STUB_LATENCY
+    print(f"Upstream capacity ≈ {capacity:.0f} req/s, SLO {SLO_SECONDS}s, admission {'off' if args.no_admission else 'on'}", file=out)
+    print(f"{'offered/s':>10}{'goodput/s':>11}{'shed':>7}{'failed':>8}{'p50 ok':>9}", file=out)
+
+    counter = itertools.count()
+    for factor in (0.5, 1.0, 1.5, 2.0, 3.0):
+        rate = capacity * factor
+        goodput, shed, failed, p50 = run_level(base_url, rate, args.duration, counter)
+        print(f"{rate:>10.0f}{goodput:>11.1f}{shed:>7}{failed:>8}{p50:>9.2f}", file=out, flush=True)
+        time.sleep(SLO_SECONDS)  # let the previous level drain
+
+
+if __name__ == "__main__":
+    sys.exit(main())
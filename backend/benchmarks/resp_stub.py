@@ -0,0 +1,114 @@
+"""
+Tiny in-memory server speaking enough of the Redis protocol (RESP) for the shared cache tier:
+PING, GET, SET [EX|PX] [NX], DEL, EXISTS, SELECT, AUTH, DBSIZE, FLUSHALL. For benchmarks, not for production.
+
+    python -m benchmarks.resp_stub --port 6390
+    SHARED_CACHE_URL=redis://127.0.0.1:6390/0 python app.py
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class RespStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, _Handler)
+        self.data = {}  # key -> (value, expires at monotonic time or None)
+        self.lock = threading.Lock()
+        self.commands = {}
+
+    @property
+    def url(self):
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+    def _live(self, key, now):
+        item = self.data.get(key)
+        if item is not None and item[1] is not None and item[1] <= now:
+            del self.data[key]
+            return None
+        return item
+
+    def execute(self, args):
+        name = args[0].upper().decode()
+        with self.lock:
+            self.commands[name] = self.commands.get(name, 0) + 1
+            now = time.monotonic()
+            if name == "PING":
+                return "+PONG"
+            if name in ("SELECT", "AUTH"):
+                return "+OK"
+            if name == "GET":
+                item = self._live(args[1], now)
+                return None if item is None else item[0]
+            if name == "SET":
+                key, value, options = args[1], args[2], [a.upper() for a in args[3:]]
+                expires = None
+                if b"PX" in options:
+                    expires = now + int(options[options.index(b"PX") + 1]) / 1000
+                elif b"EX" in options:
+                    expires = now + int(options[options.index(b"EX") + 1])
+                if b"NX" in options and self._live(key, now) is not None:
+                    return None
+                self.data[key] = (value, expires)
+                return "+OK"
+            if name == "DEL":
+                return sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+            if name == "EXISTS":
+                return sum(1 for key in args[1:] if self._live(key, now) is not None)
+            if name == "DBSIZE":
+                return len(self.data)
+            if name == "FLUSHALL":
+                self.data.clear()
+                return "+OK"
+        return f"-ERR unknown command '{name}'"
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        while True:
+            try:
+                args = self._read_command()
+            except (ValueError, ConnectionError):
+                return
+            if args is None:
+                return
+            reply = self.server.execute(args)
+            if reply is None:
+                out = b"$-1\r\n"
+            elif isinstance(reply, int):
+                out = b":%d\r\n" % reply
+            elif isinstance(reply, bytes):
+                out = b"$%d\r\n%s\r\n" % (len(reply), reply)
+            else:
+                out = reply.encode() + b"\r\n"
+            self.wfile.write(out)
+
+
+def start_resp_stub(port=0):
+    server = RespStub(("127.0.0.1", port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-memory RESP stand-in for the shared cache tier")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    server = RespStub(("127.0.0.1", args.port))
+    print(f"🧪 RESP stub on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,186 @@
+"""
+Local stand-ins for NASA POWER, Open-Meteo and Nominatim so benchmarks never touch the real APIs.
+
+    python -m benchmarks.stub_upstreams --port 8765 --latency 0.2
+    python -m benchmarks.stub_upstreams --regional-payload recorded_regional.json
+
+Payloads have the same shape as the real services; values are synthetic but deterministic,
+unless a recorded regional payload is given, which is then served for every regional request.
+"""
+import argparse
+import datetime
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def _synthetic_hour(lat, lon, stamp):
+    # smooth, location dependent values so neighbouring cells differ a little
+    seed = (lat * 7.1 + lon * 3.3 + stamp.timetuple().tm_yday) % 10
+    hour = stamp.hour
+    return {
+        "T2M": round(15 + seed + 8 * abs(12 - hour) / 12 * -1 + 4, 2),
+        "PRECTOTCORR": round(max(0.0, (seed - 6) * 2.5) if hour % 5 == 0 else 0.0, 2),
+        "WS2M": round(2 + seed * 0.8 + hour % 4, 2),
+        "RH2M": round(40 + seed * 4 + hour % 6, 2),
+    }
+
+
+def _hours(start, end):
+    day = datetime.datetime.strptime(start, "%Y%m%d")
+    last = datetime.datetime.strptime(end, "%Y%m%d") + datetime.timedelta(days=1)
+    while day < last:
+        yield day
+        day += datetime.timedelta(hours=1)
+
+
+def nasa_point_payload(lat, lon, start, end):
+    parameter = {"T2M": {}, "PRECTOTCORR": {}, "WS2M": {}, "RH2M": {}}
+    for stamp in _hours(start, end):
+        key = stamp.strftime("%Y%m%d%H")
+        for name, value in _synthetic_hour(lat, lon, stamp).items():
+            parameter[name][key] = value
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [lon, lat, 10.0]},
+        "properties": {"parameter": parameter},
+        "header": {"title": "NASA/POWER stub", "start": start, "end": end, "fill_value": -999.0},
+    }
+
+
+def nasa_regional_payload(lat_min, lat_max, lon_min, lon_max, start, end, lat_step=0.5, lon_step=0.625):
+    # like the real API, one feature per grid cell centre inside the box
+    features = []
+    for i in range(math.ceil(lat_min / lat_step - 1e-9), math.floor(lat_max / lat_step + 1e-9) + 1):
+        for j in range(math.ceil(lon_min / lon_step - 1e-9), math.floor(lon_max / lon_step + 1e-9) + 1):
+            point = nasa_point_payload(round(i * lat_step, 4), round(j * lon_step, 4), start, end)
+            features.append({k: point[k] for k in ("type", "geometry", "properties")})
+    return {"type": "FeatureCollection", "features": features, "header": {"title": "NASA/POWER regional stub"}}
+
+
+def open_meteo_payload(lat, lon, start_date, end_date):
+    start = start_date.replace("-", "")
+    end = end_date.replace("-", "")
+    hourly = {"time": [], "temperature_2m": [], "precipitation": [], "relative_humidity_2m": [], "windspeed_10m": []}
+    for stamp in _hours(start, end):
+        values = _synthetic_hour(lat, lon, stamp)
+        hourly["time"].append(stamp.strftime("%Y-%m-%dT%H:%M"))
+        hourly["temperature_2m"].append(values["T2M"])
+        hourly["precipitation"].append(values["PRECTOTCORR"])
+        hourly["relative_humidity_2m"].append(values["RH2M"])
+        hourly["windspeed_10m"].append(values["WS2M"])
+    return {"latitude": lat, "longitude": lon, "timezone": "GMT", "hourly": hourly}
+
+
+class StubUpstreams(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, max_concurrency=None, regional_payload=None):
+        super().__init__(address, _Handler)
+        self.regional_payload = regional_payload
+        # latency is a number of seconds or a callable returning one, per request
+        self.latency = latency
+        self.slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        pass  # callers that hit their deadline hang up early, that is expected here
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, path):
+        with self._lock:
+            self.calls[path] = self.calls.get(path, 0) + 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.server.count(url.path)
+
+        if self.server.slots:
+            self.server.slots.acquire()
+        try:
+            latency = self.server.latency() if callable(self.server.latency) else self.server.latency
+            time.sleep(latency)
+            body = self._route(url.path, query)
+        finally:
+            if self.server.slots:
+                self.server.slots.release()
+
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self, path, query):
+        if path.endswith("/temporal/hourly/point"):
+            return nasa_point_payload(float(query["latitude"]), float(query["longitude"]), query["start"], query["end"])
+        if path.endswith("/temporal/hourly/regional"):
+            if self.server.regional_payload is not None:
+                return self.server.regional_payload
+            return nasa_regional_payload(
+                float(query["latitude-min"]), float(query["latitude-max"]),
+                float(query["longitude-min"]), float(query["longitude-max"]),
+                query["start"], query["end"],
+            )
+        if path.endswith("/v1/forecast"):
+            return open_meteo_payload(float(query["latitude"]), float(query["longitude"]), query["start_date"], query["end_date"])
+        if path.endswith("/search"):
+            return [{"lat": "23.8103", "lon": "90.4125", "display_name": query.get("q", "")}]
+        return None
+
+
+def start_stub(latency=0.0, max_concurrency=None, port=0, regional_payload=None):
+    server = StubUpstreams(("127.0.0.1", port), latency=latency, max_concurrency=max_concurrency, regional_payload=regional_payload)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def point_clients_at(base_url):
+    """
+    Send every upstream client to the stub instead of the real services.
+    """
+    from services import locationService
+    from services.forecastService import ForecastClient
+    from services.nasaPower import NasaPowerClient
+
+    NasaPowerClient.HOURLY_BASE_URL = f"{base_url}/api/temporal/hourly/point"
+    NasaPowerClient.DAILY_BASE_URL = f"{base_url}/api/temporal/daily/point"
+    ForecastClient.BASE_URL = f"{base_url}/v1/forecast"
+    locationService.NOMINATIM_URL = f"{base_url}/search"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    parser.add_argument("--regional-payload", help="recorded regional FeatureCollection (JSON file) to serve")
+    args = parser.parse_args()
+
+    regional_payload = None
+    if args.regional_payload:
+        with open(args.regional_payload, "r") as f:
+            regional_payload = json.load(f)
+
+    server = StubUpstreams(("127.0.0.1", args.port), latency=args.latency, max_concurrency=args.max_concurrency,
+                           regional_payload=regional_payload)
+    print(f"🧪 Stub upstreams on {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,23 @@
+"""
+Gunicorn settings, picked up automatically when gunicorn is started from backend/:
+
+    gunicorn app:app
+
+/api/weather/stream holds its thread for as long as the client stays connected, so the default sync
+worker (one request at a time) would be taken over by a single live subscriber. Threaded workers keep
+serving other requests, and live streams are capped below the thread count of each worker so some
+threads are always left for normal requests.
+"""
+import os
+
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 32))
+# a stream is one long response, not an idle connection: the worker timeout does not cut it
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+
+# the upstream rate limits are per process, each worker takes its share (services.upstreamScheduler)
+os.environ.setdefault("UPSTREAM_PROCESSES", str(workers))
+# per worker process: at most half the threads may be held by live streams
+os.environ.setdefault("LIVE_MAX_SUBSCRIBERS", str(max(1, threads // 2)))
@@ -1,19 +1,40 @@
 # Make services a proper Python package
-from .nasaPower import NasaPowerClient  # "." is means present folder. we import a class or a function..
-from .riskCalculator import RiskCalculator
-from .caching import cache_response, get_cached_response
-from .forecastService import ForecastClient
-from .locationService import get_coordinates
-from .weatherCondition import WeatherConditionClassifier
+# Names are resolved lazily (PEP 562) so "import services" does not pull in requests or read config files.
+# "from services import NasaPowerClient" still works, the module is imported on first access.
+import importlib
 
-__all__ = [
-    "NasaPowerClient",
-    "RiskCalculator",
-    "cache_response",
-    "get_cached_response",
-    "ForecastClient",
-    "get_coordinates",
-    "WeatherConditionClassifier"
-]
+_EXPORTS = {
+    "NasaPowerClient": ".nasaPower",  # "." is means present folder. we import a class or a function..
+    "RiskCalculator": ".riskCalculator",
+    "cache_response": ".caching",
+    "get_cached_response": ".caching",
+    "get_or_fetch": ".caching",
+    "ForecastClient": ".forecastService",
+    "get_coordinates": ".locationService",
+    "WeatherConditionClassifier": ".weatherCondition",
+    "init_compression": ".compression",
+    "get_nasa_client": ".registry",
+    "get_forecast_client": ".registry",
+    "get_risk_calculator": ".registry",
+    "get_condition_classifier": ".registry",
+    "get_forecast_source": ".registry",
+    "get_historical_source": ".registry",
+    "upstream_priority": ".upstreamScheduler",
+    "scheduled_get": ".upstreamScheduler",
+    "ingest_region": ".regionalIngest",
+    "live_hub": ".liveUpdates",
+    "HourlySeries": ".hourlySeries",
+    "alert_engine": ".riskAlerts",
+    "export_chunks": ".bulkExport",
+}
 
+__all__ = list(_EXPORTS)
  # it define if we use "from services import * " then which which function and class will be imported
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value  # next access skips __getattr__
+    return value
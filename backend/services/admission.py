@@ -0,0 +1,140 @@
+import functools
+import math
+import os
+import threading
+import time
+
+from .deadline import deadline_exceeded, request_deadline
+from .tokenBucket import TokenBucket
+
+# Per client (IP) request rate, requests per second and burst
+CLIENT_RATE = float(os.environ.get("ADMISSION_CLIENT_RATE", 5))
+CLIENT_BURST = int(os.environ.get("ADMISSION_CLIENT_BURST", 20))
+# Only trust X-Forwarded-For when we run behind our own proxy
+TRUST_PROXY = os.environ.get("ADMISSION_TRUST_PROXY", "0") == "1"
+# End-to-end budget for one API request, upstream calls included
+REQUEST_DEADLINE_SECONDS = float(os.environ.get("ADMISSION_DEADLINE_SECONDS", 20))
+# Idle client buckets are forgotten after this long so the table does not grow forever
+CLIENT_IDLE_SECONDS = 300
+
+
+class ClientRateLimiter:
+    def __init__(self, rate=CLIENT_RATE, burst=CLIENT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+
+    def allow(self, client_id):
+        """
+        Returns (allowed, retry_after_seconds).
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_prune > CLIENT_IDLE_SECONDS:
+                self._prune(now)
+
+            bucket = self._buckets.get(client_id)
+            if bucket is None:
+                bucket = self._buckets[client_id] = TokenBucket(self.rate, self.burst)
+            if bucket.try_take(now):
+                return True, 0
+            return False, bucket.time_until_token(now)
+
+    def _prune(self, now):
+        idle = [client for client, bucket in self._buckets.items() if now - bucket.updated > CLIENT_IDLE_SECONDS]
+        for client in idle:
+            del self._buckets[client]
+        self._last_prune = now
+
+
+class InFlightLimiter:
+    """
+    Bounded number of requests being worked on for one endpoint. Anything over the limit is
+    rejected straight away instead of queueing behind slow upstream calls.
+    """
+
+    def __init__(self, name, max_in_flight):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self.counters = {"admitted": 0, "rejected_overload": 0, "rejected_rate": 0, "deadline_exceeded": 0}
+
+    def try_enter(self):
+        return self._slots.acquire(blocking=False)
+
+    def leave(self):
+        self._slots.release()
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return {"max_in_flight": self.max_in_flight, **self.counters}
+
+
+# Global per-client limiter shared by every endpoint, and one in-flight limiter per endpoint
+client_limiter = ClientRateLimiter()
+endpoint_limiters = {}
+
+
+def client_id(request):
+    if TRUST_PROXY and request.headers.get("X-Forwarded-For"):
+        return request.headers["X-Forwarded-For"].split(",")[0].strip()
+    return request.remote_addr or "unknown"
+
+
+def _reject(status, message, retry_after):
+    from flask import jsonify
+
+    response = jsonify({"error": message})
+    response.status_code = status
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def admission_controlled(name, max_in_flight, deadline_seconds=REQUEST_DEADLINE_SECONDS):
+    """
+    Decorator for Flask views: per-client rate limit (429), bounded in-flight requests (503)
+    and an end-to-end deadline that the upstream clients respect (504 when it runs out).
+    """
+    max_in_flight = int(os.environ.get(f"ADMISSION_MAX_IN_FLIGHT_{name.upper()}", max_in_flight))
+    limiter = endpoint_limiters[name] = InFlightLimiter(name, max_in_flight)
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import request
+
+            allowed, retry_after = client_limiter.allow(client_id(request))
+            if not allowed:
+                limiter.count("rejected_rate")
+                return _reject(429, "Too many requests, slow down", retry_after)
+
+            if not limiter.try_enter():
+                limiter.count("rejected_overload")
+                return _reject(503, "Server busy, try again shortly", 1)
+
+            try:
+                limiter.count("admitted")
+                with request_deadline(deadline_seconds):
+                    response = view(*args, **kwargs)
+                    if deadline_exceeded():
+                        # upstream calls were cut short, whatever we built is incomplete
+                        limiter.count("deadline_exceeded")
+                        return _reject(504, "Upstream data took too long, try again", 1)
+                    return response
+            finally:
+                limiter.leave()
+
+        return wrapper
+
+    return decorator
+
+
+def admission_stats():
+    return {name: limiter.stats() for name, limiter in endpoint_limiters.items()}
@@ -0,0 +1,315 @@
+"""
+Streaming export of scored hourly history for many sites and long date ranges.
+
+    python -m services.bulkExport --location 23.81,90.41,dhaka --location 22.36,91.78,chittagong \
+        --start 2024-01-01 --end 2024-06-30 --format csv --output history.csv
+
+Work goes window by window (EXPORT_WINDOW_DAYS days of one site): cached NASA days are read without
+being kept in memory, the missing ones are fetched with one NASA request per run of consecutive days
+and cached per day (same keys as the hourly endpoint and regional ingestion), then the whole window is
+scored in one batch and written out. Only one window is held at a time, whatever the export size.
+"""
+import argparse
+import contextlib
+import csv
+import datetime
+import io
+import json
+import os
+import sys
+import threading
+
+from .caching import cache
+from .hourlySeries import HourlySeries
+from .upstreamScheduler import REFRESH, upstream_priority
+
+EXPORT_WINDOW_DAYS = int(os.environ.get("EXPORT_WINDOW_DAYS", 31))
+MAX_LOCATIONS = int(os.environ.get("EXPORT_MAX_LOCATIONS", 200))
+MAX_DAYS = int(os.environ.get("EXPORT_MAX_DAYS", 3660))
+# Exports run long after the view returned, so they get their own limit instead of the admission one
+MAX_CONCURRENT_EXPORTS = int(os.environ.get("EXPORT_MAX_CONCURRENT", 2))
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+FIELDS = (
+    "site", "latitude", "longitude", "time", "temperature", "precipitation", "wind_speed", "humidity",
+    "overall_risk", "summary", "temperature_risk", "precipitation_risk", "wind_risk", "humidity_risk", "condition", "source",
+)
+
+export_slots = threading.BoundedSemaphore(MAX_CONCURRENT_EXPORTS)
+
+
+class ExportError(ValueError):
+    pass
+
+
+def _load_pyarrow():
+    # pyarrow is optional and heavy, only the parquet format imports it
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def parse_export_request(data):
+    """
+    Validate {"locations": [{"lat", "lon", "name"?}], "start": "YYYY-MM-DD", "end": "YYYY-MM-DD", "format": "csv"}.
+    Returns (locations as [(name, lat, lon)], start date, end date, format) or raises ExportError.
+    """
+    raw_locations = data.get("locations")
+    if not isinstance(raw_locations, list) or not raw_locations:
+        raise ExportError("locations must be a non-empty list of {lat, lon, name}")
+    if len(raw_locations) > MAX_LOCATIONS:
+        raise ExportError(f"at most {MAX_LOCATIONS} locations per export")
+
+    locations = []
+    for i, location in enumerate(raw_locations):
+        try:
+            latitude, longitude = float(location["lat"]), float(location["lon"])
+        except (KeyError, TypeError, ValueError):
+            raise ExportError(f"location {i} needs numeric lat and lon")
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ExportError(f"location {i} is out of range")
+        locations.append((str(location.get("name") or f"{latitude},{longitude}"), latitude, longitude))
+
+    try:
+        start = datetime.datetime.strptime(data.get("start", ""), "%Y-%m-%d").date()
+        end = datetime.datetime.strptime(data.get("end", ""), "%Y-%m-%d").date()
+    except ValueError:
+        raise ExportError("start and end are required, format YYYY-MM-DD")
+    if start > end:
+        raise ExportError("start must not be after end")
+    if end > datetime.datetime.now(datetime.timezone.utc).date():
+        raise ExportError("the export covers history only, end must not be in the future")
+    if (end - start).days + 1 > MAX_DAYS:
+        raise ExportError(f"at most {MAX_DAYS} days per export")
+
+    fmt = data.get("format", "csv")
+    if fmt not in FORMATS:
+        raise ExportError(f"format must be one of {sorted(FORMATS)}")
+    if fmt == "parquet" and _load_pyarrow() is None:
+        raise ExportError("parquet export needs pyarrow installed on the server")
+    return locations, start, end, fmt
+
+
+def _windows(start, end, days=EXPORT_WINDOW_DAYS):
+    while start <= end:
+        window_end = min(start + datetime.timedelta(days=days - 1), end)
+        yield [start + datetime.timedelta(days=i) for i in range((window_end - start).days + 1)]
+        start = window_end + datetime.timedelta(days=1)
+
+
+def _runs(days):
+    # consecutive days grouped, one upstream request each
+    run = []
+    for day in days:
+        if run and day - run[-1] != datetime.timedelta(days=1):
+            yield run
+            run = []
+        run.append(day)
+    if run:
+        yield run
+
+
+def _load_window(client, latitude, longitude, days, summary):
+    """
+    {day: HourlySeries} for the window: cached days as they are, missing ones fetched in bulk and cached per day.
+    """
+    by_day, missing = {}, []
+    for day in days:
+        day_str = day.strftime("%Y%m%d")
+        cached = cache.get(client.hourly_cache_key(latitude, longitude, day_str, day_str), promote=False)
+        if isinstance(cached, dict):
+            cached = HourlySeries.from_nasa(cached)  # older raw JSON entry
+        if cached is not None:
+            by_day[day] = cached
+            summary["days_cached"] += 1
+        else:
+            missing.append(day)
+
+    for run in _runs(missing):
+        run_start, run_end = run[0].strftime("%Y%m%d"), run[-1].strftime("%Y%m%d")
+        summary["upstream_requests"] += 1
+        fetched = client.fetch_hourly_range(latitude, longitude, run_start, run_end)
+        if fetched is None:
+            summary["days_failed"] += len(run)
+            print(f"❌ Export could not fetch {run_start}..{run_end} for {latitude},{longitude}, those days are left out")
+            continue
+        for day in run:
+            day_series = fetched.slice(fetched.indices_for_day(day))
+            by_day[day] = day_series
+            summary["days_fetched"] += 1
+            if len(day_series) and day_series.missing_hours() < len(day_series):  # not yet published days are not cached
+                day_str = day.strftime("%Y%m%d")
+                cache.set(client.hourly_cache_key(latitude, longitude, day_str, day_str), day_series, keep_in_memory=False)
+    return by_day
+
+
+def scored_batches(locations, start, end, client=None, risk_calculator=None, condition_classifier=None, summary=None):
+    """
+    Yields one list of row tuples (in FIELDS order) per site and window.
+    """
+    from .registry import get_condition_classifier, get_nasa_client, get_risk_calculator
+
+    client = client or get_nasa_client()
+    risk_calculator = risk_calculator or get_risk_calculator()
+    condition_classifier = condition_classifier or get_condition_classifier()
+    summary = {} if summary is None else summary
+    for name in ("rows", "days_cached", "days_fetched", "days_failed", "upstream_requests"):
+        summary.setdefault(name, 0)
+
+    for site, latitude, longitude in locations:
+        for days in _windows(start, end):
+            with upstream_priority(REFRESH):
+                by_day = _load_window(client, latitude, longitude, days, summary)
+
+            hours = []
+            for day in days:
+                series = by_day.get(day)
+                if series is None:
+                    continue
+                for index, t, p, w, h in series.rows(series.indices_for_day(day)):
+                    if t is not None:  # an hour without temperature cannot be scored
+                        hours.append((series.iso_time(index), series.source, t, p or 0, w or 0, h))
+            if not hours:
+                continue
+
+            # the whole window is scored in one go
+            risks = risk_calculator.calculate_batch([hour[2:] for hour in hours])
+            with_humidity = [hour[2:] for hour in hours if hour[5] is not None]
+            conditions = iter(condition_classifier.get_conditions(with_humidity))
+
+            batch = []
+            for (time_label, source, t, p, w, h), risk in zip(hours, risks):
+                condition = next(conditions) if h is not None else None
+                batch.append((site, latitude, longitude, time_label, t, p, w, h, *risk, condition, source))
+            summary["rows"] += len(batch)
+            yield batch
+
+
+def csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()  # header only, nothing matched
+
+
+def ndjson_chunks(batches):
+    for batch in batches:
+        yield "".join(json.dumps(dict(zip(FIELDS, row))) + "\n" for row in batch)
+
+
+class _DrainedSink:
+    """
+    File-like target for ParquetWriter that keeps only what was written since the last drain().
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def parquet_chunks(batches):
+    pa = _load_pyarrow()
+    schema = pa.schema([
+        ("site", pa.string()), ("latitude", pa.float64()), ("longitude", pa.float64()), ("time", pa.timestamp("s")),
+        ("temperature", pa.float64()), ("precipitation", pa.float64()), ("wind_speed", pa.float64()), ("humidity", pa.float64()),
+        ("overall_risk", pa.string()), ("summary", pa.string()), ("temperature_risk", pa.string()),
+        ("precipitation_risk", pa.string()), ("wind_risk", pa.string()), ("humidity_risk", pa.string()),
+        ("condition", pa.string()), ("source", pa.string()),
+    ])
+    sink = _DrainedSink()
+    writer = pa.parquet.ParquetWriter(sink, schema)
+    for batch in batches:
+        columns = {name: list(values) for name, values in zip(FIELDS, zip(*batch))}
+        columns["time"] = pa.array(columns["time"]).cast(pa.timestamp("s"))
+        writer.write_table(pa.Table.from_pydict(columns, schema=schema))  # one row group per window
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()  # footer
+
+
+def export_chunks(locations, start, end, fmt, summary=None, **kwargs):
+    """
+    Chunks (str for csv / ndjson, bytes for parquet) of the whole export, produced lazily.
+    """
+    writers = {"csv": csv_chunks, "ndjson": ndjson_chunks, "parquet": parquet_chunks}
+    return writers[fmt](scored_batches(locations, start, end, summary=summary, **kwargs))
+
+
+def _parse_location(value):
+    parts = value.split(",")
+    if len(parts) not in (2, 3):
+        raise argparse.ArgumentTypeError("use LAT,LON or LAT,LON,NAME")
+    return {"lat": parts[0], "lon": parts[1], "name": parts[2] if len(parts) == 3 else None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export scored hourly history for many sites")
+    parser.add_argument("--location", action="append", type=_parse_location, default=[], help="LAT,LON[,NAME], repeatable")
+    parser.add_argument("--locations-file", help="CSV file with lat,lon[,name] columns and a header row")
+    parser.add_argument("--start", required=True, help="first day, YYYY-MM-DD")
+    parser.add_argument("--end", required=True, help="last day, YYYY-MM-DD")
+    parser.add_argument("--format", default="csv", choices=sorted(FORMATS))
+    parser.add_argument("--output", help="file to write, default stdout")
+    args = parser.parse_args(argv)
+
+    locations = list(args.location)
+    if args.locations_file:
+        with open(args.locations_file, newline="") as f:
+            locations.extend(csv.DictReader(f))
+    try:
+        locations, start, end, fmt = parse_export_request(
+            {"locations": locations, "start": args.start, "end": args.end, "format": args.format}
+        )
+    except ExportError as e:
+        parser.error(str(e))
+
+    summary = {}
+    with contextlib.ExitStack() as stack:
+        if args.output:
+            out = stack.enter_context(open(args.output, "wb"))
+        else:
+            out = sys.stdout.buffer
+        stack.enter_context(contextlib.redirect_stdout(sys.stderr))  # the clients log to stdout, keep the data clean
+        for chunk in export_chunks(locations, start, end, fmt, summary=summary):
+            out.write(chunk.encode() if isinstance(chunk, str) else chunk)
+        out.flush()
+        print(f"📦 Export done: {summary}")
+    return 0 if summary["days_failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
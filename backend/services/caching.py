@@ -1,23 +1,73 @@
 import os # to read join file
 import json  # (to create folder or to delete folder)
+import threading
 import time
 from datetime import datetime, timedelta # (to work with time and date... datetime-> present time....timedelta-> time addition or subtraction  )
+from .config import backend_path
+from .deadline import bounded_timeout, remaining_time
+from .hourlySeries import HourlySeries
+from .sharedCache import SharedCacheUnavailable, shared_cache_from_env
+
+# Bump when the stored form of any cached object changes, old entries in the shared tier are then simply not seen
+CACHE_SCHEMA_VERSION = 1
+# How long one node may hold the shared fill lock for a key (covers the slowest upstream timeout),
+# and how long the others wait for its result before fetching it themselves
+FILL_LOCK_SECONDS = float(os.environ.get("SHARED_CACHE_LOCK_SECONDS", 15))
+FILL_WAIT_SECONDS = float(os.environ.get("SHARED_CACHE_LOCK_WAIT", 3))
+FILL_POLL_SECONDS = 0.05
+
+# Objects that are not plain JSON say how to store them with a CACHE_CODEC name, to_cache() and from_cache()
+CODECS = {HourlySeries.CACHE_CODEC: HourlySeries}
+
+
+def encode_for_storage(data):
+    codec = getattr(data, "CACHE_CODEC", None)
+    if codec is None:
+        return data, None
+    return data.to_cache(), codec
+
+
+def decode_from_storage(data, codec):
+    if codec is None:
+        return data
+    return CODECS[codec].from_cache(data)
+
+
+class _Flight:
+    # one fetch in progress for a key, other threads wait for its result instead of fetching too
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
 
 # we are using cache to dont call api many times ...
 class HybridCache:
-    def __init__(self, cache_dir="cache"):
-        self.cache_dir = cache_dir # The cache folder path is stored as a class variable.
-        self._memory_cache = {}
+    """
+    memory -> cache/ folder -> shared L2 (optional, see services.sharedCache).
+    Reads go through the tiers in that order and fill the faster ones on the way back (read-through),
+    writes go to all of them (write-through). Every tier keeps the original expiry, not a fresh one.
+    """
 
+    def __init__(self, cache_dir=None, shared=None):
+        # absolute path so the cache does not move around with the working directory
+        self.cache_dir = cache_dir or os.environ.get("CACHE_DIR") or backend_path("cache")
+        self.shared = shared
+        self._memory_cache = {}
+        self._dir_ready = False  # folder is created on first write, not at import time
+        self._flights = {}
+        self._flights_lock = threading.Lock()
 
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)  # if the folder is not existed then it will create folder
+    def _ensure_cache_dir(self):
+        if not self._dir_ready:
+            os.makedirs(self.cache_dir, exist_ok=True)  # if the folder is not existed then it will create folder
+            self._dir_ready = True
 
     def _get_cache_path(self, key):
         return os.path.join(self.cache_dir, f"{key}.json") # private method...create the full path for the key
 
 
-    def get(self, key):  #To retrieve data from the cache.
+    def get(self, key, promote=True):  #To retrieve data from the cache.
+        # promote=False reads without keeping the entry in memory, for bulk readers that pass through many keys
         # 1. Check memory cache
         if key in self._memory_cache:
             cached_item = self._memory_cache[key]
@@ -28,9 +78,8 @@ class HybridCache:
 
         # 2. Check file cache
         cache_path = self._get_cache_path(key)  #Retrieving the file path with _get_cache_path.
-        if not os.path.exists(cache_path): # if there is no file then return none
-
-            return None
+        if not os.path.exists(cache_path): # if there is no file then ask the shared tier
+            return self._get_shared(key, promote)
 
         try:
             with open(cache_path, "r") as f: # open file "r" means read mode..
@@ -41,34 +90,76 @@ class HybridCache:
 
             if datetime.now() - mod_time > timedelta(hours=expiry_hours): # current time > expiry time then cache file will be deleted 
                 os.remove(cache_path)
-                return None
+                return self._get_shared(key, promote)
 
 
-            # If valid, load into memory too
-            data = cache_data["data"] # if cache is valid then stored data will be returned otherwise it will return null
-            expiry_time = time.time() + (expiry_hours * 3600)
-            self._memory_cache[key] = {"data": data, "expires": expiry_time}
+            # If valid, load into memory too, until the file entry itself expires
+            # if cache is valid then stored data will be returned otherwise it will return null
+            data = decode_from_storage(cache_data["data"], cache_data.get("codec"))
+            expiry_time = cache_data.get("expires_at")
+            if expiry_time is None:  # entry written before expires_at was stored
+                expiry_time = time.time() + (timedelta(hours=expiry_hours) - (datetime.now() - mod_time)).total_seconds()
+            if promote:
+                self._memory_cache[key] = {"data": data, "expires": expiry_time}
             return data
 
 
         except (FileNotFoundError, json.JSONDecodeError, KeyError):
             return None 
 
+    def _get_shared(self, key, promote=True):
+        # 3. Check the shared tier, a hit is copied into memory and file with the time it has left
+        if self.shared is None:
+            return None
+        try:
+            entry = self.shared.get(key)
+        except SharedCacheUnavailable:
+            return None
+        return self._accept_shared(key, entry, promote)
+
+    def _accept_shared(self, key, entry, promote=True):
+        if not entry or entry.get("expires_at", 0) <= time.time():
+            return None
+        try:
+            data = decode_from_storage(entry["data"], entry.get("codec"))
+        except (KeyError, TypeError, ValueError):
+            return None
+        if promote:
+            self._memory_cache[key] = {"data": data, "expires": entry["expires_at"]}
+        self._write_file(key, entry)
+        return data
+
 
-    def set(self, key, data, expiry_hours=24): #to save new cache
+    def set(self, key, data, expiry_hours=24, keep_in_memory=True): #to save new cache
         expiry_time = time.time() + (expiry_hours * 3600)
 
-        # 1. Save in memory
-        self._memory_cache[key] = {"data": data, "expires": expiry_time}
+        # 1. Save in memory (bulk writers skip this, they would fill it with entries nobody reads soon)
+        if keep_in_memory:
+            self._memory_cache[key] = {"data": data, "expires": expiry_time}
+
+        stored, codec = encode_for_storage(data)  # memory keeps the object, file and shared tier get its JSON form
+        cache_data = {
+            "data": stored,
+            "codec": codec,
+            "timestamp": datetime.now().isoformat(),
+            "expiry_hours": expiry_hours,
+            "expires_at": expiry_time,
+        }
 
-        # 2. Save in file
+        # 2. Save in shared tier, so the other nodes see it
+        if self.shared is not None:
+            try:
+                self.shared.set(key, cache_data, expiry_time - time.time())
+            except SharedCacheUnavailable:
+                pass
+
+        # 3. Save in file
+        return self._write_file(key, cache_data)
+
+    def _write_file(self, key, cache_data):
         cache_path = self._get_cache_path(key) # to find the cache path
         try:
-            cache_data = {
-                "data": data,
-                "timestamp": datetime.now().isoformat(),
-                "expiry_hours": expiry_hours,
-            }
+            self._ensure_cache_dir()
             with open(cache_path, "w") as f: # open cache file and "w" means write mood
                 json.dump(cache_data, f) # write puthon dict to JSON file
 
@@ -78,10 +169,91 @@ class HybridCache:
             print(f"Error writing cache file: {e}")
             return False
 
+    def get_or_compute(self, key, compute, expiry_hours=24):
+        """
+        Cached value for key, or compute() it (and cache it unless it is None).
+        Only one thread per process computes a key at a time, and with a shared tier only one node:
+        the others wait for its result instead of all calling the upstream at once (thundering herd).
+        """
+        data = self.get(key)
+        if data is not None:
+            return data
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait(timeout=bounded_timeout(FILL_WAIT_SECONDS + FILL_LOCK_SECONDS))
+            return flight.result
+
+        try:
+            flight.result = self._compute_once(key, compute, expiry_hours)
+            return flight.result
+        finally:
+            with self._flights_lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _compute_once(self, key, compute, expiry_hours):
+        token = None
+        if self.shared is not None:
+            try:
+                token = self.shared.try_lock(key, FILL_LOCK_SECONDS)
+                if token is None:
+                    # another node is fetching it, wait for its result
+                    data = self._wait_for_shared(key)
+                    if data is not None:
+                        return data
+            except SharedCacheUnavailable:
+                token = None  # shared tier failed, fetch it ourselves right away
+
+        try:
+            data = compute()
+            if data is not None:
+                self.set(key, data, expiry_hours)
+            return data
+        finally:
+            if token is not None:
+                self._release(key, token)
+
+    def _release(self, key, token):
+        # a lock left behind stalls every other node until it expires, so release it even when
+        # the shared set just failed (and switched the tier off); never let a failure here escape
+        try:
+            self.shared.unlock(key, token)
+        except Exception as e:
+            print(f"❌ Could not release shared fill lock for {key}: {e}")
+
+    @staticmethod
+    def _fill_wait_seconds():
+        # never longer than the lock can be held, and never more than half of what is left of the request,
+        # so there is still time to fetch it ourselves when the holder does not deliver
+        wait = min(FILL_WAIT_SECONDS, FILL_LOCK_SECONDS)
+        remaining = remaining_time()
+        return wait if remaining is None else max(0.0, min(wait, remaining / 2))
+
+    def _wait_for_shared(self, key):
+        """
+        Poll the shared tier for the lock holder's result. None when the wait ran out or the lock is gone
+        without a result; raises SharedCacheUnavailable as soon as the shared tier fails.
+        """
+        give_up_at = time.monotonic() + self._fill_wait_seconds()
+        while time.monotonic() < give_up_at:
+            time.sleep(FILL_POLL_SECONDS)
+            data = self._accept_shared(key, self.shared.get(key))
+            if data is not None:
+                return data
+            if not self.shared.is_locked(key):
+                return self._accept_shared(key, self.shared.get(key))  # holder finished (or failed), one last look
+        return None
 
 
 # Global cache instance
-cache = HybridCache() # here cache is a instance of SimpleCache(). we can call the packege function with it.
+# here cache is a instance of SimpleCache(). we can call the packege function with it.
+cache = HybridCache(shared=shared_cache_from_env(CACHE_SCHEMA_VERSION))
 
 
 
@@ -91,3 +263,7 @@ def cache_response(key, data, expiry_hours=24): # helper function to call set...
 
 def get_cached_response(key):
     return cache.get(key)
+
+
+def get_or_fetch(key, fetch, expiry_hours=24):
+    return cache.get_or_compute(key, fetch, expiry_hours)
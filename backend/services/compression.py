@@ -0,0 +1,222 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .deadline import deadline_exceeded
+
+try:  # brotli is optional, we fall back to gzip when it is not installed
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# small bodies are not worth the CPU, gzip header alone is ~20 bytes
+MIN_COMPRESS_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", 5))
+# How long a rendered API body (and its compressed variants) is served again without rebuilding it
+RENDERED_TTL_SECONDS = float(os.environ.get("COMPRESS_RENDERED_TTL", 300))
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/javascript",
+    "text/javascript",
+    "text/html",
+    "text/css",
+    "text/plain",
+    "image/svg+xml",
+}
+
+
+def supported_encodings():
+    # order is our preference when the client gives equal q-values
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Pick the best content-coding from an Accept-Encoding header, or None for identity.
+    """
+    if not accept_encoding:
+        return None
+
+    offered = {}
+    for part in accept_encoding.split(","):
+        pieces = part.strip().split(";")
+        coding = pieces[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in pieces[1:]:
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        offered[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in supported_encodings():
+        q = offered.get(coding, offered.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def encode_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        # mtime=0 so the same body always gives the same bytes
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+class EncodedPayloadCache:
+    """
+    Bounded LRU of response bodies, each entry holding the raw body and its compressed variants.
+    Views that name their response (render_cached) store the JSON here and skip rebuilding it on a hit;
+    every encoding is then compressed once and kept on the same entry. Other responses are keyed by
+    their ETag (static files) or, as a last resort, by a hash of the body.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> {"body", "expires", "variants": {encoding: bytes}}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _live_entry(self, key):
+        # caller holds the lock
+        entry = self._entries.get(key)
+        if entry is not None and entry["expires"] is not None and entry["expires"] <= time.monotonic():
+            del self._entries[key]
+            return None
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, entry):
+        # caller holds the lock
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_body(self, key):
+        with self._lock:
+            entry = self._live_entry(key)
+            return None if entry is None else entry["body"]
+
+    def put_body(self, key, body, ttl_seconds):
+        with self._lock:
+            self._store(key, {"body": body, "expires": time.monotonic() + ttl_seconds, "variants": {}})
+
+    def get_or_encode(self, body, encoding, key=None):
+        if key is None:
+            key = ("body", hashlib.blake2b(body, digest_size=16).digest())
+
+        with self._lock:
+            entry = self._live_entry(key)
+            encoded = None if entry is None else entry["variants"].get(encoding)
+            if encoded is not None:
+                self.hits += 1
+                return encoded
+            self.misses += 1
+
+        encoded = encode_body(body, encoding)
+
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                entry = {"body": None, "expires": None, "variants": {}}  # only the variants, the body is not ours to serve
+                self._store(key, entry)
+            entry["variants"][encoding] = encoded
+        return encoded
+
+
+# Global instance shared by all requests
+encoded_payloads = EncodedPayloadCache()
+
+
+def render_cached(key, build, ttl_seconds=RENDERED_TTL_SECONDS):
+    """
+    JSON response for `key`, built with build() only when no live rendered body is cached.
+    build() returns (payload, cacheable); error and partial payloads pass cacheable=False and are never stored,
+    nor is anything built after the request deadline ran out (admission turns that response into a 504).
+    The compressed variants of the body are kept on the same entry by compress_response.
+    """
+    from flask import current_app
+
+    body = encoded_payloads.get_body(key)
+    if body is None:
+        payload, cacheable = build()
+        response = current_app.json.response(payload)
+        if not cacheable or deadline_exceeded():
+            return response
+        encoded_payloads.put_body(key, response.get_data(), ttl_seconds)
+    else:
+        response = current_app.response_class(body, mimetype="application/json")
+    response.payload_key = key
+    return response
+
+
+def _is_compressible(response):
+    if response.status_code != 200 or "Content-Encoding" in response.headers:
+        return False
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return False
+    # streamed responses (SSE, exports) are left alone
+    if response.is_streamed and not response.direct_passthrough:
+        return False
+    return True
+
+
+def compress_response(response, accept_encoding, environ=None):
+    """
+    Compress a Flask response in place if the client accepts it and it is big enough.
+    With the request's WSGI `environ`, a revalidation against the compressed ETag is answered with a 304.
+    """
+    response.vary.add("Accept-Encoding")
+
+    if not _is_compressible(response):
+        return response
+
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding is None:
+        return response
+
+    # send_from_directory hands back a file wrapper, read it so we can compress
+    response.direct_passthrough = False
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_BYTES:
+        return response
+
+    key = getattr(response, "payload_key", None)
+    if key is None and response.get_etag()[0]:
+        key = ("etag", response.get_etag()[0])  # static files (mtime, size, name): no need to hash the body
+    response.set_data(encoded_payloads.get_or_encode(body, encoding, key))
+    response.headers["Content-Encoding"] = encoding
+    if response.get_etag()[0]:
+        # a compressed representation needs its own validator
+        etag, weak = response.get_etag()
+        response.set_etag(f"{etag}-{encoding}", weak=weak)
+        if environ is not None:
+            # Werkzeug compared If-None-Match with the uncompressed ETag, the client sends back this one
+            response.make_conditional(environ)
+    return response
+
+
+def init_compression(app):
+    from flask import request
+
+    @app.after_request
+    def _compress(response):
+        return compress_response(response, request.headers.get("Accept-Encoding", ""), request.environ)
+
+    return app
@@ -0,0 +1,20 @@
+import json
+import os
+from functools import lru_cache
+
+# Resolve everything from this file, not from the current working directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_DIR = os.path.join(BACKEND_DIR, "config")
+
+
+def backend_path(*parts):
+    return os.path.join(BACKEND_DIR, *parts)
+
+
+@lru_cache(maxsize=None)
+def load_thresholds():
+    """
+    Read config/thresholds.json once per process. RiskCalculator and WeatherConditionClassifier share the result.
+    """
+    with open(os.path.join(CONFIG_DIR, "thresholds.json"), "r") as f:
+        return json.load(f)
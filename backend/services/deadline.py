@@ -0,0 +1,66 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+# Absolute time.monotonic() by which the current request must be answered, None = no deadline
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def request_deadline(seconds):
+    """
+    Everything called inside the block (upstream calls included) must finish within `seconds`.
+    A nested deadline can only make the budget shorter, never longer.
+    """
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None:
+        deadline = min(deadline, outer)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time():
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def deadline_exceeded():
+    remaining = remaining_time()
+    return remaining is not None and remaining <= 0
+
+
+def bounded_timeout(default):
+    """
+    Timeout for an upstream call: the client's own default, cut down to what is left of the request deadline.
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return default
+    return max(0.0, min(default, remaining))
+
+
+# Set when the work of the current context is no longer wanted, e.g. the losing half of a hedged request
+_cancel = contextvars.ContextVar("cancel_event", default=None)
+
+
+@contextmanager
+def cancel_scope(event):
+    """
+    Upstream calls made inside the block give up before going out once `event` is set.
+    """
+    token = _cancel.set(event)
+    try:
+        yield event
+    finally:
+        _cancel.reset(token)
+
+
+def cancelled():
+    event = _cancel.get()
+    return event is not None and event.is_set()
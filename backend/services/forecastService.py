@@ -1,17 +1,39 @@
 import requests
-from .caching import cache_response, get_cached_response
+from .caching import get_or_fetch
+from .hourlySeries import HourlySeries
+from .upstreamScheduler import scheduled_get
 
 
 class ForecastClient:
     BASE_URL = "https://api.open-meteo.com/v1/forecast"
+    # The data coming from the API is cached for 1 hour.
+    CACHE_EXPIRY_HOURS = 1
 
-    def get_hourly_forecast(self, latitude, longitude, start_date, end_date): #hourly weather forecast fetch
-        cache_key = f"forecast_{latitude}_{longitude}_{start_date}_{end_date}"
-        cached_data = get_cached_response(cache_key) # it will check that if the cache is exist or not 
+    def __init__(self, base_url=None, upstream="open_meteo"):
+        # a mirror (e.g. our own Open-Meteo instance) serves the same data, so it shares the cache entries
+        if base_url:
+            self.BASE_URL = base_url
+        self.upstream = upstream
 
-        if cached_data:
-            return cached_data # if cache is exist then we dont need api call
+    @staticmethod
+    def cache_key(latitude, longitude, start_date, end_date):
+        return f"forecast_{latitude}_{longitude}_{start_date}_{end_date}"
 
+    def get_hourly_forecast(self, latitude, longitude, start_date, end_date): #hourly weather forecast fetch
+        cache_key = self.cache_key(latitude, longitude, start_date, end_date)
+        # cached (memory, file or shared tier) or fetched once, even when many requests ask at the same time
+        data = get_or_fetch(cache_key, lambda: self.fetch_forecast(latitude, longitude, start_date, end_date),
+                            expiry_hours=self.CACHE_EXPIRY_HOURS)
+        #That is, if you make the same request within the next 1 hour, you will get the data from the cache faster.
+
+        if isinstance(data, dict):
+            data = HourlySeries.from_open_meteo(data)  # older raw JSON entry
+        return data
+
+    def fetch_forecast(self, latitude, longitude, start_date, end_date):
+        """
+        Uncached fetch, HourlySeries or None. Hedged attempts (services.providers) call this directly.
+        """
         params = {
             "latitude": latitude,
             "longitude": longitude,
@@ -22,12 +44,11 @@ class ForecastClient:
         }
 
         try:
-            response = requests.get(self.BASE_URL, params=params) # call api
+            response = scheduled_get(self.upstream, self.BASE_URL, params=params, timeout=10) # call api, never wait forever
             response.raise_for_status()
-            data = response.json() # convert JSON response to python dict ...
-
-            cache_response(cache_key, data, expiry_hours=1) # The data coming from the API is being cached → for 1 hour.
-            #Then the data is being returned.That is, if you make the same request within the next 1 hour, you will get the data from the cache faster.
+            data = HourlySeries.from_open_meteo(response.json()) # JSON → compact HourlySeries
+            if data is None:
+                print("Forecast response had no hourly data")
             return data
 
         except requests.exceptions.RequestException as e: # if any exception arise 
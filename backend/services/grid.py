@@ -0,0 +1,18 @@
+# NASA POWER hourly data comes from MERRA-2, which is on a 0.5° latitude x 0.625° longitude grid.
+# Every point inside one cell gets the same values, so cache keys are built from the cell, not the raw point.
+LAT_STEP = 0.5
+LON_STEP = 0.625
+
+
+def snap_to_cell(latitude, longitude):
+    """
+    Centre of the grid cell containing (latitude, longitude).
+    """
+    lat = round(float(latitude) / LAT_STEP) * LAT_STEP
+    lon = round(float(longitude) / LON_STEP) * LON_STEP
+    return round(lat, 4), round(lon, 4)
+
+
+def cell_id(latitude, longitude):
+    lat, lon = snap_to_cell(latitude, longitude)
+    return f"{lat:.3f}_{lon:.3f}"
@@ -0,0 +1,130 @@
+"""
+Hedged requests: ask the preferred provider first, and when it has not answered by the time it normally
+would have (its recent p95), ask the next one too. Whichever answers first wins, the other is cancelled.
+
+Cancelling only stops a loser that has not gone out yet (still queued in the upstream scheduler);
+an HTTP call already in flight runs to completion in its worker thread and its answer just lands
+in the cache.
+"""
+import contextvars
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .deadline import cancel_scope, deadline_exceeded, remaining_time
+from .latencyTracker import upstream_latency
+
+HEDGING_ENABLED = os.environ.get("HEDGING_ENABLED", "1") == "1"
+MAX_WORKERS = int(os.environ.get("HEDGE_MAX_WORKERS", 32))
+# Used until a provider has enough latency samples for a p95
+DEFAULT_HEDGE_DELAY_SECONDS = float(os.environ.get("HEDGE_DEFAULT_DELAY", 2.0))
+# Never hedge sooner than this, a very fast p95 would otherwise double the load on every blip
+MIN_HEDGE_DELAY_SECONDS = float(os.environ.get("HEDGE_MIN_DELAY", 0.05))
+
+_executor = None
+_executor_lock = threading.Lock()
+_counters = {"calls": 0, "hedged": 0, "hedge_wins": 0, "fallbacks": 0, "failed": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="hedge")
+    return _executor
+
+
+def hedge_delay(upstream):
+    p95 = upstream_latency.p95(upstream)
+    return max(MIN_HEDGE_DELAY_SECONDS, DEFAULT_HEDGE_DELAY_SECONDS if p95 is None else p95)
+
+
+def _attempt(cancel_event, call, provider):
+    with cancel_scope(cancel_event):
+        return call(provider)
+
+
+def _submit(call, provider):
+    # the worker runs in a copy of the caller's context: priority, deadline and active profile come along
+    cancel_event = threading.Event()
+    future = _get_executor().submit(contextvars.copy_context().run, _attempt, cancel_event, call, provider)
+    future.cancel_event = cancel_event
+    return future
+
+
+def first_answer(providers, call, hedge=None):
+    """
+    Run `call(provider)` for the providers in order of preference and return (answer, provider) for the first
+    answer that is not None, or (None, None). The next provider is started when the running ones have been
+    slower than their p95 (hedge) or have all failed (fallback).
+    """
+    hedge = HEDGING_ENABLED if hedge is None else hedge
+    _count("calls")
+    if len(providers) == 1:
+        answer = call(providers[0])  # nothing to hedge with, skip the thread hop
+        if answer is None:
+            _count("failed")
+        return (answer, providers[0]) if answer is not None else (None, None)
+
+    waiting = list(providers)
+    running = {}
+    hedges = set()
+
+    def start_next():
+        provider = waiting.pop(0)
+        running[_submit(call, provider)] = provider
+        return provider
+
+    start_next()
+    try:
+        while running:
+            timeout = None
+            if waiting and hedge:
+                timeout = hedge_delay(list(running.values())[-1].upstream)
+            remaining = remaining_time()
+            if remaining is not None:
+                timeout = max(0.0, remaining if timeout is None else min(timeout, remaining))
+
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if not waiting or deadline_exceeded():
+                    break  # out of time
+                _count("hedged")
+                hedges.add(start_next())
+                continue
+
+            for future in done:
+                provider = running.pop(future)
+                answer = None if future.exception() else future.result()
+                if answer is not None:
+                    if provider in hedges:
+                        _count("hedge_wins")
+                    return answer, provider
+
+            if not running and waiting:
+                _count("fallbacks")  # everything in flight failed, try the next provider right away
+                start_next()
+    finally:
+        if running:
+            for future in running:
+                future.cancel_event.set()
+                future.cancel()
+            from .upstreamScheduler import scheduler
+
+            scheduler.wake_waiters()
+
+    _count("failed")
+    return None, None
+
+
+def hedging_stats():
+    with _counters_lock:
+        counters = dict(_counters)
+    return {**counters, "enabled": HEDGING_ENABLED, "latency": upstream_latency.stats()}
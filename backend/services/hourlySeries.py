@@ -0,0 +1,213 @@
+import datetime
+import math
+from array import array
+
+# Missing values are stored as NaN inside the float arrays
+MISSING = float("nan")
+# NASA POWER marks missing data with this fill value
+NASA_FILL_VALUE = -999.0
+
+COLUMNS = ("temperature", "precipitation", "wind_speed", "humidity")
+
+NASA_PARAMETERS = {"temperature": "T2M", "precipitation": "PRECTOTCORR", "wind_speed": "WS2M", "humidity": "RH2M"}
+OPEN_METEO_FIELDS = {
+    "temperature": "temperature_2m",
+    "precipitation": "precipitation",
+    "wind_speed": "windspeed_10m",
+    "humidity": "relative_humidity_2m",
+}
+
+
+def is_missing(value):
+    return value != value  # only NaN is not equal to itself
+
+
+def _as_float(value):
+    if value is None:
+        return MISSING
+    value = float(value)
+    return MISSING if value == NASA_FILL_VALUE else value
+
+
+class HourlySeries:
+    """
+    Compact hourly weather for one location: a start time, a fixed step and one float array per column.
+    Both NASA POWER and Open-Meteo answers are normalized into this, so the app reads values by index
+    instead of formatting "YYYYMMDDHH" keys and probing dicts.
+
+    Times are the provider's own wall clock labels, kept as naive datetimes like the raw payloads;
+    utc_offset says how far those labels are from UTC when the provider tells us (Open-Meteo does).
+    """
+
+    __slots__ = ("start", "step", "source", "utc_offset", "temperature", "precipitation", "wind_speed", "humidity")
+
+    CACHE_CODEC = "hourly_series"
+
+    def __init__(self, start, step=datetime.timedelta(hours=1), source=None, utc_offset=datetime.timedelta(0), **columns):
+        self.start = start
+        self.step = step
+        self.source = source
+        self.utc_offset = utc_offset
+        length = max((len(values) for values in columns.values()), default=0)
+        for name in COLUMNS:
+            values = columns.get(name)
+            if values is None:
+                values = array("d", [MISSING]) * length
+            elif not isinstance(values, array):
+                values = array("d", values)
+            setattr(self, name, values)
+
+    def __len__(self):
+        return len(self.temperature)
+
+    def __eq__(self, other):
+        if not isinstance(other, HourlySeries):
+            return NotImplemented
+        return self.content_key() == other.content_key()
+
+    def time_at(self, index):
+        return self.start + index * self.step
+
+    def iso_time(self, index):
+        return self.time_at(index).strftime("%Y-%m-%dT%H:%M:%S")
+
+    def utc_time_at(self, index):
+        return self.time_at(index) - self.utc_offset
+
+    def value(self, column, index):
+        """
+        Value at index, None when it is missing.
+        """
+        value = getattr(self, column)[index]
+        return None if is_missing(value) else value
+
+    def rows(self, indices=None):
+        """
+        (index, temperature, precipitation, wind_speed, humidity) per hour, None for missing values.
+        Reads the arrays directly, this is the fast path for scoring many hours.
+        """
+        t, p, w, h = self.temperature, self.precipitation, self.wind_speed, self.humidity
+        for i in range(len(self)) if indices is None else indices:
+            a, b, c, d = t[i], p[i], w[i], h[i]
+            yield i, (a if a == a else None), (b if b == b else None), (c if c == c else None), (d if d == d else None)
+
+    def indices_for_day(self, day):
+        """
+        Range of indices whose time falls on `day` (a date).
+        """
+        day_start = datetime.datetime.combine(day, datetime.time())
+        first = math.ceil((day_start - self.start) / self.step)
+        last = math.ceil((day_start + datetime.timedelta(days=1) - self.start) / self.step)
+        return range(max(first, 0), min(max(last, 0), len(self)))
+
+    def slice(self, indices):
+        """
+        New series for a contiguous range of indices, e.g. slice(indices_for_day(day)).
+        """
+        start, stop = indices.start, indices.stop
+        columns = {name: getattr(self, name)[start:stop] for name in COLUMNS}
+        return HourlySeries(self.time_at(start), step=self.step, source=self.source, utc_offset=self.utc_offset, **columns)
+
+    def missing_hours(self, indices=None):
+        # hours without a temperature, those cannot be scored
+        t = self.temperature
+        return sum(1 for i in (range(len(self)) if indices is None else indices) if t[i] != t[i])
+
+    def filled_from(self, other):
+        """
+        Copy of this series with missing values taken from `other` at the same time label.
+        Returns (series, number of hours that got at least one value); self unchanged when nothing was filled.
+        """
+        if other.step != self.step:
+            return self, 0
+        columns = {name: array("d", getattr(self, name)) for name in COLUMNS}
+        filled = 0
+        for i in range(len(self)):
+            offset = (self.time_at(i) - other.start) / other.step
+            j = int(offset)
+            if j != offset or not 0 <= j < len(other):
+                continue
+            hour_filled = False
+            for name in COLUMNS:
+                value = getattr(other, name)[j]
+                if is_missing(columns[name][i]) and not is_missing(value):
+                    columns[name][i] = value
+                    hour_filled = True
+            filled += hour_filled
+        if not filled:
+            return self, 0
+        source = f"{self.source}+{other.source}"
+        return HourlySeries(self.start, step=self.step, source=source, utc_offset=self.utc_offset, **columns), filled
+
+    def content_key(self):
+        # bytes that change whenever any value changes, NaNs included
+        parts = [self.start.isoformat().encode(), str(self.step.total_seconds()).encode()]
+        parts.extend(getattr(self, name).tobytes() for name in COLUMNS)
+        return b"|".join(parts)
+
+    @classmethod
+    def from_nasa(cls, payload):
+        """
+        NASA POWER point payload ({"properties": {"parameter": {"T2M": {"YYYYMMDDHH": value}}}}) to a series.
+        """
+        parameters = payload.get("properties", {}).get("parameter", {})
+        time_keys = set()
+        for name in NASA_PARAMETERS.values():
+            time_keys.update(parameters.get(name, {}))
+        if not time_keys:
+            return None
+
+        start = datetime.datetime.strptime(min(time_keys), "%Y%m%d%H")
+        end = datetime.datetime.strptime(max(time_keys), "%Y%m%d%H")
+        length = int((end - start) / datetime.timedelta(hours=1)) + 1
+
+        columns = {}
+        for column, name in NASA_PARAMETERS.items():
+            values = array("d", [MISSING]) * length
+            for time_key, value in parameters.get(name, {}).items():
+                index = int((datetime.datetime.strptime(time_key, "%Y%m%d%H") - start) / datetime.timedelta(hours=1))
+                values[index] = _as_float(value)
+            columns[column] = values
+        return cls(start, source="nasa", **columns)
+
+    @classmethod
+    def from_open_meteo(cls, payload):
+        """
+        Open-Meteo forecast payload ({"hourly": {"time": [...], "temperature_2m": [...]}}) to a series.
+        """
+        hourly = payload.get("hourly") or {}
+        times = hourly.get("time") or []
+        if not times:
+            return None
+
+        start = datetime.datetime.fromisoformat(times[0])
+        step = datetime.datetime.fromisoformat(times[1]) - start if len(times) > 1 else datetime.timedelta(hours=1)
+        columns = {
+            column: array("d", (_as_float(value) for value in (hourly.get(field) or [None] * len(times))))
+            for column, field in OPEN_METEO_FIELDS.items()
+        }
+        utc_offset = datetime.timedelta(seconds=payload.get("utc_offset_seconds") or 0)
+        return cls(start, step=step, source="forecast", utc_offset=utc_offset, **columns)
+
+    def to_cache(self):
+        """
+        JSON friendly form for the file cache tier, NaN becomes null.
+        """
+        return {
+            "start": self.start.isoformat(),
+            "step_seconds": self.step.total_seconds(),
+            "source": self.source,
+            "utc_offset_seconds": self.utc_offset.total_seconds(),
+            "columns": {name: [None if is_missing(v) else v for v in getattr(self, name)] for name in COLUMNS},
+        }
+
+    @classmethod
+    def from_cache(cls, data):
+        columns = {name: [MISSING if v is None else v for v in values] for name, values in data["columns"].items()}
+        return cls(
+            datetime.datetime.fromisoformat(data["start"]),
+            step=datetime.timedelta(seconds=data["step_seconds"]),
+            source=data.get("source"),
+            utc_offset=datetime.timedelta(seconds=data.get("utc_offset_seconds", 0)),
+            **columns,
+        )
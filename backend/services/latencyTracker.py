@@ -0,0 +1,51 @@
+import collections
+import threading
+
+
+class LatencyTracker:
+    """
+    Recent upstream latencies per provider, fed by scheduled_get. Hedged requests use the p95 as their trigger.
+    """
+
+    def __init__(self, window=200, min_samples=20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, provider, seconds):
+        with self._lock:
+            samples = self._samples.get(provider)
+            if samples is None:
+                samples = self._samples[provider] = collections.deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, provider, fraction):
+        """
+        Latency in seconds below which `fraction` of the recent calls finished, None until there are enough samples.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(provider, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    def p95(self, provider):
+        return self.percentile(provider, 0.95)
+
+    def stats(self):
+        with self._lock:
+            providers = list(self._samples)
+        result = {}
+        for provider in providers:
+            p50, p95 = self.percentile(provider, 0.5), self.percentile(provider, 0.95)
+            result[provider] = {
+                "samples": len(self._samples[provider]),
+                "p50_ms": None if p50 is None else round(p50 * 1000, 1),
+                "p95_ms": None if p95 is None else round(p95 * 1000, 1),
+            }
+        return result
+
+
+# Global tracker shared by all upstream calls
+upstream_latency = LatencyTracker()
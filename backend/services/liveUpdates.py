@@ -0,0 +1,156 @@
+import json
+import os
+import queue
+import threading
+
+from .upstreamScheduler import REFRESH, upstream_priority
+
+# How often a cell's hourly data is rebuilt from the (refreshing) cache
+REFRESH_INTERVAL_SECONDS = float(os.environ.get("LIVE_REFRESH_SECONDS", 60))
+# Comment line sent when nothing changed, keeps proxies from closing the connection
+HEARTBEAT_SECONDS = 15
+MAX_SUBSCRIBERS = int(os.environ.get("LIVE_MAX_SUBSCRIBERS", 500))
+
+
+class HubFull(Exception):
+    pass
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class _CellLoop:
+    """
+    One refresh loop per (grid cell, day), shared by everyone subscribed to it.
+    """
+
+    def __init__(self, hub, key, build, cell=None):
+        self.hub = hub
+        self.key = key
+        self.build = build
+        self.cell = cell  # {"latitude", "longitude"} of the grid cell centre the hours are built for
+        self.subscribers = set()
+        self.snapshot = {}  # time -> hourly entry, what the subscribers have already seen
+        self.ready = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"live-{key}", daemon=True)
+
+    def _refresh(self):
+        """
+        Rebuild the hours and replace the snapshot with them. Returns (changed entries, removed times).
+        build() returns None when an upstream failed; an answer with fewer hours than the last good one
+        is taken as a failure too (a partial upstream answer), never as hours going away.
+        """
+        with upstream_priority(REFRESH):
+            entries = self.build()
+        if entries is None:
+            return [], []  # build failed, keep what the subscribers have
+
+        fresh = {entry["time"]: entry for entry in entries}
+        if len(fresh) < len(self.snapshot):
+            print(f"⚠️ Live refresh for {self.key} gave {len(fresh)} of {len(self.snapshot)} hours, keeping the last ones")
+            return [], []
+        with self.hub._lock:
+            changed = [entry for time, entry in fresh.items() if self.snapshot.get(time) != entry]
+            removed = sorted(set(self.snapshot) - set(fresh))
+            self.snapshot = fresh
+        return changed, removed
+
+    def _run(self):
+        while not self.stopped.is_set():
+            first_build = not self.ready.is_set()
+            try:
+                changed, removed = self._refresh()
+            except Exception as e:
+                print(f"💥 Live refresh failed for {self.key}: {e}")
+                changed, removed = [], []
+
+            self.ready.set()
+            # the first build is delivered as the snapshot, only later changes are pushed
+            if removed and not first_build:
+                # some hours were replaced by others, an update cannot say that: send the whole hour set again
+                print(f"📡 Live snapshot for {self.key}: {len(removed)} hours removed, {len(self.subscribers)} subscribers")
+                self.hub.publish(self, self.hub.snapshot_event(self))
+            elif changed and not first_build:
+                print(f"📡 Live update for {self.key}: {len(changed)} changed hours to {len(self.subscribers)} subscribers")
+                self.hub.publish(self, format_event("update", sorted(changed, key=lambda x: x["time"])))
+
+            self.stopped.wait(self.hub.interval)
+
+
+class LiveUpdateHub:
+    def __init__(self, interval=REFRESH_INTERVAL_SECONDS, max_subscribers=MAX_SUBSCRIBERS):
+        self.interval = interval
+        self.max_subscribers = max_subscribers
+        self._loops = {}
+        self._lock = threading.Lock()
+
+    def snapshot_event(self, loop):
+        with self._lock:
+            hours = sorted(loop.snapshot.values(), key=lambda x: x["time"])
+        return format_event("snapshot", {"cell": loop.cell, "hourly_data": hours})
+
+    def subscribe(self, key, build, cell=None):
+        """
+        Returns (loop, queue). `build` returns the hourly entries for the key; it is only called by the loop thread.
+        """
+        with self._lock:
+            if sum(len(loop.subscribers) for loop in self._loops.values()) >= self.max_subscribers:
+                raise HubFull()
+
+            loop = self._loops.get(key)
+            if loop is None:
+                loop = self._loops[key] = _CellLoop(self, key, build, cell)
+                loop.thread.start()
+            events = queue.Queue()
+            loop.subscribers.add(events)
+        return loop, events
+
+    def unsubscribe(self, loop, events):
+        with self._lock:
+            loop.subscribers.discard(events)
+            if not loop.subscribers:
+                # last one out stops the refresh loop
+                loop.stopped.set()
+                if self._loops.get(loop.key) is loop:
+                    del self._loops[loop.key]
+
+    def publish(self, loop, message):
+        with self._lock:
+            subscribers = list(loop.subscribers)
+        for events in subscribers:
+            events.put(message)
+
+    def stream(self, key, build, still_current, cell=None):
+        """
+        SSE generator: a "snapshot" event ({"cell", "hourly_data"}, the complete hour set, replaces what the client
+        has), then "update" events with changed hours only; a later "snapshot" is sent when hours were replaced
+        by others (never a smaller hour set).
+        `still_current()` going False (e.g. the day rolled over) ends the stream with an "end" event.
+        """
+        loop, events = self.subscribe(key, build, cell)
+        try:
+            loop.ready.wait(timeout=30)
+            yield self.snapshot_event(loop)
+
+            while still_current():
+                try:
+                    message = events.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield message
+
+            yield format_event("end", {"reason": "day_changed"})
+        finally:
+            # also runs when the client disconnects (GeneratorExit)
+            self.unsubscribe(loop, events)
+
+    def stats(self):
+        with self._lock:
+            return {"loops": len(self._loops), "subscribers": sum(len(loop.subscribers) for loop in self._loops.values())}
+
+
+# Global hub shared by all requests
+live_hub = LiveUpdateHub()
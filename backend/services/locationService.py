@@ -1,10 +1,12 @@
-import requests
+from .upstreamScheduler import scheduled_get
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
 
 def get_coordinates(place_name: str):
     """
     Convert a place name into latitude & longitude using OpenStreetMap Nominatim API.
     """
-    url = "https://nominatim.openstreetmap.org/search"
+    url = NOMINATIM_URL
     params = {
         "q": place_name,
         "format": "json",
@@ -12,7 +14,7 @@ def get_coordinates(place_name: str):
     }
 
     try:
-        response = requests.get(url, params=params, headers={"User-Agent": "WeatherRiskApp/1.0"})
+        response = scheduled_get("nominatim", url, params=params, headers={"User-Agent": "WeatherRiskApp/1.0"}, timeout=10)
         response.raise_for_status()
         data = response.json()
 
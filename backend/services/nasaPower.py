@@ -1,25 +1,39 @@
 import requests
-from .caching import cache_response, get_cached_response
+from .caching import cache_response, get_cached_response, get_or_fetch
+from .grid import cell_id
+from .hourlySeries import HourlySeries
+from .upstreamScheduler import scheduled_get
 
 
 class NasaPowerClient:
     HOURLY_BASE_URL = "https://power.larc.nasa.gov/api/temporal/hourly/point"
     DAILY_BASE_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
+    REGIONAL_HOURLY_BASE_URL = "https://power.larc.nasa.gov/api/temporal/hourly/regional"
 
     def __init__(self):
         self.hourly_parameters = "T2M,PRECTOTCORR,WS2M,RH2M"
         self.daily_parameters = "T2M,PRECTOT,WS2M"
 
     def get_hourly_weather_data(self, latitude, longitude, start_date, end_date): #specific loaction,date, hourly data
+        """
+        Hourly T2M / PRECTOTCORR / WS2M / RH2M for a point, normalized to an HourlySeries (None on failure).
+        """
         print(f"🚀 NASA Hourly Client called: lat={latitude}, lon={longitude}, start={start_date}, end={end_date}")
 
-        cache_key = f"hourly_{latitude}_{longitude}_{start_date}_{end_date}"
-        cached_data = get_cached_response(cache_key) # check if the data is in cache 
+        cache_key = self.hourly_cache_key(latitude, longitude, start_date, end_date)
+        # cache hit (memory, file or shared tier), or one fetch for everyone asking for this key right now
+        data = get_or_fetch(cache_key, lambda: self.fetch_hourly_range(latitude, longitude, start_date, end_date))
 
-        if cached_data: # if has then return it
-            print(f"📦 Using cached hourly data for {cache_key}")
-            return cached_data
+        if isinstance(data, dict):
+            # entry written before the cache held HourlySeries, convert it once
+            data = HourlySeries.from_nasa(data)
+            cache_response(cache_key, data)
+        return data
 
+    def fetch_hourly_range(self, latitude, longitude, start_date, end_date):
+        """
+        Uncached fetch of one date range. Bulk callers (e.g. services.bulkExport) cache the days themselves.
+        """
         params = {  # parameter is needed for api call
             "parameters": self.hourly_parameters,
             "start": start_date,
@@ -35,7 +49,7 @@ class NasaPowerClient:
 
         try:
             # Add timeout to prevent hanging
-            response = requests.get(self.HOURLY_BASE_URL, params=params, timeout=15) # if server dont repose in 15 sec then it will be a error otherwise we may wait for infinity times
+            response = scheduled_get("nasa_power", self.HOURLY_BASE_URL, params=params, timeout=15) # if server dont repose in 15 sec then it will be a error otherwise we may wait for infinity times
             print(f"📡 NASA Hourly API Response Status: {response.status_code}")
 
             if response.status_code != 200: # status code 200 means all data is found
@@ -62,9 +76,13 @@ class NasaPowerClient:
                         if hours_with_data:
                             print(f"📅 Sample time keys: {hours_with_data[:3]}")  # First 3 keys
 
-            cache_response(cache_key, data) #sent to cache 
-            print(f"💾 Cached hourly data for {cache_key}")
-            return data
+            series = HourlySeries.from_nasa(data) if data else None
+            if series is None:
+                print("❌ NASA Hourly API returned no hourly parameters")
+                return None
+
+            print(f"💾 NASA hourly data ready for the cache ({len(series)} hours)")
+            return series
 
         except requests.exceptions.Timeout: #error check
             print("⏰ NASA Hourly API request timed out after 15 seconds")
@@ -79,6 +97,54 @@ class NasaPowerClient:
             traceback.print_exc()
             return None
 
+    @staticmethod
+    def hourly_cache_key(latitude, longitude, start_date, end_date):
+        # keyed by grid cell so every point in a cell (and regional ingestion) share one entry
+        return f"hourly_{cell_id(latitude, longitude)}_{start_date}_{end_date}"
+
+    def get_regional_hourly_data(self, lat_min, lat_max, lon_min, lon_max, start_date, end_date):
+        """
+        One request for a whole bounding box. Returns the GeoJSON FeatureCollection, one feature per grid cell.
+        Not cached here, services.regionalIngest splits it into per-cell entries.
+        """
+        print(f"🚀 NASA Regional Client called: lat={lat_min}..{lat_max}, lon={lon_min}..{lon_max}, start={start_date}, end={end_date}")
+
+        params = {
+            "parameters": self.hourly_parameters,
+            "start": start_date,
+            "end": end_date,
+            "latitude-min": lat_min,
+            "latitude-max": lat_max,
+            "longitude-min": lon_min,
+            "longitude-max": lon_max,
+            "community": "AG",
+            "format": "JSON",
+        }
+
+        try:
+            # regional payloads are big, give them more time than a point request
+            response = scheduled_get("nasa_power", self.REGIONAL_HOURLY_BASE_URL, params=params, timeout=120)
+            print(f"📡 NASA Regional API Response Status: {response.status_code}")
+
+            if response.status_code != 200:
+                print(f"❌ NASA Regional API Error Status: {response.status_code}")
+                print(f"❌ Error Response: {response.text[:200]}...")
+                return None
+
+            data = response.json()
+            print(f"✅ NASA Regional Data received, features: {len(data.get('features', []))}")
+            return data
+
+        except requests.exceptions.Timeout:
+            print("⏰ NASA Regional API request timed out")
+            return None
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Error fetching regional data from NASA POWER API: {e}")
+            return None
+        except ValueError as e:
+            print(f"❌ NASA Regional API returned invalid JSON: {e}")
+            return None
+
     def get_daily_weather_data(self, latitude, longitude, start_date, end_date): 
         print(f"🚀 NASA Daily Client called: lat={latitude}, lon={longitude}, start={start_date}, end={end_date}")
 
@@ -102,7 +168,7 @@ class NasaPowerClient:
         print(f"🌐 Making NASA Daily API request: {params}")
 
         try:
-            response = requests.get(self.DAILY_BASE_URL, params=params, timeout=15)
+            response = scheduled_get("nasa_power", self.DAILY_BASE_URL, params=params, timeout=15)
             print(f"📡 NASA Daily API Response Status: {response.status_code}")
 
             if response.status_code != 200:
@@ -0,0 +1,215 @@
+import collections
+import contextvars
+import functools
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+from .config import backend_path
+
+# Send "X-Profile-Token: <token>" to profile one request, and "X-Admin-Token: <token>" for the admin endpoints.
+# With no token configured both are disabled.
+ADMIN_TOKEN = os.environ.get("PROFILE_ADMIN_TOKEN", "")
+# Fraction of requests profiled without asking (0 = never)
+SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+SAMPLE_INTERVAL_SECONDS = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", 0.001))
+PROFILE_DIR = os.environ.get("PROFILE_DIR") or backend_path("profiles")
+# Oldest profiles are deleted once there are more than this many
+MAX_PROFILES = int(os.environ.get("PROFILE_MAX_FILES", 50))
+
+PROFILE_FORMATS = {"folded": ".folded", "speedscope": ".speedscope.json", "meta": ".meta.json"}
+
+_active_profile = contextvars.ContextVar("active_profile", default=None)
+
+
+def token_matches(value):
+    # compared as bytes: compare_digest refuses str with non-ASCII characters, and headers are client controlled
+    return bool(ADMIN_TOKEN) and bool(value) and hmac.compare_digest(value.encode(), ADMIN_TOKEN.encode())
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread every SAMPLE_INTERVAL_SECONDS from a helper thread.
+    Low overhead, the profiled code runs unchanged.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.upstream_calls = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self.started = None
+        self.duration = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    def collapsed(self):
+        # Brendan Gregg's collapsed stack format, what flamegraph.pl and speedscope read
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def speedscope(self, name):
+        frames, index = [], {}
+        samples, weights = [], []
+        interval_ms = self.interval * 1000
+        for stack, count in self.stacks.items():
+            sample = []
+            for label in stack:
+                if label not in index:
+                    index[label] = len(frames)
+                    frames.append({"name": label})
+                sample.append(index[label])
+            samples.append(sample)
+            weights.append(count * interval_ms)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "will-it-rain profiler",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+def record_upstream_call(provider, url, status, seconds):
+    """
+    Called by scheduled_get so a profile also lists every upstream call the request made.
+    """
+    profiler = _active_profile.get()
+    if profiler is not None:
+        profiler.upstream_calls.append({"provider": provider, "url": url, "status": status, "ms": round(seconds * 1000, 1)})
+
+
+def _prune():
+    metas = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(PROFILE_FORMATS["meta"]))
+    for meta in metas[:-MAX_PROFILES] if len(metas) > MAX_PROFILES else []:
+        profile_id = meta[: -len(PROFILE_FORMATS["meta"])]
+        for suffix in PROFILE_FORMATS.values():
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def save_profile(profiler, name, path, status_code, reason):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    # sortable by time, so the ring can drop the oldest by name
+    now = time.time_ns()
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(now / 1e9))}{now // 1000 % 1000000:06d}_{name}_{uuid.uuid4().hex[:6]}"
+    meta = {
+        "id": profile_id,
+        "endpoint": name,
+        "path": path,
+        "status": status_code,
+        "reason": reason,
+        "duration_ms": round(profiler.duration * 1000, 1),
+        "samples": sum(profiler.stacks.values()),
+        "upstream_calls": profiler.upstream_calls,
+    }
+
+    base = os.path.join(PROFILE_DIR, profile_id)
+    with open(base + PROFILE_FORMATS["folded"], "w") as f:
+        f.write(profiler.collapsed())
+    with open(base + PROFILE_FORMATS["speedscope"], "w") as f:
+        json.dump(profiler.speedscope(f"{name} {path}"), f)
+    with open(base + PROFILE_FORMATS["meta"], "w") as f:  # written last, it marks the profile as complete
+        json.dump(meta, f)
+
+    _prune()
+    print(f"🔬 Saved profile {profile_id} ({meta['duration_ms']} ms, {meta['samples']} samples)")
+    return profile_id
+
+
+def list_profiles():
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if name.endswith(PROFILE_FORMATS["meta"]):
+            try:
+                with open(os.path.join(PROFILE_DIR, name), "r") as f:
+                    profiles.append(json.load(f))
+            except (OSError, json.JSONDecodeError):
+                continue
+    return profiles
+
+
+def profile_filename(profile_id, fmt):
+    # ids are generated by us, anything else (e.g. "../") is refused
+    if fmt not in PROFILE_FORMATS or not all(c.isalnum() or c in "_-" for c in profile_id):
+        return None
+    filename = profile_id + PROFILE_FORMATS[fmt]
+    return filename if os.path.exists(os.path.join(PROFILE_DIR, filename)) else None
+
+
+def profiled(name):
+    """
+    Decorator for Flask views: profile the request when the admin header asks for it, or at random
+    with PROFILE_SAMPLE_RATE. The profile id is returned in the X-Profile-Id response header.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import make_response, request
+
+            if token_matches(request.headers.get("X-Profile-Token", "")):
+                reason = "requested"
+            elif SAMPLE_RATE and random.random() < SAMPLE_RATE:
+                reason = "sampled"
+            else:
+                return view(*args, **kwargs)
+
+            profiler = SamplingProfiler(threading.get_ident())
+            token = _active_profile.set(profiler)
+            profiler.start()
+            try:
+                response = make_response(view(*args, **kwargs))
+            finally:
+                profiler.stop()
+                _active_profile.reset(token)
+
+            try:
+                response.headers["X-Profile-Id"] = save_profile(profiler, name, request.full_path, response.status_code, reason)
+            except OSError as e:
+                print(f"❌ Could not save profile: {e}")
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,213 @@
+"""
+Hourly data providers behind one interface, so the app asks for "a day of hourly data" instead of a client.
+
+    forecast:   Open-Meteo, hedged to OPEN_METEO_MIRROR_URL when one is configured
+    historical: NASA POWER, hedged to Open-Meteo for the recent days both cover;
+                hours NASA has not published yet (it lags a few days) are filled from Open-Meteo
+
+Both providers label hours in local time (NASA POWER in local solar time, Open-Meteo in the location's
+time zone), close enough to line the hours up when filling gaps.
+"""
+import datetime
+import os
+from abc import ABC, abstractmethod
+
+from .caching import cache_response, get_cached_response, get_or_fetch
+from .hedging import first_answer
+from .hourlySeries import HourlySeries
+
+OPEN_METEO_MIRROR_URL = os.environ.get("OPEN_METEO_MIRROR_URL", "")
+# NASA POWER lags a few days. A day it answered with fill values only is not asked again for this long,
+# requests (and the live refresh loops) go straight to the fallback in the meantime
+NOT_PUBLISHED_HOURS = float(os.environ.get("NASA_NOT_PUBLISHED_HOURS", 1))
+
+
+def _today():
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+class HourlyProvider(ABC):
+    name = None
+    upstream = None  # upstream scheduler / latency tracker name
+    expiry_hours = 24
+
+    def covers(self, day):
+        return True
+
+    def available(self, latitude, longitude, day):
+        # False skips the provider for this day without asking it
+        return True
+
+    @abstractmethod
+    def cache_key(self, latitude, longitude, day):
+        """
+        Key of the day's entry in the cache.
+        """
+
+    @abstractmethod
+    def fetch(self, latitude, longitude, day):
+        """
+        HourlySeries with (at least) the hours of `day` straight from the upstream, None when the provider failed.
+        """
+
+    def decode(self, data):
+        # cached entry -> HourlySeries, None when it is not a usable answer
+        return data
+
+    def cached(self, latitude, longitude, day):
+        return self.decode(get_cached_response(self.cache_key(latitude, longitude, day)))
+
+    def get(self, latitude, longitude, day):
+        """
+        Cached answer, or one fetch shared by everyone (threads and, with a shared tier, nodes) asking right now.
+        """
+        key = self.cache_key(latitude, longitude, day)
+        return self.decode(get_or_fetch(key, lambda: self.fetch(latitude, longitude, day), self.expiry_hours))
+
+    def store(self, latitude, longitude, day, series):
+        cache_response(self.cache_key(latitude, longitude, day), series, self.expiry_hours)
+
+
+class NasaPowerProvider(HourlyProvider):
+    name = "nasa"
+    upstream = "nasa_power"
+
+    def __init__(self, client):
+        self.client = client
+
+    def covers(self, day):
+        # one day of slack for places already living in tomorrow
+        return day <= _today() + datetime.timedelta(days=1)
+
+    def cache_key(self, latitude, longitude, day):
+        day_str = day.strftime("%Y%m%d")
+        return self.client.hourly_cache_key(latitude, longitude, day_str, day_str)
+
+    def _not_published_key(self, latitude, longitude, day):
+        return f"{self.cache_key(latitude, longitude, day)}_not_published"
+
+    def available(self, latitude, longitude, day):
+        return get_cached_response(self._not_published_key(latitude, longitude, day)) is None
+
+    def fetch(self, latitude, longitude, day):
+        day_str = day.strftime("%Y%m%d")
+        series = self.client.fetch_hourly_range(latitude, longitude, day_str, day_str)
+        if series is not None and series.missing_hours() == len(series):
+            # only fill values: nothing to cache as data, but remember it so the next miss does not ask again
+            cache_response(self._not_published_key(latitude, longitude, day), True, NOT_PUBLISHED_HOURS)
+            print(f"🕒 NASA POWER has not published {day_str} yet, using the fallback for {NOT_PUBLISHED_HOURS}h")
+            return None
+        return self.decode(series)
+
+    def decode(self, data):
+        if isinstance(data, dict):
+            data = HourlySeries.from_nasa(data)  # older raw JSON entry
+        if data is not None and data.missing_hours() == len(data):
+            return None  # day not published yet, only fill values
+        return data
+
+
+class OpenMeteoProvider(HourlyProvider):
+    name = "open_meteo"
+    upstream = "open_meteo"
+    # the forecast API also serves recent past days
+    PAST_DAYS = 92
+    FORECAST_DAYS = 16
+
+    def __init__(self, client, name=None):
+        self.client = client
+        self.name = name or self.name
+        self.upstream = client.upstream
+        self.expiry_hours = client.CACHE_EXPIRY_HOURS
+
+    def covers(self, day):
+        today = _today()
+        return today - datetime.timedelta(days=self.PAST_DAYS) <= day <= today + datetime.timedelta(days=self.FORECAST_DAYS - 1)
+
+    def cache_key(self, latitude, longitude, day):
+        day_str = day.strftime("%Y-%m-%d")
+        return self.client.cache_key(latitude, longitude, day_str, day_str)
+
+    def fetch(self, latitude, longitude, day):
+        day_str = day.strftime("%Y-%m-%d")
+        return self.client.fetch_forecast(latitude, longitude, day_str, day_str)
+
+    def decode(self, data):
+        if isinstance(data, dict):
+            data = HourlySeries.from_open_meteo(data)  # older raw JSON entry
+        return data
+
+
+class HedgedSource:
+    """
+    Providers in order of preference. get_day() hedges across the ones that cover the day and,
+    with fill_gaps, completes a partial answer with the others.
+    """
+
+    def __init__(self, providers, fill_gaps=False, hedge=None):
+        self.providers = providers
+        self.fill_gaps = fill_gaps
+        self.hedge = hedge
+
+    def get_day(self, latitude, longitude, day):
+        candidates = [provider for provider in self.providers
+                      if provider.covers(day) and provider.available(latitude, longitude, day)]
+        if not candidates:
+            return None
+
+        # one cache lookup before hedging: a hit on the preferred provider's entry needs no upstream at all
+        series, winner = candidates[0].cached(latitude, longitude, day), candidates[0]
+        if series is None:
+            series, winner = self._fetch(candidates, latitude, longitude, day)
+        if series is None or not self.fill_gaps:
+            return series
+
+        for provider in candidates:
+            if provider is winner or not series.missing_hours(series.indices_for_day(day)):
+                continue
+            other = provider.get(latitude, longitude, day)
+            if other is not None:
+                series, filled = series.filled_from(other)
+                if filled:
+                    print(f"🩹 Filled {filled} missing hours of {winner.name} data from {provider.name}")
+        return series
+
+    def _fetch(self, candidates, latitude, longitude, day):
+        preferred = candidates[0]
+        fetched = set()  # providers whose answer came from their upstream, not from the cache
+
+        def attempt(provider):
+            if provider is preferred:
+                # concurrent requests for the same day share the preferred provider's fetch (single-flight)
+                return provider.get(latitude, longitude, day)
+            # a hedge or fallback must not join that flight, it is the slow call being hedged:
+            # its own cache entry (the mirror shares the primary's, so that is a miss) or its own upstream call
+            series = provider.cached(latitude, longitude, day)
+            if series is None:
+                series = provider.fetch(latitude, longitude, day)
+                if series is not None:
+                    fetched.add(provider)
+            return series
+
+        series, winner = first_answer(candidates, attempt, hedge=self.hedge)
+        if winner in fetched:
+            winner.store(latitude, longitude, day, series)  # only the winner is written back
+        return series, winner
+
+
+def build_forecast_source():
+    from .registry import get_forecast_client
+
+    providers = [OpenMeteoProvider(get_forecast_client())]
+    if OPEN_METEO_MIRROR_URL:
+        from .forecastService import ForecastClient
+
+        mirror = ForecastClient(base_url=OPEN_METEO_MIRROR_URL, upstream="open_meteo_mirror")
+        providers.append(OpenMeteoProvider(mirror, name="open_meteo_mirror"))
+    return HedgedSource(providers)
+
+
+def build_historical_source():
+    from .registry import get_forecast_client, get_nasa_client
+
+    return HedgedSource([NasaPowerProvider(get_nasa_client()), OpenMeteoProvider(get_forecast_client())], fill_gaps=True)
@@ -0,0 +1,143 @@
+"""
+Bulk ingestion of NASA POWER hourly data for a whole region.
+
+One regional request covers a bounding box; the answer is split into per-cell, per-day HourlySeries
+cache entries under the same keys NasaPowerClient.get_hourly_weather_data uses. After a run every point
+query inside the box for those days is a local cache hit.
+
+    python -m services.regionalIngest --bbox 23.5 90.0 24.5 91.0 --start 20240601 --end 20240607
+"""
+import argparse
+import datetime
+
+from .caching import cache_response
+from .grid import LAT_STEP, LON_STEP, snap_to_cell
+from .hourlySeries import HourlySeries
+from .upstreamScheduler import PREFETCH, upstream_priority
+
+# Keep single regional requests to a size the API accepts and we can hold in memory
+MAX_TILE_DEGREES = 10.0
+DEFAULT_DAYS_PER_REQUEST = 7
+
+
+def _frange(start, stop, step):
+    value = start
+    while value < stop:
+        yield value, min(value + step, stop)
+        value += step
+
+
+def _date_chunks(start_date, end_date, days):
+    start = datetime.datetime.strptime(start_date, "%Y%m%d").date()
+    end = datetime.datetime.strptime(end_date, "%Y%m%d").date()
+    while start <= end:
+        chunk_end = min(start + datetime.timedelta(days=days - 1), end)
+        yield start.strftime("%Y%m%d"), chunk_end.strftime("%Y%m%d")
+        start = chunk_end + datetime.timedelta(days=1)
+
+
+def explode_regional_payload(payload):
+    """
+    Split a regional FeatureCollection into {(lat, lon, "YYYYMMDD"): point payload}.
+    Each point payload looks like a /temporal/hourly/point answer for that cell and day.
+    """
+    entries = {}
+    for feature in payload.get("features", []):
+        coordinates = feature.get("geometry", {}).get("coordinates", [])
+        parameters = feature.get("properties", {}).get("parameter", {})
+        if len(coordinates) < 2 or not parameters:
+            continue
+
+        lon, lat = coordinates[0], coordinates[1]
+        cell = snap_to_cell(lat, lon)
+
+        by_day = {}
+        for name, series in parameters.items():
+            for time_key, value in series.items():
+                day = time_key[:8]
+                by_day.setdefault(day, {}).setdefault(name, {})[time_key] = value
+
+        for day, day_parameters in by_day.items():
+            entries[(cell[0], cell[1], day)] = {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": coordinates},
+                "properties": {"parameter": day_parameters},
+                "header": {"source": "regional", "start": day, "end": day},
+            }
+    return entries
+
+
+def ingest_region(lat_min, lat_max, lon_min, lon_max, start_date, end_date, client=None, days_per_request=DEFAULT_DAYS_PER_REQUEST):
+    """
+    Fetch the box tile by tile and date chunk by date chunk, and store one cache entry per cell and day.
+    """
+    if client is None:
+        from .registry import get_nasa_client
+
+        client = get_nasa_client()
+
+    summary = {"requests": 0, "failed_requests": 0, "cells": set(), "entries": 0}
+
+    # pad by half a cell so cells whose centre sits just outside the box edge are included
+    lat_min, lat_max = lat_min - LAT_STEP / 2, lat_max + LAT_STEP / 2
+    lon_min, lon_max = lon_min - LON_STEP / 2, lon_max + LON_STEP / 2
+
+    with upstream_priority(PREFETCH):
+        for tile_lat_min, tile_lat_max in _frange(lat_min, lat_max, MAX_TILE_DEGREES):
+            for tile_lon_min, tile_lon_max in _frange(lon_min, lon_max, MAX_TILE_DEGREES):
+                for chunk_start, chunk_end in _date_chunks(start_date, end_date, days_per_request):
+                    summary["requests"] += 1
+                    payload = client.get_regional_hourly_data(
+                        round(tile_lat_min, 4), round(tile_lat_max, 4), round(tile_lon_min, 4), round(tile_lon_max, 4),
+                        chunk_start, chunk_end,
+                    )
+                    if not payload:
+                        summary["failed_requests"] += 1
+                        continue
+
+                    for (lat, lon, day), point_payload in explode_regional_payload(payload).items():
+                        series = HourlySeries.from_nasa(point_payload)
+                        if series is None:
+                            continue
+                        cache_response(client.hourly_cache_key(lat, lon, day, day), series)
+                        summary["cells"].add((lat, lon))
+                        summary["entries"] += 1
+
+    summary["cells"] = len(summary["cells"])
+    print(f"📦 Regional ingestion done: {summary}")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pull NASA POWER hourly data for a bounding box into the local cache")
+    parser.add_argument("--bbox", nargs=4, type=float, required=True, metavar=("LAT_MIN", "LON_MIN", "LAT_MAX", "LON_MAX"))
+    parser.add_argument("--start", required=True, help="first day, YYYYMMDD")
+    parser.add_argument("--end", required=True, help="last day, YYYYMMDD")
+    parser.add_argument("--days-per-request", type=int, default=DEFAULT_DAYS_PER_REQUEST)
+    parser.add_argument("--base-url", help="NASA POWER base URL, e.g. a local stub serving recorded payloads")
+    args = parser.parse_args(argv)
+
+    lat_min, lon_min, lat_max, lon_max = args.bbox
+    if lat_min > lat_max or lon_min > lon_max:
+        parser.error("bbox must be LAT_MIN LON_MIN LAT_MAX LON_MAX")
+    for value in (args.start, args.end):
+        try:
+            datetime.datetime.strptime(value, "%Y%m%d")
+        except ValueError:
+            parser.error(f"invalid date {value!r}, use YYYYMMDD")
+    if args.start > args.end:
+        parser.error("--start must not be after --end")
+
+    from .registry import get_nasa_client
+
+    client = get_nasa_client()
+    if args.base_url:
+        client.REGIONAL_HOURLY_BASE_URL = f"{args.base_url.rstrip('/')}/api/temporal/hourly/regional"
+
+    summary = ingest_region(lat_min, lat_max, lon_min, lon_max, args.start, args.end, client=client,
+                            days_per_request=args.days_per_request)
+    return 0 if summary["failed_requests"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
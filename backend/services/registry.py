@@ -0,0 +1,77 @@
+import threading
+
+# Services are built on first use, not at import time, so a cold process only pays for what a request needs.
+_lock = threading.RLock()  # reentrant: a factory may ask the registry for the services it wraps
+_instances = {}
+
+
+def _get_or_create(name, factory):
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+
+    with _lock:
+        if name not in _instances:
+            _instances[name] = factory()
+        return _instances[name]
+
+
+def get_nasa_client():
+    def factory():
+        from .nasaPower import NasaPowerClient
+
+        return NasaPowerClient()
+
+    return _get_or_create("nasa_client", factory)
+
+
+def get_forecast_client():
+    def factory():
+        from .forecastService import ForecastClient
+
+        return ForecastClient()
+
+    return _get_or_create("forecast_client", factory)
+
+
+def get_risk_calculator():
+    def factory():
+        from .riskCalculator import RiskCalculator
+
+        return RiskCalculator()
+
+    return _get_or_create("risk_calculator", factory)
+
+
+def get_condition_classifier():
+    def factory():
+        from .weatherCondition import WeatherConditionClassifier
+
+        return WeatherConditionClassifier()
+
+    return _get_or_create("condition_classifier", factory)
+
+
+def get_forecast_source():
+    def factory():
+        from .providers import build_forecast_source
+
+        return build_forecast_source()
+
+    return _get_or_create("forecast_source", factory)
+
+
+def get_historical_source():
+    def factory():
+        from .providers import build_historical_source
+
+        return build_historical_source()
+
+    return _get_or_create("historical_source", factory)
+
+
+def reset(**overrides):
+    # drop every built service; benchmarks and tests pass stand-ins, e.g. reset(forecast_client=canned)
+    with _lock:
+        _instances.clear()
+        _instances.update(overrides)
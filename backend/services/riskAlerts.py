@@ -0,0 +1,445 @@
+"""
+Risk alert subscriptions for field crews.
+
+A subscription is (location, minimum risk level, horizon in hours). Subscriptions are grouped by grid cell;
+each evaluation pass hashes the cached forecast of every subscribed cell and only scores the cells whose
+forecast actually changed. Every subscription in a changed cell is checked against one shared scoring
+of that cell, so the cost follows the number of changed cells, not the number of subscriptions.
+
+Alerts go to the subscription's webhook (local hosts only) or are appended to an outbox file.
+
+The API is public: creating a subscription returns a secret (only its hash is stored), and reading or
+deleting it needs that secret (X-Subscription-Secret) or the admin token (X-Admin-Token, services.profiling).
+Subscriptions are capped per client and in total so the shared file cannot grow without bound.
+
+Everything lives in ALERTS_DIR, so any number of app workers and one evaluator can share it:
+subscriptions.json (changed under a file lock, read again on every pass) and state.json (forecast hashes
+and the hours already alerted, kept across runs so a cron pass does not repeat yesterday's alerts).
+A pass that finds another one still running is skipped. Start the evaluator in the app (ALERTS_RUN_IN_APP=1)
+or standalone:
+
+    python -m services.riskAlerts            # loop forever
+    python -m services.riskAlerts --once     # single pass, e.g. from cron
+"""
+import argparse
+import contextlib
+import datetime
+import hashlib
+import json
+import hmac
+import os
+import secrets
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+
+try:  # file locks: fcntl on POSIX, msvcrt on Windows
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+from .config import backend_path
+from .grid import cell_id, snap_to_cell
+from .upstreamScheduler import REFRESH, upstream_priority
+
+ALERTS_DIR = os.environ.get("ALERTS_DIR") or backend_path("alerts")
+EVALUATE_EVERY_SECONDS = float(os.environ.get("ALERTS_EVALUATE_EVERY", 300))
+# Webhooks may only point at these hosts, the API is public and must not be usable to reach arbitrary URLs
+WEBHOOK_ALLOWED_HOSTS = set(os.environ.get("ALERT_WEBHOOK_ALLOWED_HOSTS", "localhost,127.0.0.1").split(","))
+FORECAST_DAYS = 16  # Open-Meteo forecasts go 16 days ahead, today included
+MAX_HORIZON_HOURS = FORECAST_DAYS * 24
+
+# Most subscriptions one client (address, see services.admission) may hold, and most for everyone together
+MAX_SUBSCRIPTIONS_PER_CLIENT = int(os.environ.get("ALERTS_MAX_PER_CLIENT", 20))
+MAX_SUBSCRIPTIONS = int(os.environ.get("ALERTS_MAX_SUBSCRIPTIONS", 10000))
+# Stored per subscription, never returned by the API
+PRIVATE_FIELDS = ("secret_hash", "client")
+
+RISK_LEVELS = {"low": 0, "medium": 1, "high": 2}
+
+
+class InvalidSubscription(ValueError):
+    pass
+
+
+class SubscriptionLimit(Exception):
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status  # 429 when the client is at its own cap, 503 when everyone together is
+
+
+def _digest(value):
+    return hashlib.blake2b(value.encode(), digest_size=16).hexdigest()
+
+
+def public_subscription(subscription):
+    return {name: value for name, value in subscription.items() if name not in PRIVATE_FIELDS}
+
+
+def validate_subscription(data):
+    """
+    Check a subscription request body and return the normalized subscription, or raise InvalidSubscription.
+    """
+    try:
+        latitude = float(data["lat"])
+        longitude = float(data["lon"])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidSubscription("lat and lon are required numbers")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise InvalidSubscription("lat/lon out of range")
+
+    risk_level = data.get("risk_level", "high")
+    if risk_level not in ("medium", "high"):
+        raise InvalidSubscription("risk_level must be 'medium' or 'high'")
+
+    try:
+        horizon_hours = int(data.get("horizon_hours", 24))
+    except (TypeError, ValueError):
+        raise InvalidSubscription("horizon_hours must be an integer")
+    if not 1 <= horizon_hours <= MAX_HORIZON_HOURS:
+        raise InvalidSubscription(f"horizon_hours must be between 1 and {MAX_HORIZON_HOURS}")
+
+    webhook = data.get("webhook")
+    if webhook:
+        parsed = urlparse(webhook)
+        if parsed.scheme not in ("http", "https") or parsed.hostname not in WEBHOOK_ALLOWED_HOSTS:
+            raise InvalidSubscription(f"webhook must be an http(s) URL on one of {sorted(WEBHOOK_ALLOWED_HOSTS)}")
+
+    return {
+        "id": uuid.uuid4().hex[:12],
+        "lat": latitude,
+        "lon": longitude,
+        "cell": cell_id(latitude, longitude),
+        "risk_level": risk_level,
+        "horizon_hours": horizon_hours,
+        "webhook": webhook or None,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+@contextlib.contextmanager
+def _file_lock(path, blocking=True):
+    """
+    Exclusive lock on `path` shared by every process using the same folder. Yields False when
+    blocking=False and another process holds it.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a+") as f:
+        try:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            if blocking:
+                raise
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_json(path, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except json.JSONDecodeError as e:
+        print(f"❌ Could not read {path}: {e}")
+        return default
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)  # never leave a half written file behind
+
+
+class AlertEngine:
+    def __init__(self, alerts_dir=ALERTS_DIR):
+        self.alerts_dir = alerts_dir
+        self.subscriptions_path = os.path.join(alerts_dir, "subscriptions.json")
+        self.state_path = os.path.join(alerts_dir, "state.json")
+        self.outbox_path = os.path.join(alerts_dir, "outbox.jsonl")
+        # subscriptions.json and the outbox change under this one; a pass holds the evaluate lock
+        self.lock_path = os.path.join(alerts_dir, "subscriptions.lock")
+        self.evaluate_lock_path = os.path.join(alerts_dir, "evaluate.lock")
+        self._lock = threading.RLock()  # the file locks are per process, this one is for our own threads
+        self._thread = None
+        self.counters = {"passes": 0, "passes_skipped": 0, "cells_checked": 0, "cells_changed": 0, "subscriptions_scored": 0,
+                         "alerts_sent": 0}
+
+    # --- subscriptions -------------------------------------------------
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with self._lock, _file_lock(self.lock_path):
+            yield
+
+    def _read_subscriptions(self):
+        subscriptions = _read_json(self.subscriptions_path, [])
+        return [subscription for subscription in subscriptions if isinstance(subscription, dict) and "cell" in subscription]
+
+    def _subscriptions_by_cell(self):
+        with self._locked():
+            subscriptions = self._read_subscriptions()
+        by_cell = {}
+        for subscription in subscriptions:
+            by_cell.setdefault(subscription["cell"], []).append(subscription)
+        return by_cell
+
+    def add_subscription(self, subscription, client=None):
+        """
+        Store a validated subscription made by `client` and return it with its secret. This is the only time
+        the secret is shown, only its hash is kept. Raises SubscriptionLimit when a cap is reached.
+        """
+        secret = secrets.token_urlsafe(24)
+        stored = {**subscription, "secret_hash": _digest(secret), "client": None if client is None else _digest(client)}
+        # read-merge-write under the file lock, so concurrent workers never drop each other's subscriptions
+        with self._locked():
+            subscriptions = self._read_subscriptions()
+            if len(subscriptions) >= MAX_SUBSCRIPTIONS:
+                raise SubscriptionLimit("Subscription limit reached, try again later", 503)
+            own = sum(1 for existing in subscriptions if stored["client"] is not None and existing.get("client") == stored["client"])
+            if own >= MAX_SUBSCRIPTIONS_PER_CLIENT:
+                raise SubscriptionLimit(f"At most {MAX_SUBSCRIPTIONS_PER_CLIENT} subscriptions per client", 429)
+            subscriptions.append(stored)
+            _write_json(self.subscriptions_path, subscriptions)
+        return {**public_subscription(stored), "secret": secret}
+
+    @staticmethod
+    def _secret_matches(subscription, secret):
+        # secret=None: the caller checked the admin token. Subscriptions without a secret are admin only.
+        if secret is None:
+            return True
+        expected = subscription.get("secret_hash")
+        return bool(expected) and hmac.compare_digest(_digest(secret).encode(), expected.encode())
+
+    def get_subscription(self, subscription_id, secret=None):
+        """
+        The subscription without its private fields, None when it does not exist or the secret is wrong.
+        """
+        with self._locked():
+            subscriptions = self._read_subscriptions()
+        for subscription in subscriptions:
+            if subscription["id"] == subscription_id and self._secret_matches(subscription, secret):
+                return public_subscription(subscription)
+        return None
+
+    def remove_subscription(self, subscription_id, secret=None):
+        """
+        False when the subscription does not exist or the secret is wrong (the API does not tell them apart).
+        """
+        with self._locked():
+            subscriptions = self._read_subscriptions()
+            kept = [subscription for subscription in subscriptions
+                    if subscription["id"] != subscription_id or not self._secret_matches(subscription, secret)]
+            if len(kept) == len(subscriptions):
+                return False
+            _write_json(self.subscriptions_path, kept)
+        return True  # its dedup state is dropped by the next pass
+
+    def list_subscriptions(self):
+        # everyone's locations and webhooks: admin only
+        with self._locked():
+            return [public_subscription(subscription) for subscription in self._read_subscriptions()]
+
+    # --- evaluation ----------------------------------------------------
+
+    @staticmethod
+    def _series_hash(series, subscriptions):
+        # the hour is part of the hash: when the clock moves on, new hours enter the horizon even if the data did not change;
+        # so are the subscription ids: a new subscription in the cell gets scored on the next pass
+        hour = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%d%H").encode()
+        ids = ",".join(sorted(subscription["id"] for subscription in subscriptions)).encode()
+        return hashlib.blake2b(series.content_key() + hour + ids, digest_size=16).hexdigest()
+
+    def _cell_forecast(self, cell, horizon_hours):
+        from .registry import get_forecast_client
+
+        lat, lon = snap_to_cell(*map(float, cell.split("_")))
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        # local days can run a day past UTC, but never ask past the forecast window
+        end = min(today + datetime.timedelta(hours=horizon_hours + 24), today + datetime.timedelta(days=FORECAST_DAYS - 1))
+        # cell centre coordinates, so every subscription in the cell shares one cached forecast
+        return get_forecast_client().get_hourly_forecast(lat, lon, today.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+
+    def _score_cell(self, series, horizon_hours):
+        """
+        Overall risk for every hour from now to the longest horizon in the cell. Returns [(utc time, time label, risk)].
+        """
+        from .registry import get_risk_calculator
+
+        risk_calculator = get_risk_calculator()
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+        until = now + datetime.timedelta(hours=horizon_hours)
+
+        scored = []
+        for index, temperature, precipitation, wind_speed, humidity in series.rows():
+            when = series.utc_time_at(index)
+            if temperature is None or not now <= when < until:
+                continue
+            risk = risk_calculator.calculate_hourly_risk(temperature, precipitation or 0, wind_speed or 0, humidity)
+            scored.append((when, series.iso_time(index), risk))
+        return scored
+
+    def _load_state(self, by_cell):
+        # state of subscriptions / cells that are gone is dropped here
+        state = _read_json(self.state_path, {})
+        ids = {subscription["id"] for subscriptions in by_cell.values() for subscription in subscriptions}
+        hashes = {cell: value for cell, value in (state.get("hashes") or {}).items() if cell in by_cell}
+        sent = {subscription_id: hours for subscription_id, hours in (state.get("sent") or {}).items() if subscription_id in ids}
+        return hashes, sent
+
+    def evaluate(self):
+        """
+        One pass over the subscribed cells. Returns the alerts that were delivered,
+        None when another pass (this process or another one) is still running.
+        """
+        with _file_lock(self.evaluate_lock_path, blocking=False) as acquired:
+            if not acquired:
+                self.counters["passes_skipped"] += 1
+                print("⏭️ Alert evaluation skipped, another pass is still running")
+                return None
+            return self._evaluate()
+
+    def _evaluate(self):
+        started = time.perf_counter()
+        by_cell = self._subscriptions_by_cell()  # read again every pass, the API may run in other processes
+        hashes, sent = self._load_state(by_cell)
+
+        delivered = []
+        try:
+            with upstream_priority(REFRESH):
+                for cell, subscriptions in by_cell.items():
+                    horizon = max(subscription["horizon_hours"] for subscription in subscriptions)
+                    series = self._cell_forecast(cell, horizon)
+                    self.counters["cells_checked"] += 1
+                    if not series:
+                        continue
+
+                    series_hash = self._series_hash(series, subscriptions)
+                    if hashes.get(cell) == series_hash:
+                        continue  # same forecast as last time, nothing to re-score
+                    hashes[cell] = series_hash
+                    self.counters["cells_changed"] += 1
+
+                    scored = self._score_cell(series, horizon)
+                    labels = {label for _, label, _ in scored}
+                    for subscription in subscriptions:
+                        self.counters["subscriptions_scored"] += 1
+                        alert = self._check_subscription(subscription, scored, labels, sent)
+                        if alert:
+                            self._deliver(subscription, alert)
+                            delivered.append(alert)
+        finally:
+            # also after a failure halfway, so what was delivered is not delivered again
+            _write_json(self.state_path, {"hashes": hashes, "sent": sent})
+
+        self.counters["passes"] += 1
+        self.counters["alerts_sent"] += len(delivered)
+        self.counters["last_pass_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return delivered
+
+    def _check_subscription(self, subscription, scored, labels, sent_by_subscription):
+        threshold = RISK_LEVELS[subscription["risk_level"]]
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        until = now + datetime.timedelta(hours=subscription["horizon_hours"])
+        # hours that dropped out of the window are in the past, forget them
+        sent = sent_by_subscription[subscription["id"]] = {
+            label: level for label, level in sent_by_subscription.get(subscription["id"], {}).items() if label in labels
+        }
+
+        hours = []
+        for when, time_label, risk in scored:
+            level = risk["overall_risk"]
+            if when >= until or RISK_LEVELS[level] < threshold:
+                continue
+            if RISK_LEVELS.get(sent.get(time_label), -1) >= RISK_LEVELS[level]:
+                continue  # already told them about this hour at this level or worse
+            sent[time_label] = level
+            hours.append({"time": time_label, "overall_risk": level, "summary": risk["summary"]})
+
+        if not hours:
+            return None
+        return {
+            "subscription_id": subscription["id"],
+            "location": {"latitude": subscription["lat"], "longitude": subscription["lon"]},
+            "risk_level": subscription["risk_level"],
+            "hours": hours,
+            "generated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+
+    def _deliver(self, subscription, alert):
+        if subscription.get("webhook"):
+            import requests
+
+            try:
+                response = requests.post(subscription["webhook"], json=alert, timeout=5)
+                response.raise_for_status()
+                print(f"🔔 Alert for {subscription['id']} sent to webhook")
+                return
+            except requests.exceptions.RequestException as e:
+                print(f"❌ Webhook failed for {subscription['id']}, writing to outbox instead: {e}")
+
+        with self._locked(), open(self.outbox_path, "a") as f:
+            f.write(json.dumps(alert) + "\n")
+        print(f"🔔 Alert for {subscription['id']} written to outbox")
+
+    # --- background loop -------------------------------------------------
+
+    def run_forever(self, interval=EVALUATE_EVERY_SECONDS):
+        while True:
+            try:
+                self.evaluate()
+            except Exception as e:
+                print(f"💥 Alert evaluation failed: {e}")
+            time.sleep(interval)
+
+    def start(self, interval=EVALUATE_EVERY_SECONDS):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run_forever, args=(interval,), name="risk-alerts", daemon=True)
+                self._thread.start()
+
+    def stats(self):
+        by_cell = self._subscriptions_by_cell()
+        return {
+            "cells": len(by_cell),
+            "subscriptions": sum(len(subscriptions) for subscriptions in by_cell.values()),
+            **self.counters,
+        }
+
+
+# Global engine shared by the API endpoints
+alert_engine = AlertEngine()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate risk alert subscriptions")
+    parser.add_argument("--once", action="store_true", help="run a single evaluation pass and exit")
+    parser.add_argument("--interval", type=float, default=EVALUATE_EVERY_SECONDS)
+    args = parser.parse_args(argv)
+
+    if args.once:
+        alerts = alert_engine.evaluate()
+        if alerts is None:
+            return 0  # the previous run is still going, it covers this one
+        print(f"📦 {len(alerts)} alerts, {alert_engine.stats()}")
+        return 0
+    alert_engine.run_forever(args.interval)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,14 +1,11 @@
-import json
-import os
+from .config import load_thresholds
+
+RISK_LEVELS = {"low": 0, "medium": 1, "high": 2}
 
 
 class RiskCalculator:
     def __init__(self):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        thresholds_path = os.path.join(current_dir, "..", "config", "thresholds.json")
-
-        with open(thresholds_path, "r") as f:
-            self.thresholds = json.load(f)
+        self.thresholds = load_thresholds()
 
     def calculate_temperature_risk(self, temperature):
         thresholds = self.thresholds["temperature"]
@@ -56,13 +53,13 @@ class RiskCalculator:
         else:
             return "low", "Comfortable humidity"
 
-    def calculate_hourly_risk(self, temperature, precipitation, wind_speed, humidity=None):
+    def _assess(self, temperature, precipitation, wind_speed, humidity):
+        # (overall risk, summary, [(risk, message) for temperature, precipitation, wind, humidity or None])
         temp_risk, temp_msg = self.calculate_temperature_risk(temperature)
         precip_risk, precip_msg = self.calculate_precipitation_risk(precipitation)
         wind_risk, wind_msg = self.calculate_wind_risk(wind_speed)
 
-        risk_levels = {"low": 0, "medium": 1, "high": 2}
-        overall_risk = max([temp_risk, precip_risk, wind_risk], key=lambda x: risk_levels[x])
+        overall_risk = max([temp_risk, precip_risk, wind_risk], key=lambda x: RISK_LEVELS[x])
 
         messages = [temp_msg, precip_msg, wind_msg]
         non_low_messages = [
@@ -74,6 +71,19 @@ class RiskCalculator:
         else:
             summary = "Ideal weather conditions"
 
+        humidity_part = None
+        if humidity is not None:
+            humidity_part = humidity_risk, humidity_msg = self.calculate_humidity_risk(humidity)
+            if RISK_LEVELS[humidity_risk] > RISK_LEVELS[overall_risk]:
+                overall_risk = humidity_risk
+                summary += f"; {humidity_msg}"
+
+        return overall_risk, summary, [(temp_risk, temp_msg), (precip_risk, precip_msg), (wind_risk, wind_msg), humidity_part]
+
+    def calculate_hourly_risk(self, temperature, precipitation, wind_speed, humidity=None):
+        overall_risk, summary, parts = self._assess(temperature, precipitation, wind_speed, humidity)
+        (temp_risk, temp_msg), (precip_risk, precip_msg), (wind_risk, wind_msg), humidity_part = parts
+
         result = {
             "overall_risk": overall_risk,
             "summary": summary,
@@ -84,12 +94,21 @@ class RiskCalculator:
             },
         }
 
-        if humidity is not None:
-            humidity_risk, humidity_msg = self.calculate_humidity_risk(humidity)
-            result["details"]["humidity"] = {"risk": humidity_risk, "message": humidity_msg, "value": humidity}
-
-            if risk_levels[humidity_risk] > risk_levels[overall_risk]:
-                result["overall_risk"] = humidity_risk
-                result["summary"] += f"; {humidity_msg}"
+        if humidity_part is not None:
+            result["details"]["humidity"] = {"risk": humidity_part[0], "message": humidity_part[1], "value": humidity}
 
         return result
+
+    def calculate_batch(self, rows):
+        """
+        Flat scores for many hours at once, for bulk work that does not need the nested dict per hour.
+        rows are (temperature, precipitation, wind_speed, humidity); returns a list of
+        (overall risk, summary, temperature risk, precipitation risk, wind risk, humidity risk or None).
+        """
+        results = []
+        append = results.append
+        assess = self._assess
+        for temperature, precipitation, wind_speed, humidity in rows:
+            overall_risk, summary, parts = assess(temperature, precipitation, wind_speed, humidity)
+            append((overall_risk, summary, parts[0][0], parts[1][0], parts[2][0], parts[3] and parts[3][0]))
+        return results
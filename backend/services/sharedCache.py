@@ -0,0 +1,191 @@
+"""
+Shared L2 cache tier: a Redis (or anything speaking RESP, e.g. Valkey, KeyDB, Dragonfly) every app node reads and
+writes, so a city fetched by one node is a cache hit on all the others.
+
+    SHARED_CACHE_URL=redis://cache.internal:6379/0
+
+The client is a few lines of RESP over a socket, no redis package needed. When the server is unreachable the
+tier switches itself off for a few seconds and the app keeps working from its local tiers.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+
+SHARED_CACHE_URL = os.environ.get("SHARED_CACHE_URL", "")
+SHARED_CACHE_PREFIX = os.environ.get("SHARED_CACHE_PREFIX", "wir")
+SHARED_CACHE_TIMEOUT = float(os.environ.get("SHARED_CACHE_TIMEOUT", 0.5))
+# After a connection error the tier is skipped for this long instead of slowing every request down
+RETRY_AFTER_SECONDS = 5.0
+
+
+class RespError(Exception):
+    # error reply from the server ("-ERR ..."), the connection itself is fine
+    pass
+
+
+class SharedCacheUnavailable(Exception):
+    pass
+
+
+class RespClient:
+    """
+    Minimal RESP2 client: one connection per thread, commands are sent and answered one at a time.
+    """
+
+    def __init__(self, host="127.0.0.1", port=6379, db=0, password=None, timeout=SHARED_CACHE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        parsed = urlparse(url)
+        if parsed.scheme != "redis":
+            raise ValueError(f"unsupported shared cache URL {url!r}, use redis://host:port/db")
+        db = int(parsed.path.lstrip("/") or 0)
+        return cls(parsed.hostname or "127.0.0.1", parsed.port or 6379, db=db, password=parsed.password, **kwargs)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+            if self.password:
+                self._roundtrip(conn, ("AUTH", self.password))
+            if self.db:
+                self._roundtrip(conn, ("SELECT", self.db))
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+    @staticmethod
+    def _encode(args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("shared cache closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("shared cache closed the connection")
+            return data[:-2]
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [self._read_reply(reader) for _ in range(length)]
+        raise ConnectionError(f"unexpected reply from shared cache: {line[:20]!r}")
+
+    def _roundtrip(self, conn, args):
+        sock, reader = conn
+        sock.sendall(self._encode(args))
+        return self._read_reply(reader)
+
+    def execute(self, *args):
+        try:
+            return self._roundtrip(self._connection(), args)
+        except RespError:
+            raise
+        except (OSError, ValueError):
+            self.close()  # half read replies cannot be recovered, start over on the next call
+            raise
+
+
+class SharedCache:
+    """
+    Namespaced entries with a TTL in the shared server. Values are the same JSON entries the file tier stores.
+    """
+
+    def __init__(self, client, namespace):
+        self.client = client
+        self.namespace = namespace
+        self._down_until = 0.0
+
+    def available(self):
+        return time.monotonic() >= self._down_until
+
+    def _call(self, *args, force=False):
+        # force: try even inside the down window (releasing a lock must not wait for it)
+        if not force and not self.available():
+            raise SharedCacheUnavailable()
+        try:
+            return self.client.execute(*args)
+        except (OSError, ValueError, RespError) as e:
+            self._down_until = time.monotonic() + RETRY_AFTER_SECONDS
+            print(f"❌ Shared cache unavailable, using local cache only for {RETRY_AFTER_SECONDS:.0f}s: {e}")
+            raise SharedCacheUnavailable() from e
+
+    def _key(self, key):
+        return f"{self.namespace}{key}"
+
+    def get(self, key):
+        raw = self._call("GET", self._key(key))
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def set(self, key, entry, ttl_seconds):
+        ttl_ms = int(ttl_seconds * 1000)
+        if ttl_ms <= 0:
+            return False
+        return self._call("SET", self._key(key), json.dumps(entry), "PX", ttl_ms) == "OK"
+
+    def try_lock(self, key, ttl_seconds):
+        """
+        Token when we got the fill lock for `key`, None when another node holds it.
+        The TTL frees the lock if its holder dies.
+        """
+        token = uuid.uuid4().hex
+        reply = self._call("SET", self._key(f"lock:{key}"), token, "NX", "PX", int(ttl_seconds * 1000))
+        return token if reply == "OK" else None
+
+    def is_locked(self, key):
+        return self._call("GET", self._key(f"lock:{key}")) is not None
+
+    def unlock(self, key, token):
+        # compare-then-delete is not atomic without a script; the worst case is dropping a lock that was about to expire
+        try:
+            if self._call("GET", self._key(f"lock:{key}"), force=True) == token.encode():
+                self._call("DEL", self._key(f"lock:{key}"), force=True)
+        except SharedCacheUnavailable:
+            pass  # the TTL frees it
+
+
+def shared_cache_from_env(schema_version):
+    """
+    SharedCache for SHARED_CACHE_URL, None when no shared tier is configured. Connects on first use.
+    """
+    if not SHARED_CACHE_URL:
+        return None
+    return SharedCache(RespClient.from_url(SHARED_CACHE_URL), f"{SHARED_CACHE_PREFIX}:v{schema_version}:")
@@ -0,0 +1,44 @@
+import time
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, holds at most `capacity`. Not thread safe, callers hold their own lock.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        if now < self.paused_until:
+            self.updated = now
+            return
+        start = max(self.updated, self.paused_until)
+        # `now` may have been read just before the bucket was made, time never counts backwards
+        self.tokens = min(self.capacity, self.tokens + max(0.0, now - start) * self.rate)
+        self.updated = max(self.updated, now)
+
+    def try_take(self, now=None):
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_token(self, now=None):
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        wait = max(0.0, self.paused_until - now)
+        if self.tokens < 1:
+            wait += (1 - self.tokens) / self.rate
+        return wait
+
+    def pause(self, seconds):
+        # upstream told us to slow down: empty the bucket and stop refilling for a while
+        self.tokens = 0.0
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
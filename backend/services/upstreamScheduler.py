@@ -0,0 +1,197 @@
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from .deadline import bounded_timeout, cancelled, remaining_time
+from .latencyTracker import upstream_latency
+from .profiling import record_upstream_call
+from .tokenBucket import TokenBucket
+
+# Lower number = served first. Interactive user requests beat cache refreshes, which beat prefetching.
+INTERACTIVE = 0
+REFRESH = 1
+PREFETCH = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", REFRESH: "refresh", PREFETCH: "prefetch"}
+
+# Longest a call may wait in the queue before it is dropped (seconds).
+# Low priority work gives up early so it never sits in front of users.
+QUEUE_DEADLINES = {INTERACTIVE: 10.0, REFRESH: 5.0, PREFETCH: 2.0}
+
+# (requests per second, burst) per upstream provider, for the whole deployment
+PROVIDER_LIMITS = {
+    "nasa_power": (2.0, 5),
+    "open_meteo": (5.0, 10),
+    "nominatim": (1.0, 1),  # Nominatim usage policy: absolute maximum of 1 request per second
+    "open_meteo_mirror": (20.0, 40),  # our own Open-Meteo instance (OPEN_METEO_MIRROR_URL), hedged requests go there
+}
+
+# The buckets live in each process, so every process making upstream calls gets an equal share of the limits.
+# gunicorn.conf.py sets this to its worker count; add one if the alert runner (services.riskAlerts) runs apart.
+UPSTREAM_PROCESSES = max(1, int(os.environ.get("UPSTREAM_PROCESSES", 1)))
+
+# When a provider answers 429 without Retry-After we back off this long
+DEFAULT_RETRY_AFTER = 30.0
+
+# Used when a client does not pass its own timeout, so no upstream call can hang forever
+DEFAULT_UPSTREAM_TIMEOUT = 10.0
+
+_priority = contextvars.ContextVar("upstream_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def upstream_priority(priority):
+    """
+    Run upstream calls made inside the block at the given priority, e.g. `with upstream_priority(PREFETCH): ...`
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class UpstreamDropped(requests.exceptions.RequestException):
+    # subclass of RequestException so the clients' existing error handling returns None for it
+    pass
+
+
+class UpstreamScheduler:
+    """
+    Shared gate in front of every upstream API. Each provider has a token bucket and a priority queue,
+    callers block in acquire() until they are at the head of the queue and a token is free.
+    `limits` are for the deployment, each of the `processes` gets 1/processes of the rate and burst.
+    """
+
+    def __init__(self, limits=None, queue_deadlines=None, processes=None):
+        self.limits = dict(PROVIDER_LIMITS if limits is None else limits)
+        self.processes = UPSTREAM_PROCESSES if processes is None else max(1, processes)
+        self.queue_deadlines = dict(QUEUE_DEADLINES if queue_deadlines is None else queue_deadlines)
+        self._cond = threading.Condition()
+        self._buckets = {}
+        self._waiting = {}
+        self._seq = itertools.count()
+        self._counters = {}
+
+    def _provider(self, provider):
+        if provider not in self._buckets:
+            rate, burst = self.limits.get(provider, (5.0, 5))
+            # the burst is rounded down so the processes together never exceed it, but one call must always fit
+            self._buckets[provider] = TokenBucket(rate / self.processes, max(1, burst // self.processes))
+            self._waiting[provider] = []
+            self._counters[provider] = {name: {"admitted": 0, "queued": 0, "throttled": 0, "dropped": 0}
+                                        for name in PRIORITY_NAMES.values()}
+        return self._buckets[provider], self._waiting[provider]
+
+    def acquire(self, provider, priority=None, max_wait=None):
+        """
+        Block until a call to `provider` may go out. Returns False if the call was dropped
+        because it waited longer than its queue deadline.
+        """
+        priority = _priority.get() if priority is None else priority
+        if max_wait is None:
+            max_wait = self.queue_deadlines.get(priority, QUEUE_DEADLINES[PREFETCH])
+        # no point waiting for a token the request will not be around to use
+        max_wait = bounded_timeout(max_wait)
+
+        with self._cond:
+            bucket, waiting = self._provider(provider)
+            counters = self._counters[provider][PRIORITY_NAMES[priority]]
+            now = time.monotonic()
+
+            if not waiting and bucket.try_take(now):
+                counters["admitted"] += 1
+                return True
+
+            entry = (priority, next(self._seq))
+            heapq.heappush(waiting, entry)
+            counters["queued"] += 1
+            give_up_at = now + max_wait
+
+            while True:
+                now = time.monotonic()
+                if waiting[0] == entry and bucket.try_take(now):
+                    heapq.heappop(waiting)
+                    counters["admitted"] += 1
+                    self._cond.notify_all()
+                    return True
+
+                if now >= give_up_at or cancelled():
+                    waiting.remove(entry)
+                    heapq.heapify(waiting)
+                    counters["dropped"] += 1
+                    if not cancelled():
+                        print(f"🚫 Dropped {PRIORITY_NAMES[priority]} call to {provider} after {max_wait:.1f}s in queue")
+                    self._cond.notify_all()
+                    return False
+
+                timeout = give_up_at - now
+                if waiting[0] == entry:
+                    timeout = min(timeout, bucket.time_until_token(now))
+                self._cond.wait(max(timeout, 0.001))
+
+    def wake_waiters(self):
+        # waiting callers re-check their state, e.g. after a hedged request cancelled the loser
+        with self._cond:
+            self._cond.notify_all()
+
+    def report_rate_limited(self, provider, retry_after=None):
+        with self._cond:
+            bucket, _ = self._provider(provider)
+            bucket.pause(DEFAULT_RETRY_AFTER if retry_after is None else retry_after)
+            self._counters[provider][PRIORITY_NAMES[_priority.get()]]["throttled"] += 1
+        print(f"🐢 {provider} answered 429, pausing calls for {retry_after or DEFAULT_RETRY_AFTER}s")
+
+    def stats(self):
+        with self._cond:
+            return {
+                provider: {"waiting": len(self._waiting[provider]), "by_priority": {k: dict(v) for k, v in counters.items()}}
+                for provider, counters in self._counters.items()
+            }
+
+
+def _parse_retry_after(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None  # HTTP-date form or missing, use the default back off
+
+
+# Global scheduler shared by all clients
+scheduler = UpstreamScheduler()
+
+
+def scheduled_get(provider, url, **kwargs):
+    """
+    requests.get() that waits for its turn with the scheduler and backs off when the provider says 429.
+    The timeout never runs past the current request deadline.
+    """
+    if not scheduler.acquire(provider):
+        raise UpstreamDropped(f"{provider} call dropped by upstream scheduler")
+
+    kwargs["timeout"] = bounded_timeout(kwargs.get("timeout") or DEFAULT_UPSTREAM_TIMEOUT)
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise UpstreamDropped(f"{provider} call skipped, request deadline already passed")
+    if cancelled():
+        raise UpstreamDropped(f"{provider} call skipped, the answer is no longer needed")
+
+    started = time.perf_counter()
+    try:
+        response = requests.get(url, **kwargs)
+    except requests.exceptions.RequestException as e:
+        record_upstream_call(provider, url, type(e).__name__, time.perf_counter() - started)
+        raise
+    elapsed = time.perf_counter() - started
+    record_upstream_call(provider, url, response.status_code, elapsed)
+    if response.status_code == 200:
+        upstream_latency.observe(provider, elapsed)
+
+    if response.status_code == 429:
+        scheduler.report_rate_limited(provider, _parse_retry_after(response.headers.get("Retry-After")))
+    return response
@@ -1,13 +1,8 @@
-import json
-import os
+from .config import load_thresholds
 
 class WeatherConditionClassifier:
     def __init__(self):
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        thresholds_path = os.path.join(current_dir, "..", "config", "thresholds.json")
-
-        with open(thresholds_path, "r") as f:
-            self.thresholds = json.load(f)
+        self.thresholds = load_thresholds()
 
     def get_condition(self, temperature, precipitation, wind_speed, humidity):
         t = self.thresholds
@@ -42,3 +37,8 @@ class WeatherConditionClassifier:
 
         # --- Default Comfortable Weather ---
         return "Clear / Pleasant"
+
+    def get_conditions(self, rows):
+        # one condition per (temperature, precipitation, wind_speed, humidity) row, for bulk scoring
+        get_condition = self.get_condition
+        return [get_condition(*row) for row in rows]
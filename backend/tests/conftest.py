@@ -0,0 +1,72 @@
+"""
+Shared fixtures. Tests run against the local stubs in benchmarks/, never the real upstreams:
+
+    cd backend && python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+
+# before any service module is imported: a throwaway cache folder and no shared tier
+os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="tests_cache_")
+os.environ["SHARED_CACHE_URL"] = ""
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """
+    A fresh Flask app, with the per-client rate limit lifted: every test request comes from the same address.
+    """
+    import app as app_module
+    from services import admission
+
+    monkeypatch.setattr(admission, "client_limiter", admission.ClientRateLimiter(rate=10000.0, burst=10000))
+    flask_app = app_module.create_app()
+    flask_app.testing = True
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def fresh_cache(tmp_path, monkeypatch):
+    """
+    The global cache, emptied: its own folder, nothing in memory, no shared tier.
+    """
+    from services.caching import cache
+
+    monkeypatch.setattr(cache, "cache_dir", str(tmp_path / "cache"))
+    monkeypatch.setattr(cache, "_memory_cache", {})
+    monkeypatch.setattr(cache, "_dir_ready", False)
+    monkeypatch.setattr(cache, "shared", None)
+    return cache
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """
+    Stub upstreams with every client pointed at them and the politeness limits lifted.
+    """
+    from benchmarks.stub_upstreams import start_stub
+    from services import locationService
+    from services.forecastService import ForecastClient
+    from services.nasaPower import NasaPowerClient
+    from services import upstreamScheduler
+
+    server = start_stub()
+    monkeypatch.setattr(NasaPowerClient, "HOURLY_BASE_URL", f"{server.base_url}/api/temporal/hourly/point")
+    monkeypatch.setattr(NasaPowerClient, "DAILY_BASE_URL", f"{server.base_url}/api/temporal/daily/point")
+    monkeypatch.setattr(NasaPowerClient, "REGIONAL_HOURLY_BASE_URL", f"{server.base_url}/api/temporal/hourly/regional")
+    monkeypatch.setattr(ForecastClient, "BASE_URL", f"{server.base_url}/v1/forecast")
+    monkeypatch.setattr(locationService, "NOMINATIM_URL", f"{server.base_url}/search")
+    limits = {name: (10000.0, 10000) for name in upstreamScheduler.PROVIDER_LIMITS}
+    monkeypatch.setattr(upstreamScheduler, "scheduler", upstreamScheduler.UpstreamScheduler(limits=limits))
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,167 @@
+"""
+Admission control on /api/weather/hourly: 429 / 503 / 504 with their counters, and what the rendered-body
+cache may keep when the answer is incomplete.
+"""
+import datetime
+import threading
+import time
+
+import pytest
+
+from services import admission, registry
+from services.compression import encoded_payloads
+from services.deadline import request_deadline
+from services.hourlySeries import HourlySeries
+
+
+def _day_series(day, temperature=25.0):
+    start = datetime.datetime.combine(day, datetime.time())
+    times = [(start + datetime.timedelta(hours=h)).strftime("%Y-%m-%dT%H:%M") for h in range(24)]
+    return HourlySeries.from_open_meteo({"utc_offset_seconds": 0, "hourly": {
+        "time": times, "temperature_2m": [temperature] * 24, "precipitation": [0.0] * 24,
+        "windspeed_10m": [3.0] * 24, "relative_humidity_2m": [50.0] * 24,
+    }})
+
+
+class Source:
+    """
+    HedgedSource stand-in: a day of hourly data, None when `fails`, after `delay` seconds.
+    """
+
+    def __init__(self, fails=False, delay=0.0):
+        self.fails = fails
+        self.delay = delay
+        self.calls = 0
+
+    def get_day(self, latitude, longitude, day):
+        self.calls += 1
+        time.sleep(self.delay)
+        return None if self.fails else _day_series(day)
+
+
+@pytest.fixture
+def sources():
+    def install(historical=None, forecast=None):
+        historical, forecast = historical or Source(), forecast or Source()
+        registry.reset(historical_source=historical, forecast_source=forecast)
+        return historical, forecast
+
+    yield install
+    registry.reset()
+
+
+@pytest.fixture(autouse=True)
+def empty_payload_cache(monkeypatch):
+    monkeypatch.setattr(encoded_payloads, "_entries", type(encoded_payloads._entries)())
+
+
+def _counters():
+    return dict(admission.endpoint_limiters["hourly"].counters)
+
+
+def _delta(before, after):
+    return {name: after[name] - before[name] for name in after if after[name] != before[name]}
+
+
+def _hourly(client, date, lat="23.8"):
+    return client.get("/api/weather/hourly", query_string={"lat": lat, "lon": "90.4", "date": date})
+
+
+def test_complete_answer_is_served_and_kept(client, sources):
+    historical, _ = sources()
+
+    first = _hourly(client, "2024-06-01")
+    second = _hourly(client, "2024-06-01")
+
+    assert first.status_code == second.status_code == 200
+    assert len(first.get_json()["hourly_data"]) == 24
+    assert second.data == first.data
+    assert historical.calls == 1
+
+
+def test_client_over_its_rate_gets_429(client, sources, monkeypatch):
+    sources()
+    monkeypatch.setattr(admission, "client_limiter", admission.ClientRateLimiter(rate=0.01, burst=1))
+    before = _counters()
+
+    assert _hourly(client, "2024-06-01").status_code == 200
+    limited = _hourly(client, "2024-06-01")
+
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= 1
+    assert _delta(before, _counters()) == {"admitted": 1, "rejected_rate": 1}
+
+
+def test_endpoint_at_its_in_flight_limit_gets_503(client, sources):
+    sources()
+    limiter = admission.endpoint_limiters["hourly"]
+    held = 0
+    while limiter.try_enter():
+        held += 1
+    before = _counters()
+    try:
+        busy = _hourly(client, "2024-06-01")
+    finally:
+        for _ in range(held):
+            limiter.leave()
+
+    assert held == limiter.max_in_flight
+    assert busy.status_code == 503
+    assert busy.headers["Retry-After"] == "1"
+    assert _delta(before, _counters()) == {"rejected_overload": 1}
+    assert _hourly(client, "2024-06-01").status_code == 200  # the slots are back
+
+
+def test_deadline_running_out_gives_504_and_keeps_nothing(client, sources):
+    sources(historical=Source(delay=0.3))
+    before = _counters()
+
+    # a deadline around the request can only shorten the endpoint's own one
+    with request_deadline(0.1):
+        response = _hourly(client, "2024-06-01")
+
+    assert response.status_code == 504
+    assert _delta(before, _counters()) == {"admitted": 1, "deadline_exceeded": 1}
+    assert len(encoded_payloads._entries) == 0
+
+
+def test_partial_answer_is_served_but_not_kept(client, sources):
+    today = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d")
+    historical, forecast = sources(forecast=Source(fails=True))
+
+    first = _hourly(client, today)
+    _hourly(client, today)
+
+    assert first.status_code == 200
+    assert first.get_json()["hourly_data"]  # what the historical source gave
+    assert len(encoded_payloads._entries) == 0
+    assert historical.calls == 2
+
+
+def test_failed_forecast_is_not_kept(client, sources):
+    tomorrow = (datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+    sources(forecast=Source(fails=True))
+
+    response = _hourly(client, tomorrow)
+
+    assert response.status_code == 200
+    assert response.get_json()["hourly_data"] == []
+    assert len(encoded_payloads._entries) == 0
+
+
+def test_concurrent_requests_stay_within_the_limit(client, sources):
+    sources(historical=Source(delay=0.2))
+    limiter = admission.endpoint_limiters["hourly"]
+    statuses = []
+
+    def call(n):
+        statuses.append(_hourly(client, "2024-06-01", lat=str(n)).status_code)
+
+    threads = [threading.Thread(target=call, args=(n,)) for n in range(limiter.max_in_flight + 4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses.count(200) >= limiter.max_in_flight - 1
+    assert set(statuses) <= {200, 503}
@@ -0,0 +1,114 @@
+"""
+POST /api/export/hourly: the three formats, request validation and the export slot limit.
+"""
+import csv
+import io
+import json
+import threading
+
+import pytest
+
+from services import bulkExport
+from services.bulkExport import FIELDS
+
+SITES = [{"lat": 23.8, "lon": 90.4, "name": "dhaka"}, {"lat": 22.36, "lon": 91.78}]
+NASA_PATH = "/api/temporal/hourly/point"
+
+
+@pytest.fixture
+def export(client, stub, fresh_cache):
+    def post(fmt="csv", locations=SITES, start="2024-03-01", end="2024-03-03"):
+        response = client.post("/api/export/hourly", json={"locations": locations, "start": start, "end": end, "format": fmt})
+        body = response.get_data()
+        response.close()  # what the server does when the stream is done, frees the export slot
+        return response, body
+
+    return post
+
+
+def test_csv_has_the_header_and_one_row_per_site_and_hour(export):
+    response, body = export("csv")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    assert 'filename="hourly_20240301_20240303.csv"' in response.headers["Content-Disposition"]
+    rows = list(csv.reader(io.StringIO(body.decode())))
+    assert tuple(rows[0]) == FIELDS
+    assert len(rows) == 1 + 2 * 72
+    assert {row[0] for row in rows[1:]} == {"dhaka", "22.36,91.78"}  # unnamed sites are named by their coordinates
+    assert rows[1][3] == "2024-03-01T00:00:00"
+
+
+def test_ndjson_has_one_object_per_line(export):
+    response, body = export("ndjson")
+
+    lines = body.decode().splitlines()
+    assert response.mimetype == "application/x-ndjson"
+    assert len(lines) == 2 * 72
+    first = json.loads(lines[0])
+    assert tuple(first) == FIELDS
+    assert first["site"] == "dhaka" and first["overall_risk"] in ("low", "medium", "high")
+
+
+def test_parquet_reads_back_as_a_table(export):
+    pq = pytest.importorskip("pyarrow.parquet")
+    response, body = export("parquet")
+
+    parquet = pq.ParquetFile(io.BytesIO(body))
+    table = parquet.read()
+    assert response.mimetype == "application/vnd.apache.parquet"
+    assert tuple(table.column_names) == FIELDS
+    assert table.num_rows == 2 * 72
+    assert parquet.num_row_groups == 2  # one per site window
+
+
+def test_cached_days_are_not_fetched_again(export, stub):
+    export("csv")
+    calls = stub.calls[NASA_PATH]
+    _, body = export("ndjson")
+
+    assert calls == 2  # one request per site for the three days
+    assert stub.calls[NASA_PATH] == calls
+    assert len(body.decode().splitlines()) == 2 * 72
+
+
+@pytest.mark.parametrize("body, message", [
+    ({"locations": [], "start": "2024-03-01", "end": "2024-03-02"}, "non-empty list"),
+    ({"locations": [{"lat": "x", "lon": 1}], "start": "2024-03-01", "end": "2024-03-02"}, "numeric lat and lon"),
+    ({"locations": [{"lat": 91, "lon": 1}], "start": "2024-03-01", "end": "2024-03-02"}, "out of range"),
+    ({"locations": SITES, "start": "01/03/2024", "end": "2024-03-02"}, "YYYY-MM-DD"),
+    ({"locations": SITES, "start": "2024-03-02", "end": "2024-03-01"}, "not be after end"),
+    ({"locations": SITES, "start": "2024-03-01", "end": "2999-01-01"}, "history only"),
+    ({"locations": SITES, "start": "2024-03-01", "end": "2024-03-02", "format": "xlsx"}, "format must be one of"),
+])
+def test_invalid_requests_are_refused(client, body, message):
+    response = client.post("/api/export/hourly", json=body)
+
+    assert response.status_code == 400
+    assert message in response.get_json()["error"]
+
+
+def test_too_many_days_or_locations_are_refused(client, monkeypatch):
+    monkeypatch.setattr(bulkExport, "MAX_DAYS", 2)
+    monkeypatch.setattr(bulkExport, "MAX_LOCATIONS", 1)
+
+    days = client.post("/api/export/hourly", json={"locations": SITES[:1], "start": "2024-03-01", "end": "2024-03-03"})
+    sites = client.post("/api/export/hourly", json={"locations": SITES, "start": "2024-03-01", "end": "2024-03-01"})
+
+    assert "at most 2 days" in days.get_json()["error"]
+    assert "at most 1 locations" in sites.get_json()["error"]
+
+
+def test_export_slots_are_limited_and_given_back(export, monkeypatch):
+    monkeypatch.setattr(bulkExport, "export_slots", threading.BoundedSemaphore(1))
+    bulkExport.export_slots.acquire()
+    busy, _ = export("csv")
+    bulkExport.export_slots.release()
+
+    assert busy.status_code == 503
+    assert busy.headers["Retry-After"] == "30"
+
+    done, _ = export("csv")
+    assert done.status_code == 200
+    assert bulkExport.export_slots.acquire(blocking=False)  # the finished export gave its slot back
+    bulkExport.export_slots.release()
@@ -0,0 +1,37 @@
+"""
+Response compression: negotiation, and revalidation of compressed static files.
+"""
+from services.compression import negotiate_encoding
+
+
+def test_negotiation_honours_q_values():
+    assert negotiate_encoding("gzip;q=0.5, identity") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("") is None
+
+
+def test_compressed_static_file_revalidates_with_its_own_etag(client):
+    first = client.get("/script.js", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["Content-Encoding"] == "gzip"
+    etag = first.headers["ETag"]
+    assert etag.endswith('-gzip"')
+
+    again = client.get("/script.js", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+
+    assert again.status_code == 304
+    assert again.data == b""
+
+
+def test_changed_file_etag_still_gets_the_full_body(client):
+    response = client.get("/script.js", headers={"Accept-Encoding": "gzip", "If-None-Match": '"stale-gzip"'})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.data
+
+
+def test_uncompressed_revalidation_is_left_to_werkzeug(client):
+    etag = client.get("/script.js").headers["ETag"]
+
+    assert client.get("/script.js", headers={"If-None-Match": etag}).status_code == 304
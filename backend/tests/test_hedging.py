@@ -0,0 +1,212 @@
+"""
+Hedged requests: hedging, fallback, cancelling the loser, and the hedge never waiting on the call it hedges.
+"""
+import datetime
+import os
+import threading
+import time
+
+import pytest
+
+from benchmarks.stub_upstreams import start_stub
+from services import hedging, providers
+from services.deadline import cancelled
+from services.forecastService import ForecastClient
+from services.hourlySeries import HourlySeries
+from services.nasaPower import NasaPowerClient
+from services.providers import HedgedSource, NasaPowerProvider, OpenMeteoProvider
+
+
+class Provider:
+    def __init__(self, name, answer, delay=0.0):
+        self.name = name
+        self.upstream = f"test_{name}"  # no latency samples: the hedge waits DEFAULT_HEDGE_DELAY_SECONDS
+        self.answer = answer
+        self.delay = delay
+        self.calls = 0
+        self.saw_cancel = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        give_up_at = time.monotonic() + self.delay
+        while time.monotonic() < give_up_at:
+            if cancelled():
+                self.saw_cancel.set()
+                return None
+            time.sleep(0.005)
+        return self.answer
+
+
+@pytest.fixture(autouse=True)
+def short_hedge_delay(monkeypatch):
+    monkeypatch.setattr(hedging, "DEFAULT_HEDGE_DELAY_SECONDS", 0.05)
+
+
+def test_slow_primary_is_hedged_and_the_hedge_wins():
+    slow, fast = Provider("slow", "primary", delay=2.0), Provider("fast", "mirror")
+    before = hedging.hedging_stats()
+
+    started = time.perf_counter()
+    answer, winner = hedging.first_answer([slow, fast], lambda provider: provider(), hedge=True)
+
+    assert (answer, winner) == ("mirror", fast)
+    assert time.perf_counter() - started < 0.5
+    after = hedging.hedging_stats()
+    assert after["hedged"] - before["hedged"] == 1
+    assert after["hedge_wins"] - before["hedge_wins"] == 1
+
+
+def test_the_losing_attempt_is_told_to_stop():
+    slow, fast = Provider("slow", "primary", delay=2.0), Provider("fast", "mirror")
+
+    hedging.first_answer([slow, fast], lambda provider: provider(), hedge=True)
+
+    assert slow.saw_cancel.wait(1)
+
+
+def test_no_hedge_when_the_primary_answers_in_time():
+    primary, mirror = Provider("primary", "primary"), Provider("mirror", "mirror")
+
+    assert hedging.first_answer([primary, mirror], lambda provider: provider(), hedge=True) == ("primary", primary)
+    assert mirror.calls == 0
+
+
+def test_failed_primary_falls_back_right_away_without_hedging():
+    failing, backup = Provider("failing", None), Provider("backup", "backup")
+    before = hedging.hedging_stats()
+
+    assert hedging.first_answer([failing, backup], lambda provider: provider(), hedge=False) == ("backup", backup)
+    after = hedging.hedging_stats()
+    assert after["fallbacks"] - before["fallbacks"] == 1
+    assert after["hedged"] == before["hedged"]
+
+
+def test_nothing_answered():
+    providers = [Provider("a", None), Provider("b", None)]
+
+    assert hedging.first_answer(providers, lambda provider: provider(), hedge=True) == (None, None)
+
+
+# --- through HedgedSource, the cache and real HTTP stubs ----------------------------------------------
+# Every test uses its own cell: a losing primary call is still in flight after its test and lands in the cache.
+
+
+@pytest.fixture
+def primary_and_mirror(stub, fresh_cache):
+    # `stub` lifts the scheduler limits; the primary gets its own slow stub
+    slow = start_stub(latency=1.5)
+    primary = OpenMeteoProvider(ForecastClient(base_url=f"{slow.base_url}/v1/forecast"))
+    mirror = OpenMeteoProvider(ForecastClient(base_url=f"{stub.base_url}/v1/forecast", upstream="open_meteo_mirror"),
+                               name="open_meteo_mirror")
+    yield primary, mirror, slow, stub
+    slow.shutdown()
+    slow.server_close()
+
+
+def test_hedge_to_a_mirror_does_not_wait_on_the_primary_fetch(primary_and_mirror):
+    # the mirror shares the primary's cache key; joining the primary's single-flight would make
+    # the hedge exactly as slow as the call it hedges
+    primary, mirror, slow, fast = primary_and_mirror
+    day = datetime.date.today() + datetime.timedelta(days=1)
+
+    started = time.perf_counter()
+    series = HedgedSource([primary, mirror], hedge=True).get_day(23.5, 90.0, day)
+
+    assert series is not None and len(series) == 24
+    assert time.perf_counter() - started < 1.0
+    assert fast.calls["/v1/forecast"] == 1
+    assert mirror.cached(23.5, 90.0, day) == series  # the winner is written back
+
+
+def test_cached_day_is_served_without_hedging(primary_and_mirror):
+    primary, mirror, slow, fast = primary_and_mirror
+    day = datetime.date.today() + datetime.timedelta(days=1)
+    series = HedgedSource([primary, mirror], hedge=True).get_day(24.0, 90.625, day)
+    calls = sum(slow.calls.values()) + sum(fast.calls.values())
+
+    assert HedgedSource([primary, mirror], hedge=True).get_day(24.0, 90.625, day) == series
+    assert sum(slow.calls.values()) + sum(fast.calls.values()) == calls
+
+
+def test_concurrent_requests_share_the_preferred_providers_fetch(stub, fresh_cache):
+    primary = OpenMeteoProvider(ForecastClient(base_url=f"{stub.base_url}/v1/forecast"))
+    mirror = OpenMeteoProvider(ForecastClient(base_url=f"{stub.base_url}/v1/forecast", upstream="open_meteo_mirror"),
+                               name="open_meteo_mirror")
+    stub.latency = 0.3
+    source = HedgedSource([primary, mirror], hedge=False)
+    day = datetime.date.today() + datetime.timedelta(days=1)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(source.get_day(24.5, 91.25, day))) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 6 and results[0] is not None and all(series == results[0] for series in results)
+    assert stub.calls["/v1/forecast"] == 1
+
+
+# --- NASA POWER days that are not published yet -----------------------------------------------------------
+
+
+class UnpublishedNasa(NasaPowerClient):
+    """
+    NASA client answering fill values only (the day is not published yet), or None when `fails`.
+    """
+
+    def __init__(self, fails=False):
+        super().__init__()
+        self.fails = fails
+        self.calls = 0
+
+    def fetch_hourly_range(self, latitude, longitude, start_date, end_date):
+        self.calls += 1
+        if self.fails:
+            return None
+        hours = {f"{start_date}{h:02d}": -999.0 for h in range(24)}
+        return HourlySeries.from_nasa({"properties": {"parameter": {"T2M": hours, "PRECTOTCORR": hours}}})
+
+
+def _historical(nasa, stub):
+    forecast = OpenMeteoProvider(ForecastClient(base_url=f"{stub.base_url}/v1/forecast"))
+    return HedgedSource([NasaPowerProvider(nasa), forecast], fill_gaps=True, hedge=False)
+
+
+def test_unpublished_nasa_day_is_remembered_and_goes_straight_to_the_fallback(stub, fresh_cache):
+    nasa = UnpublishedNasa()
+    source = _historical(nasa, stub)
+    day = datetime.date.today() - datetime.timedelta(days=1)
+
+    first = source.get_day(25.0, 91.875, day)
+    # the forecast entry expires, the not-published marker does not
+    forecast_key = source.providers[1].cache_key(25.0, 91.875, day)
+    fresh_cache._memory_cache.pop(forecast_key)
+    os.remove(fresh_cache._get_cache_path(forecast_key))
+    second = source.get_day(25.0, 91.875, day)
+
+    assert first is not None and first.source == "forecast"
+    assert second == first
+    assert nasa.calls == 1  # the second miss did not ask NASA again
+    assert stub.calls["/v1/forecast"] == 2
+
+
+def test_not_published_marker_is_short_lived(stub, fresh_cache, monkeypatch):
+    monkeypatch.setattr(providers, "NOT_PUBLISHED_HOURS", 1.0)
+    provider = NasaPowerProvider(UnpublishedNasa())
+    day = datetime.date.today() - datetime.timedelta(days=1)
+
+    assert provider.get(25.5, 92.5, day) is None
+    entry = fresh_cache._memory_cache[provider._not_published_key(25.5, 92.5, day)]
+
+    assert 3500 < entry["expires"] - time.time() <= 3600
+    assert not provider.available(25.5, 92.5, day)
+
+
+def test_failed_nasa_call_is_not_taken_for_an_unpublished_day(stub, fresh_cache):
+    nasa = UnpublishedNasa(fails=True)
+    provider = NasaPowerProvider(nasa)
+    day = datetime.date.today() - datetime.timedelta(days=1)
+
+    assert provider.get(26.0, 93.125, day) is None
+    assert provider.available(26.0, 93.125, day)  # asked again on the next miss
@@ -0,0 +1,109 @@
+"""
+HourlySeries: parsing both providers, missing values as NaN, and the cache form.
+"""
+import datetime
+import json
+import math
+
+from services.hourlySeries import HourlySeries, is_missing
+
+
+def _nasa(values_by_hour, day="20240601"):
+    # {hour: (T2M, PRECTOTCORR, WS2M, RH2M)} in the NASA POWER point layout
+    parameters = {name: {} for name in ("T2M", "PRECTOTCORR", "WS2M", "RH2M")}
+    for hour, values in values_by_hour.items():
+        for name, value in zip(parameters, values):
+            parameters[name][f"{day}{hour:02d}"] = value
+    return {"properties": {"parameter": parameters}}
+
+
+def _open_meteo(temperatures, offset_seconds=21600):
+    times = [f"2024-06-01T{h:02d}:00" for h in range(len(temperatures))]
+    return {"utc_offset_seconds": offset_seconds, "hourly": {
+        "time": times, "temperature_2m": temperatures, "precipitation": [0.5] * len(times),
+        "windspeed_10m": [2.0] * len(times), "relative_humidity_2m": None,
+    }}
+
+
+def test_nasa_payload_is_indexed_by_hour_with_fill_values_missing():
+    series = HourlySeries.from_nasa(_nasa({0: (25.0, 0.0, 3.0, 80.0), 1: (26.0, -999, 3.5, -999.0), 3: (27.0, 1.0, 4.0, 70.0)}))
+
+    assert series.start == datetime.datetime(2024, 6, 1, 0)
+    assert len(series) == 4  # hour 2 is absent from the payload, its slot is kept
+    assert series.source == "nasa"
+    assert list(series.rows()) == [
+        (0, 25.0, 0.0, 3.0, 80.0),
+        (1, 26.0, None, 3.5, None),
+        (2, None, None, None, None),
+        (3, 27.0, 1.0, 4.0, 70.0),
+    ]
+    assert series.missing_hours() == 1
+    assert is_missing(series.humidity[1]) and series.value("humidity", 1) is None
+
+
+def test_empty_payloads_give_no_series():
+    assert HourlySeries.from_nasa({"properties": {"parameter": {}}}) is None
+    assert HourlySeries.from_nasa({}) is None
+    assert HourlySeries.from_open_meteo({"hourly": {"time": []}}) is None
+
+
+def test_open_meteo_payload_keeps_its_utc_offset_and_absent_fields_are_missing():
+    series = HourlySeries.from_open_meteo(_open_meteo([20.0, None, 22.0]))
+
+    assert series.source == "forecast"
+    assert series.step == datetime.timedelta(hours=1)
+    assert series.utc_time_at(0) == datetime.datetime(2024, 5, 31, 18)
+    assert series.iso_time(2) == "2024-06-01T02:00:00"
+    assert [row[1] for row in series.rows()] == [20.0, None, 22.0]
+    assert all(math.isnan(value) for value in series.humidity)
+
+
+def test_day_indices_stay_within_the_series():
+    series = HourlySeries.from_open_meteo(_open_meteo([20.0] * 30))
+
+    assert series.indices_for_day(datetime.date(2024, 6, 1)) == range(0, 24)
+    assert series.indices_for_day(datetime.date(2024, 6, 2)) == range(24, 30)
+    assert len(series.indices_for_day(datetime.date(2024, 6, 3))) == 0
+    assert len(series.slice(range(24, 30))) == 6
+
+
+def test_cache_form_is_json_and_round_trips_missing_values():
+    series = HourlySeries.from_nasa(_nasa({0: (25.0, 0.0, 3.0, 80.0), 1: (-999, 0.2, 3.5, -999), 2: (27.0, 1.0, 4.0, 70.0)}))
+
+    stored = json.loads(json.dumps(series.to_cache(), allow_nan=False))  # NaN must not reach the JSON
+    restored = HourlySeries.from_cache(stored)
+
+    assert stored["columns"]["temperature"] == [25.0, None, 27.0]
+    assert restored == series
+    assert (restored.start, restored.step, restored.source, restored.utc_offset) == (
+        series.start, series.step, series.source, series.utc_offset)
+    assert list(restored.rows()) == list(series.rows())
+
+
+def test_cache_round_trip_keeps_the_utc_offset():
+    series = HourlySeries.from_open_meteo(_open_meteo([20.0, 21.0]))
+
+    assert HourlySeries.from_cache(series.to_cache()).utc_offset == datetime.timedelta(hours=6)
+
+
+def test_series_read_back_from_the_file_tier_is_a_series(fresh_cache):
+    series = HourlySeries.from_open_meteo(_open_meteo([20.0, None, 22.0]))
+    fresh_cache.set("series", series, expiry_hours=1)
+    fresh_cache._memory_cache.clear()
+
+    restored = fresh_cache.get("series")
+
+    assert isinstance(restored, HourlySeries)
+    assert restored == series
+
+
+def test_gaps_are_filled_from_the_same_time_label():
+    nasa = HourlySeries.from_nasa(_nasa({0: (25.0, 0.0, 3.0, 80.0), 1: (-999, -999, -999, -999)}))
+    forecast = HourlySeries.from_open_meteo(_open_meteo([30.0, 31.0, 32.0]))
+
+    filled, count = nasa.filled_from(forecast)
+
+    assert count == 1
+    assert [row[1] for row in filled.rows()] == [25.0, 31.0]  # existing values win
+    assert filled.source == "nasa+forecast"
+    assert nasa.missing_hours() == 1  # the original is unchanged
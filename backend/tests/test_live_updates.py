@@ -0,0 +1,153 @@
+"""
+LiveUpdateHub: one refresh loop per key, snapshot / update events, subscriber limit.
+"""
+import json
+import threading
+
+import pytest
+
+from services.liveUpdates import HubFull, LiveUpdateHub
+
+
+def _hour(time, temperature):
+    return {"time": time, "temperature": temperature}
+
+
+def _parse(message):
+    event, data = message.strip().split("\n")
+    return event[len("event: "):], json.loads(data[len("data: "):])
+
+
+class Builds:
+    """
+    build() callable returning the queued answers in turn (the last one repeats), counting the calls.
+    """
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = 0
+        self.called = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.called.set()
+        return self.answers.pop(0) if len(self.answers) > 1 else self.answers[0]
+
+
+def _next_event(stream):
+    message = next(stream)
+    while message.startswith(":"):  # keep-alive
+        message = next(stream)
+    return _parse(message)
+
+
+def test_first_event_is_the_full_snapshot_with_its_cell():
+    hub = LiveUpdateHub(interval=60)
+    build = Builds([_hour("T01", 20), _hour("T00", 19)])
+    stream = hub.stream("cell", build, lambda: True, cell={"latitude": 23.5, "longitude": 90.0})
+
+    event, data = _next_event(stream)
+
+    assert event == "snapshot"
+    assert data["cell"] == {"latitude": 23.5, "longitude": 90.0}
+    assert [hour["time"] for hour in data["hourly_data"]] == ["T00", "T01"]
+    stream.close()
+
+
+def test_changed_hours_are_pushed_as_updates():
+    hub = LiveUpdateHub(interval=0.02)
+    build = Builds([_hour("T00", 19)], [_hour("T00", 19), _hour("T01", 21)])
+    stream = hub.stream("cell", build, lambda: True)
+
+    assert _next_event(stream)[0] == "snapshot"
+    event, data = _next_event(stream)
+
+    assert event == "update"
+    assert data == [_hour("T01", 21)]
+    stream.close()
+
+
+def test_replaced_hours_send_a_new_snapshot_instead_of_an_update():
+    hub = LiveUpdateHub(interval=0.02)
+    build = Builds([_hour("T00", 19), _hour("T01", 20)], [_hour("T00", 19), _hour("T02", 21)])
+    stream = hub.stream("cell", build, lambda: True)
+
+    assert _next_event(stream)[0] == "snapshot"
+    event, data = _next_event(stream)
+
+    assert event == "snapshot"
+    assert data["hourly_data"] == [_hour("T00", 19), _hour("T02", 21)]
+    stream.close()
+
+
+def _assert_last_hours_kept(*answers):
+    hub = LiveUpdateHub(interval=0.02)
+    good = [_hour("T00", 19), _hour("T01", 20)]
+    build = Builds(good, *answers, [_hour("T00", 19), _hour("T01", 20)])
+    published = []
+    hub.publish = lambda loop, message: published.append(message)
+    stream = hub.stream("cell", build, lambda: True)
+    _next_event(stream)
+
+    while build.calls < len(answers) + 2:
+        build.called.clear()
+        build.called.wait(1)
+
+    assert published == []
+    assert _parse(hub.snapshot_event(hub._loops["cell"]))[1]["hourly_data"] == good
+    stream.close()
+
+
+def test_a_failed_build_keeps_the_last_hours():
+    _assert_last_hours_kept(None)
+
+
+def test_an_empty_refresh_keeps_the_last_hours():
+    _assert_last_hours_kept([])
+
+
+def test_a_partial_refresh_keeps_the_last_hours():
+    _assert_last_hours_kept([_hour("T00", 19)])
+
+
+def test_subscribers_of_one_key_share_one_loop_and_the_last_one_stops_it():
+    hub = LiveUpdateHub(interval=60)
+    build = Builds([_hour("T00", 19)])
+    first = hub.stream("cell", build, lambda: True)
+    second = hub.stream("cell", build, lambda: True)
+    _next_event(first)
+    _next_event(second)
+
+    assert hub.stats() == {"loops": 1, "subscribers": 2}
+    assert build.calls == 1
+    loop = hub._loops["cell"]
+
+    first.close()
+    assert hub.stats() == {"loops": 1, "subscribers": 1}
+    second.close()
+    assert hub.stats() == {"loops": 0, "subscribers": 0}
+    loop.thread.join(timeout=1)
+    assert not loop.thread.is_alive()
+
+
+def test_full_hub_refuses_new_subscribers():
+    hub = LiveUpdateHub(interval=60, max_subscribers=1)
+    stream = hub.stream("a", Builds([]), lambda: True)
+    _next_event(stream)
+
+    with pytest.raises(HubFull):
+        next(hub.stream("b", Builds([]), lambda: True))
+    stream.close()
+
+
+def test_stream_ends_when_the_day_rolls_over():
+    hub = LiveUpdateHub(interval=60)
+    current = [True]
+    stream = hub.stream("cell", Builds([]), lambda: current[0])
+    _next_event(stream)
+
+    current[0] = False
+    assert _next_event(stream) == ("end", {"reason": "day_changed"})
+    with pytest.raises(StopIteration):
+        next(stream)
+    assert hub.stats()["subscribers"] == 0
@@ -0,0 +1,57 @@
+"""
+Admin token check of the profiling endpoints and of the X-Profile-Token request header.
+"""
+import pytest
+
+from services import profiling
+
+TOKEN = "s3cret-token"
+
+
+@pytest.fixture
+def admin(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", TOKEN)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path / "profiles"))
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Admin-Token": ""}, {"X-Admin-Token": "wrong"}, {"X-Admin-Token": TOKEN + "x"}])
+def test_missing_or_wrong_token_is_not_found(client, admin, headers):
+    assert client.get("/api/admin/profiles", headers=headers).status_code == 404
+    assert client.get("/api/admin/profiles/some_id", headers=headers).status_code == 404
+
+
+def test_non_ascii_token_is_not_found_not_a_server_error(client, admin):
+    headers = {"X-Admin-Token": "s3cret-tökén"}
+
+    assert client.get("/api/admin/profiles", headers=headers).status_code == 404
+    assert client.get("/api/admin/profiles/some_id", headers=headers).status_code == 404
+
+
+def test_right_token_lists_the_profiles(client, admin):
+    response = client.get("/api/admin/profiles", headers={"X-Admin-Token": TOKEN})
+
+    assert response.status_code == 200
+    assert response.get_json() == []
+
+
+def test_no_configured_token_disables_the_admin_api(client, admin, monkeypatch):
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", "")
+
+    assert client.get("/api/admin/profiles", headers={"X-Admin-Token": ""}).status_code == 404
+    assert not profiling.token_matches("")
+
+
+def test_non_ascii_profile_token_runs_the_request_unprofiled(client, admin):
+    response = client.get("/api/weather/hourly", headers={"X-Profile-Token": "tökén"})
+
+    assert response.status_code == 400  # missing parameters, answered by the view itself
+    assert "X-Profile-Id" not in response.headers
+
+
+def test_right_profile_token_saves_a_profile(client, admin):
+    response = client.get("/api/weather/hourly", headers={"X-Profile-Token": TOKEN})
+
+    profile_id = response.headers["X-Profile-Id"]
+    listed = client.get("/api/admin/profiles", headers={"X-Admin-Token": TOKEN}).get_json()
+    assert [profile["id"] for profile in listed] == [profile_id]
+    assert client.get(f"/api/admin/profiles/{profile_id}?format=folded", headers={"X-Admin-Token": TOKEN}).status_code == 200
@@ -0,0 +1,67 @@
+"""
+Regional ingestion against a stub serving a regional payload in the NASA POWER response shape
+(tests/fixtures), checked against the point API answers for the same cells and days.
+"""
+import json
+import os
+
+import pytest
+
+from services.hourlySeries import HourlySeries
+from services.nasaPower import NasaPowerClient
+from services.regionalIngest import explode_regional_payload, ingest_region
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "nasa_regional_20240601.json")
+
+
+@pytest.fixture(scope="module")
+def recorded():
+    with open(FIXTURE, "r") as f:
+        return json.load(f)
+
+
+def _point_series(recorded, key):
+    return HourlySeries.from_nasa(recorded["points"][key])
+
+
+def test_explode_splits_features_per_cell_and_day(recorded):
+    entries = explode_regional_payload(recorded["regional"])
+
+    assert len(entries) == len(recorded["points"])
+    for (lat, lon, day), point_payload in entries.items():
+        expected = _point_series(recorded, f"{lat},{lon},{day}")
+        assert HourlySeries.from_nasa(point_payload) == expected
+
+
+def test_ingested_cells_answer_point_queries_like_the_point_api(recorded, stub, fresh_cache):
+    stub.regional_payload = recorded["regional"]
+    client = NasaPowerClient()
+    lat_min, lon_min, lat_max, lon_max = recorded["bbox"]
+
+    summary = ingest_region(lat_min, lat_max, lon_min, lon_max, recorded["start"], recorded["end"], client=client)
+
+    assert summary["failed_requests"] == 0
+    assert summary["cells"] == 4
+    assert summary["entries"] == len(recorded["points"])
+
+    for key in recorded["points"]:
+        lat, lon, day = key.split(",")
+        # any point inside the cell, not only its centre
+        series = client.get_hourly_weather_data(float(lat) + 0.1, float(lon) - 0.2, day, day)
+        assert series == _point_series(recorded, key)
+        assert len(series) == 24
+
+    # every point query was served from the ingested entries
+    assert stub.calls.get("/api/temporal/hourly/point", 0) == 0
+    assert stub.calls["/api/temporal/hourly/regional"] == summary["requests"]
+
+
+def test_fill_values_stay_missing(recorded, stub, fresh_cache):
+    stub.regional_payload = recorded["regional"]
+    client = NasaPowerClient()
+    lat_min, lon_min, lat_max, lon_max = recorded["bbox"]
+    ingest_region(lat_min, lat_max, lon_min, lon_max, recorded["start"], recorded["end"], client=client)
+
+    series = client.get_hourly_weather_data(24.0, 90.625, "20240602", "20240602")
+    assert series.value("humidity", 3) is None
+    assert series.value("temperature", 3) is not None
@@ -0,0 +1,81 @@
+"""
+Lazy package exports and the lazy service registry.
+"""
+import importlib
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import services
+from services import registry
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+@pytest.mark.parametrize("name", sorted(services._EXPORTS))
+def test_every_export_resolves_to_the_object_in_its_module(name):
+    module = importlib.import_module(services._EXPORTS[name], "services")
+
+    assert getattr(services, name) is getattr(module, name)
+
+
+def test_unknown_name_is_an_attribute_error():
+    with pytest.raises(AttributeError):
+        services.NoSuchService  # noqa: B018
+
+
+def test_importing_the_package_loads_no_service_module():
+    code = "import sys, services; print(sorted(m for m in sys.modules if m.startswith('services.') or m == 'requests'))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=BACKEND_DIR, check=True)
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_services_are_built_once_and_shared():
+    from services.riskCalculator import RiskCalculator
+
+    calculator = registry.get_risk_calculator()
+
+    assert isinstance(calculator, RiskCalculator)
+    assert registry.get_risk_calculator() is calculator
+
+
+def test_concurrent_first_use_builds_one_instance():
+    built = []
+    start = threading.Barrier(8)
+
+    def factory():
+        built.append(object())
+        return built[-1]
+
+    def ask():
+        start.wait()
+        registry._get_or_create("slow", factory)
+
+    threads = [threading.Thread(target=ask) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1
+
+
+def test_reset_installs_stand_ins_and_drops_the_rest():
+    calculator = registry.get_risk_calculator()
+    canned = object()
+
+    registry.reset(forecast_client=canned)
+
+    assert registry.get_forecast_client() is canned
+    assert registry.get_risk_calculator() is not calculator
@@ -0,0 +1,221 @@
+"""
+AlertEngine state shared through ALERTS_DIR: several engines stand in for several processes.
+The subscription API: secrets, the admin token and the caps.
+"""
+import datetime
+import json
+import threading
+
+import pytest
+
+from services import profiling, registry, riskAlerts
+from services.hourlySeries import HourlySeries
+from services.riskAlerts import FORECAST_DAYS, AlertEngine, _file_lock, validate_subscription
+
+
+class HotForecast:
+    """
+    Forecast client stand-in: 3 days of hourly data in UTC, 45 °C (high risk) every hour.
+    """
+    upstream = "open_meteo"
+
+    def __init__(self, temperature=45.0):
+        self.temperature = temperature
+        self.calls = []
+
+    def get_hourly_forecast(self, latitude, longitude, start_date, end_date):
+        self.calls.append((latitude, longitude, start_date, end_date))
+        start = datetime.datetime.fromisoformat(start_date)
+        times = [(start + datetime.timedelta(hours=h)).strftime("%Y-%m-%dT%H:%M") for h in range(72)]
+        return HourlySeries.from_open_meteo({"utc_offset_seconds": 0, "hourly": {
+            "time": times, "temperature_2m": [self.temperature] * 72, "precipitation": [0.0] * 72,
+            "windspeed_10m": [3.0] * 72, "relative_humidity_2m": [50.0] * 72,
+        }})
+
+
+@pytest.fixture
+def forecast():
+    client = HotForecast()
+    registry.reset(forecast_client=client)
+    yield client
+    registry.reset()
+
+
+def _subscription(lat=23.8, lon=90.4, horizon_hours=6):
+    return validate_subscription({"lat": lat, "lon": lon, "risk_level": "high", "horizon_hours": horizon_hours})
+
+
+def _outbox(alerts_dir):
+    path = alerts_dir / "outbox.jsonl"
+    return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+
+
+def test_a_separate_evaluator_sees_subscriptions_added_through_the_api(tmp_path, forecast):
+    evaluator, api_worker = AlertEngine(str(tmp_path)), AlertEngine(str(tmp_path))
+    assert evaluator.evaluate() == []
+
+    subscription = api_worker.add_subscription(_subscription())
+    alerts = evaluator.evaluate()
+
+    assert [alert["subscription_id"] for alert in alerts] == [subscription["id"]]
+    assert evaluator.stats()["subscriptions"] == 1
+
+
+def test_concurrent_workers_do_not_lose_subscriptions(tmp_path):
+    workers = [AlertEngine(str(tmp_path)) for _ in range(4)]
+
+    def add_many(engine):
+        for i in range(25):
+            engine.add_subscription(_subscription(lat=10 + i))
+
+    threads = [threading.Thread(target=add_many, args=(engine,)) for engine in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(AlertEngine(str(tmp_path)).list_subscriptions()) == 100
+
+
+def test_removed_subscriptions_are_gone_for_every_worker(tmp_path):
+    first, second = AlertEngine(str(tmp_path)), AlertEngine(str(tmp_path))
+    subscription = first.add_subscription(_subscription())
+
+    assert second.remove_subscription(subscription["id"])
+    assert first.list_subscriptions() == []
+    assert not first.remove_subscription(subscription["id"])
+
+
+def test_cron_runs_do_not_repeat_alerts(tmp_path, forecast):
+    AlertEngine(str(tmp_path)).add_subscription(_subscription())
+
+    first_run = AlertEngine(str(tmp_path)).evaluate()
+    forecast.temperature = 46.0  # the forecast changed, but the hours are still high risk
+    second_run = AlertEngine(str(tmp_path)).evaluate()
+
+    assert len(first_run) == 1 and first_run[0]["hours"]
+    assert second_run == []
+    assert len(_outbox(tmp_path)) == 1
+
+
+def test_unchanged_cells_are_not_rescored(tmp_path, forecast):
+    engine = AlertEngine(str(tmp_path))
+    engine.add_subscription(_subscription())
+    engine.evaluate()
+    engine.evaluate()
+
+    assert engine.counters["cells_checked"] == 2
+    assert engine.counters["cells_changed"] == 1
+
+
+def test_a_new_subscription_in_a_scored_cell_gets_alerted(tmp_path, forecast):
+    engine = AlertEngine(str(tmp_path))
+    engine.add_subscription(_subscription())
+    engine.evaluate()
+
+    late = AlertEngine(str(tmp_path)).add_subscription(_subscription(lat=23.81))
+    alerts = engine.evaluate()
+
+    assert [alert["subscription_id"] for alert in alerts] == [late["id"]]
+
+
+def test_overlapping_passes_are_skipped(tmp_path, forecast):
+    engine = AlertEngine(str(tmp_path))
+    engine.add_subscription(_subscription())
+
+    with _file_lock(engine.evaluate_lock_path):
+        assert AlertEngine(str(tmp_path)).evaluate() is None
+    assert len(engine.evaluate()) == 1
+
+
+def test_forecast_is_never_asked_past_its_window(tmp_path, forecast):
+    engine = AlertEngine(str(tmp_path))
+    engine.add_subscription(_subscription(horizon_hours=FORECAST_DAYS * 24))
+    engine.evaluate()
+
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    _, _, start_date, end_date = forecast.calls[0]
+    assert start_date == today.isoformat()
+    assert end_date == (today + datetime.timedelta(days=FORECAST_DAYS - 1)).isoformat()
+
+
+ADMIN = {"X-Admin-Token": "admin-token"}
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch, client):
+    monkeypatch.setattr(riskAlerts, "alert_engine", AlertEngine(str(tmp_path)))
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", ADMIN["X-Admin-Token"])
+    return client
+
+
+def _create(api, lat=23.8):
+    response = api.post("/api/alerts/subscriptions", json={"lat": lat, "lon": 90.4, "risk_level": "high"})
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def test_created_subscription_comes_with_its_secret_and_stores_only_a_hash(api, tmp_path):
+    created = _create(api)
+
+    assert created["secret"]
+    assert "secret_hash" not in created and "client" not in created
+    stored = json.loads((tmp_path / "subscriptions.json").read_text())
+    assert created["secret"] not in json.dumps(stored)
+    assert stored[0]["secret_hash"]
+
+
+def test_listing_every_subscription_needs_the_admin_token(api):
+    _create(api)
+
+    assert api.get("/api/alerts/subscriptions").status_code == 403
+    assert api.get("/api/alerts/subscriptions", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    listed = api.get("/api/alerts/subscriptions", headers=ADMIN).get_json()
+    assert len(listed) == 1
+    assert "secret_hash" not in listed[0] and "client" not in listed[0]
+
+
+def test_a_subscription_is_read_with_its_own_secret(api):
+    created, other = _create(api), _create(api, lat=10.0)
+    path = f"/api/alerts/subscriptions/{created['id']}"
+
+    assert api.get(path).status_code == 404
+    assert api.get(path, headers={"X-Subscription-Secret": other["secret"]}).status_code == 404
+    own = api.get(path, headers={"X-Subscription-Secret": created["secret"]})
+    assert own.status_code == 200
+    assert own.get_json()["id"] == created["id"] and "secret_hash" not in own.get_json()
+    assert api.get(path, headers=ADMIN).status_code == 200
+
+
+def test_deleting_needs_the_secret_or_the_admin_token(api):
+    created, other = _create(api), _create(api, lat=10.0)
+    path = f"/api/alerts/subscriptions/{created['id']}"
+
+    assert api.delete(path).status_code == 404
+    assert api.delete(path, headers={"X-Subscription-Secret": other["secret"]}).status_code == 404
+    assert riskAlerts.alert_engine.stats()["subscriptions"] == 2
+
+    assert api.delete(path, headers={"X-Subscription-Secret": created["secret"]}).status_code == 200
+    assert api.delete(f"/api/alerts/subscriptions/{other['id']}", headers=ADMIN).status_code == 200
+    assert riskAlerts.alert_engine.stats()["subscriptions"] == 0
+
+
+def test_one_client_cannot_exceed_its_cap(api, monkeypatch):
+    monkeypatch.setattr(riskAlerts, "MAX_SUBSCRIPTIONS_PER_CLIENT", 2)
+    _create(api)
+    _create(api)
+
+    response = api.post("/api/alerts/subscriptions", json={"lat": 1, "lon": 1})
+    assert response.status_code == 429
+    # other clients still can
+    other = api.post("/api/alerts/subscriptions", json={"lat": 1, "lon": 1}, environ_base={"REMOTE_ADDR": "10.0.0.2"})
+    assert other.status_code == 201
+
+
+def test_total_cap_refuses_everyone(api, monkeypatch):
+    monkeypatch.setattr(riskAlerts, "MAX_SUBSCRIPTIONS", 1)
+    _create(api)
+
+    response = api.post("/api/alerts/subscriptions", json={"lat": 1, "lon": 1}, environ_base={"REMOTE_ADDR": "10.0.0.2"})
+    assert response.status_code == 503
+    assert riskAlerts.alert_engine.stats()["subscriptions"] == 1
@@ -0,0 +1,132 @@
+"""
+Shared L2 tier against the in-memory RESP stand-in: read-through, single-flight across nodes, and the fill lock
+never stalling the other nodes when the backend misbehaves.
+"""
+import threading
+import time
+
+import pytest
+
+from benchmarks.resp_stub import start_resp_stub
+from services import caching
+from services.caching import HybridCache
+from services.deadline import request_deadline
+from services.sharedCache import RespClient, SharedCache, SharedCacheUnavailable
+
+
+@pytest.fixture
+def resp():
+    server = start_resp_stub()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _node(tmp_path, resp, name, shared_class=SharedCache):
+    # one app node: its own cache folder and memory, the shared tier in common
+    return HybridCache(cache_dir=str(tmp_path / name), shared=shared_class(RespClient.from_url(resp.url), "test:v1:"))
+
+
+class Upstream:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return {"value": 42}
+
+
+def test_other_nodes_read_through_the_shared_tier(tmp_path, resp):
+    first, second = _node(tmp_path, resp, "a"), _node(tmp_path, resp, "b")
+    first.set("key", {"value": 1}, expiry_hours=1)
+
+    assert second.get("key") == {"value": 1}
+    assert second._memory_cache["key"]["expires"] == first._memory_cache["key"]["expires"]  # original expiry kept
+
+
+def test_one_fetch_for_the_whole_fleet(tmp_path, resp):
+    nodes = [_node(tmp_path, resp, f"node{i}") for i in range(3)]
+    upstream = Upstream(delay=0.3)
+    results = []
+
+    def ask(node):
+        results.append(node.get_or_compute("city", upstream))
+
+    threads = [threading.Thread(target=ask, args=(node,)) for node in nodes for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [{"value": 42}] * 12
+    assert upstream.calls == 1
+
+
+class FailingSet(SharedCache):
+    # the connection drops right when the holder stores its result
+    def set(self, key, entry, ttl_seconds):
+        self._down_until = time.monotonic() + 5
+        raise SharedCacheUnavailable()
+
+
+def test_lock_is_released_when_storing_the_result_fails(tmp_path, resp):
+    holder = _node(tmp_path, resp, "holder", shared_class=FailingSet)
+    other = _node(tmp_path, resp, "other")
+
+    assert holder.get_or_compute("city", Upstream()) == {"value": 42}
+
+    assert not other.shared.is_locked("city")
+    started = time.monotonic()
+    assert other.get_or_compute("city", Upstream()) == {"value": 42}
+    assert time.monotonic() - started < 0.5
+
+
+def test_a_lock_left_behind_is_waited_on_for_half_the_deadline_at_most(tmp_path, resp):
+    dead = _node(tmp_path, resp, "dead")
+    assert dead.shared.try_lock("city", 60) is not None  # holder died without unlocking
+    other = _node(tmp_path, resp, "other")
+    upstream = Upstream()
+
+    started = time.monotonic()
+    with request_deadline(1.0):
+        assert other.get_or_compute("city", upstream) == {"value": 42}
+    assert time.monotonic() - started < 0.8
+    assert upstream.calls == 1
+
+
+def test_a_lock_left_behind_is_waited_on_for_the_fill_wait_at_most(tmp_path, resp, monkeypatch):
+    monkeypatch.setattr(caching, "FILL_WAIT_SECONDS", 0.3)
+    dead = _node(tmp_path, resp, "dead")
+    dead.shared.try_lock("city", 60)
+    other = _node(tmp_path, resp, "other")
+
+    started = time.monotonic()
+    assert other.get_or_compute("city", Upstream()) == {"value": 42}
+    assert 0.3 <= time.monotonic() - started < 0.8
+
+
+def test_backend_error_while_waiting_computes_locally_right_away(tmp_path, resp, monkeypatch):
+    dead = _node(tmp_path, resp, "dead")
+    dead.shared.try_lock("city", 60)
+    other = _node(tmp_path, resp, "other")
+    other.shared.is_locked("city")  # open the connection before the backend breaks
+
+    def broken(args):
+        raise RuntimeError("backend gone")  # the stub drops the connection
+
+    monkeypatch.setattr(resp, "execute", broken)
+    started = time.monotonic()
+    assert other.get_or_compute("city", Upstream()) == {"value": 42}
+    assert time.monotonic() - started < 0.5
+    assert not other.shared.available()
+
+
+def test_unreachable_backend_never_blocks(tmp_path):
+    node = HybridCache(cache_dir=str(tmp_path / "node"), shared=SharedCache(RespClient("127.0.0.1", 1, timeout=0.2), "test:v1:"))
+
+    assert node.get_or_compute("city", Upstream()) == {"value": 42}
+    assert node.get("city") == {"value": 42}  # local tiers still work
@@ -0,0 +1,86 @@
+"""
+UpstreamScheduler: priority order, queue deadlines, refill, and the limits shared out across processes.
+"""
+import threading
+import time
+
+from services.tokenBucket import TokenBucket
+from services.upstreamScheduler import INTERACTIVE, PREFETCH, REFRESH, UpstreamScheduler
+
+
+def _wait_until_queued(scheduler, provider, count):
+    give_up_at = time.monotonic() + 2
+    while scheduler.stats()[provider]["waiting"] < count and time.monotonic() < give_up_at:
+        time.sleep(0.005)
+
+
+def test_waiting_calls_go_out_in_priority_order():
+    scheduler = UpstreamScheduler(limits={"api": (10.0, 1)})
+    assert scheduler.acquire("api")  # the only token, everyone after this queues
+    order = []
+
+    def call(priority):
+        if scheduler.acquire("api", priority=priority, max_wait=5):
+            order.append(priority)
+
+    threads = []
+    for count, priority in enumerate((PREFETCH, REFRESH, INTERACTIVE), start=1):
+        threads.append(threading.Thread(target=call, args=(priority,)))
+        threads[-1].start()
+        _wait_until_queued(scheduler, "api", count)
+    for thread in threads:
+        thread.join()
+
+    assert order == [INTERACTIVE, REFRESH, PREFETCH]
+
+
+def test_call_past_its_queue_deadline_is_dropped():
+    scheduler = UpstreamScheduler(limits={"api": (0.1, 1)}, queue_deadlines={PREFETCH: 0.1})
+    assert scheduler.acquire("api")
+
+    started = time.monotonic()
+    assert not scheduler.acquire("api", priority=PREFETCH)
+
+    assert time.monotonic() - started < 1
+    counters = scheduler.stats()["api"]["by_priority"]["prefetch"]
+    assert counters == {"admitted": 0, "queued": 1, "throttled": 0, "dropped": 1}
+    assert scheduler.stats()["api"]["waiting"] == 0
+
+
+def test_bucket_refills_at_its_rate_up_to_its_capacity():
+    bucket = TokenBucket(rate=2.0, capacity=2)
+    now = bucket.updated
+
+    assert bucket.try_take(now) and bucket.try_take(now)
+    assert not bucket.try_take(now)
+    assert bucket.time_until_token(now) == 0.5
+    assert bucket.try_take(now + 0.5)
+    assert not bucket.try_take(now + 0.5)
+    # a long idle time never banks more than the capacity
+    assert bucket.try_take(now + 60) and bucket.try_take(now + 60)
+    assert not bucket.try_take(now + 60)
+
+
+def test_paused_bucket_does_not_refill():
+    bucket = TokenBucket(rate=100.0, capacity=1)
+    bucket.pause(0.2)
+
+    assert not bucket.try_take()
+    assert bucket.time_until_token() > 0.1
+
+
+def test_each_process_gets_its_share_of_the_limits():
+    scheduler = UpstreamScheduler(limits={"nasa_power": (2.0, 5), "nominatim": (1.0, 1)}, processes=2)
+    scheduler.acquire("nasa_power")
+    scheduler.acquire("nominatim")
+
+    nasa, nominatim = scheduler._buckets["nasa_power"], scheduler._buckets["nominatim"]
+    assert (nasa.rate, nasa.capacity) == (1.0, 2)
+    assert (nominatim.rate, nominatim.capacity) == (0.5, 1)
+
+
+def test_single_process_keeps_the_full_limits():
+    scheduler = UpstreamScheduler(limits={"nasa_power": (2.0, 5)}, processes=1)
+    scheduler.acquire("nasa_power")
+
+    assert (scheduler._buckets["nasa_power"].rate, scheduler._buckets["nasa_power"].capacity) == (2.0, 5)
@@ -147,6 +147,13 @@ async function handleSubmit(event) {
         
         // Step 3: Process and display results
         displayWeatherResults(weatherData, datetime, eventType);
+
+        // For today, keep the results live instead of re-fetching the whole day
+        if (weatherData.is_today) {
+            subscribeToLiveUpdates(coordinates, weatherData, datetime, eventType);
+        } else {
+            closeLiveUpdates();
+        }
         
         // Hide loading, show results
         document.getElementById('loading').classList.remove('show');
@@ -159,6 +166,66 @@ async function handleSubmit(event) {
     }
 }
 
+// ------------------------------------
+// Live updates for today (server-sent events)
+// ------------------------------------
+let liveUpdates = null;
+
+function closeLiveUpdates() {
+    if (liveUpdates) {
+        liveUpdates.close();
+        liveUpdates = null;
+    }
+    showLiveNote(null);
+}
+
+// Live data is shared per weather grid cell, say so instead of passing it off as the exact point
+function showLiveNote(cell) {
+    const note = document.getElementById('live-note');
+    if (!note) return;
+    note.textContent = cell
+        ? `Live data for the weather grid cell centred at ${cell.latitude}, ${cell.longitude}`
+        : '';
+}
+
+function subscribeToLiveUpdates(coordinates, weatherData, datetime, eventType) {
+    closeLiveUpdates();
+
+    const streamUrl = `${API_BASE_URL}/api/weather/stream?lat=${coordinates.lat}&lon=${coordinates.lon}`;
+    liveUpdates = new EventSource(streamUrl);
+
+    // A snapshot is the complete hour set for the grid cell centre and replaces what we have,
+    // updates only carry the hours that changed since
+    const replaceHours = (event) => {
+        const snapshot = JSON.parse(event.data);
+        weatherData.hourly_data = snapshot.hourly_data;
+        weatherData.live_cell = snapshot.cell;
+        showLiveNote(snapshot.cell);
+        console.log('Live snapshot received:', snapshot.hourly_data.length, 'hours for cell', snapshot.cell);
+        displayWeatherResults(weatherData, datetime, eventType);
+    };
+
+    const mergeHours = (event) => {
+        const changedHours = JSON.parse(event.data);
+        changedHours.forEach(changed => {
+            const index = weatherData.hourly_data.findIndex(hour => hour.time === changed.time);
+            if (index >= 0) {
+                weatherData.hourly_data[index] = changed;
+            } else {
+                weatherData.hourly_data.push(changed);
+            }
+        });
+        weatherData.hourly_data.sort((a, b) => a.time.localeCompare(b.time));
+        console.log('Live update received:', changedHours.length, 'hours');
+        displayWeatherResults(weatherData, datetime, eventType);
+    };
+
+    liveUpdates.addEventListener('snapshot', replaceHours);
+    liveUpdates.addEventListener('update', mergeHours);
+    liveUpdates.addEventListener('end', closeLiveUpdates);  // the day is over
+    liveUpdates.onerror = () => console.warn('Live updates interrupted, the browser will reconnect');
+}
+
 // Display weather results from backend data
 function displayWeatherResults(weatherData, datetime, eventType) {
     const eventDateTime = new Date(datetime);